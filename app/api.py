@@ -1,27 +1,81 @@
 import logging
 from pathlib import Path
-from typing import List, Literal, Optional
+from datetime import datetime
+from typing import List, Literal, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import get_db
-from .schemas import CreditDashboard, CustomerSummary
-from .services.credit_agent_service import generate_dashboard_for_customer
-from .services.data_service import list_customers_with_latest_credit
+from . import jobs
+from .config import settings
+from .db import SessionLocal, get_async_db_or_sync, get_async_read_db_or_sync, get_db, get_read_db
+from .metrics import REGISTRY
+from .profiling import profiled
+from .responses import FastJSONResponse
+from .models import DashboardJob
+from .schemas import (
+    CreditDashboard,
+    CreditHistoryPoint,
+    CustomerSummary,
+    DashboardJobStatus,
+    ModelUsageSummary,
+    PortfolioSummary,
+)
+from .services.credit_agent_service import (
+    dashboard_etag,
+    fresh_cached_view,
+    generate_dashboard_for_customer,
+    load_cached_dashboard_json,
+)
+from .services import async_data_service, data_service, projection
+from .services.credit_history import credit_history
+from .services.portfolio import portfolio_summary
+from .services.resilience import ModelUnavailableError
+from .services.usage_service import summarize_model_usage
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Internal analysts always revalidate; partner and merchant portals may reuse a copy briefly.
+_DASHBOARD_CACHE_CONTROL = {
+    "silky_internal": "private, no-cache",
+    "bank_partner": "private, max-age=60, must-revalidate",
+    "merchant": "private, max-age=300, must-revalidate",
+}
+
+
+def _etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored.
+    return "*" in candidates or etag in (value.removeprefix("W/") for value in candidates)
+
+
+def _not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+@profiled
+def _generate_view(view: dict):
+    # Generation and the snapshot write stay on a sync Session; run in a worker thread.
+    with SessionLocal() as db:
+        dashboard = generate_dashboard_for_customer(db=db, **view)
+        cached = None if dashboard.stale else fresh_cached_view(db, **view)
+    return dashboard, cached
+
 
 @router.get(
     "/api/credit-dashboard/{customer_id}",
     response_model=CreditDashboard,
     summary="Generate credit & behaviour dashboard for a Silky customer",
 )
-def get_credit_dashboard(
+@profiled
+async def get_credit_dashboard(
     customer_id: int,
     viewer_type: Literal["silky_internal", "bank_partner", "merchant"] = Query(
         "silky_internal",
@@ -41,18 +95,66 @@ def get_credit_dashboard(
         None,
         description="Optional lender identifier (e.g. SAB, ANB).",
     ),
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated sections to return, e.g. credit_analysis,financial_health.revenue",
+    ),
+    if_none_match: Optional[str] = Header(None),
+    db: Union[AsyncSession, Session] = Depends(get_async_db_or_sync),
 ):
     try:
-        dashboard = generate_dashboard_for_customer(
-            db=db,
-            customer_id=customer_id,
-            viewer_type=viewer_type,
-            usage_mode=usage_mode,
-            subscription_tier=subscription_tier,
-            lender_id=lender_id,
+        paths = projection.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    fields_key = projection.fields_key(paths)
+    view = dict(
+        customer_id=customer_id,
+        viewer_type=viewer_type,
+        usage_mode=usage_mode,
+        subscription_tier=subscription_tier,
+        lender_id=lender_id,
+    )
+    cache_control = _DASHBOARD_CACHE_CONTROL[viewer_type]
+    try:
+        if isinstance(db, AsyncSession):
+            cached = await async_data_service.fresh_cached_view(db, **view)
+        else:
+            cached = await run_in_threadpool(fresh_cached_view, db, **view)
+        if cached is not None:
+            etag = dashboard_etag(cached.snapshot_id, cached.data_version, fields_key)
+            if _etag_matches(if_none_match, etag):
+                return _not_modified(etag, cache_control)
+            # Serve the stored JSON as-is (or projected) without rebuilding the model.
+            if isinstance(db, AsyncSession):
+                dashboard_json = await async_data_service.load_cached_dashboard_json(
+                    db, customer_id, viewer_type, lender_id, cached
+                )
+            else:
+                dashboard_json = await run_in_threadpool(
+                    load_cached_dashboard_json, db, customer_id, viewer_type, lender_id, cached
+                )
+            if dashboard_json is not None:
+                headers = {"ETag": etag, "Cache-Control": cache_control}
+                if paths:
+                    return FastJSONResponse(projection.project(projection.loads(dashboard_json), paths), headers=headers)
+                return Response(dashboard_json, media_type="application/json", headers=headers)
+
+        dashboard, cached = await run_in_threadpool(_generate_view, view)
+        content = projection.project(dashboard.model_dump(mode="json"), paths) if paths else dashboard
+        if dashboard.stale:
+            return FastJSONResponse(content, headers={"Cache-Control": "no-store"})
+        headers = {"Cache-Control": cache_control}
+        if cached is not None:
+            headers["ETag"] = dashboard_etag(cached.snapshot_id, cached.data_version, fields_key)
+        # Already validated: serialise directly rather than through `response_model` again.
+        return FastJSONResponse(content, headers=headers)
+    except ModelUnavailableError as e:
+        # No model response and no snapshot to fall back on.
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(int(settings.model_breaker_reset_seconds))},
         )
-        return dashboard
     except ValueError as e:
         # Treat model output/schema mismatches as a 502 Bad Gateway since the
         # upstream model produced an invalid response.
@@ -62,22 +164,163 @@ def get_credit_dashboard(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get(
+    "/api/credit-dashboard/{customer_id}/history",
+    response_model=List[CreditHistoryPoint],
+    summary="Credit score, band, limit and tenor over time, downsampled per period",
+)
+def get_credit_history(
+    customer_id: int,
+    resolution: Literal["raw", "daily", "weekly", "monthly"] = Query(
+        "daily",
+        description="raw returns every snapshot; otherwise one point (the period's last snapshot) per period",
+    ),
+    start: Optional[datetime] = Query(None, description="Only snapshots at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only snapshots before this time"),
+    viewer_type: Literal["silky_internal", "bank_partner", "merchant"] = Query(
+        "silky_internal",
+        description="Only snapshots generated for this type of viewer",
+    ),
+    lender_id: Optional[str] = Query(None, description="Only snapshots generated for this lender"),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        points = credit_history(
+            db, customer_id, resolution=resolution, start=start, end=end, viewer_type=viewer_type, lender_id=lender_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return FastJSONResponse([CreditHistoryPoint(**point) for point in points])
+
+
+def _job_status(job: DashboardJob, coalesced: bool = False) -> DashboardJobStatus:
+    return DashboardJobStatus(
+        job_id=job.id,
+        customer_id=job.customer_id,
+        status=job.status,
+        coalesced=coalesced,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        queue_ms=job.queue_ms,
+        run_ms=job.run_ms,
+        error=job.error,
+        result=CreditDashboard.model_validate_json(job.result_json) if job.result_json else None,
+    )
+
+
+@router.post(
+    "/api/credit-dashboard/{customer_id}/jobs",
+    response_model=DashboardJobStatus,
+    status_code=202,
+    summary="Queue a dashboard generation and return its job id immediately",
+)
+def create_dashboard_job(
+    customer_id: int,
+    viewer_type: Literal["silky_internal", "bank_partner", "merchant"] = Query("silky_internal"),
+    usage_mode: Optional[
+        Literal["internal_analytics", "merchant_portal", "bank_partner_portal"]
+    ] = Query(None),
+    subscription_tier: Optional[Literal["free", "standard", "pro", "enterprise"]] = Query(None),
+    lender_id: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    job, coalesced = jobs.enqueue_job(
+        db,
+        customer_id=customer_id,
+        viewer_type=viewer_type,
+        usage_mode=usage_mode,
+        subscription_tier=subscription_tier,
+        lender_id=lender_id,
+    )
+    return _job_status(job, coalesced)
+
+
+@router.get(
+    "/api/credit-dashboard/{customer_id}/jobs/{job_id}",
+    response_model=DashboardJobStatus,
+    summary="Status, timings and (once succeeded) the result of a dashboard job",
+)
+def get_dashboard_job(customer_id: int, job_id: str, db: Session = Depends(get_db)):
+    job = jobs.get_job(db, job_id)
+    if job is None or job.customer_id != customer_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+
 @router.get(
     "/api/customers",
     response_model=List[CustomerSummary],
     summary="List customers with latest credit snapshot",
 )
-def get_customers(db: Session = Depends(get_db)):
+@profiled
+async def get_customers(
+    if_none_match: Optional[str] = Header(None),
+    db: Union[AsyncSession, Session] = Depends(get_async_read_db_or_sync),
+):
     try:
-        return list_customers_with_latest_credit(db)
+        if isinstance(db, AsyncSession):
+            etag = await async_data_service.portfolio_etag(db)
+        else:
+            etag = await run_in_threadpool(data_service.fetch_portfolio_etag, db)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag, "private, no-cache")
+        if isinstance(db, AsyncSession):
+            customers = await async_data_service.list_customers_with_latest_credit(db)
+        else:
+            customers = await run_in_threadpool(data_service.list_customers_with_latest_credit, db)
+        return FastJSONResponse(customers, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
     except Exception:
         logger.exception("Failed to list customers")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get(
+    "/api/usage/summary",
+    response_model=List[ModelUsageSummary],
+    summary="Model token usage, latency and estimated cost rolled up over snapshots",
+)
+def get_usage_summary(
+    group_by: str = Query(
+        "day,usage_mode,lender,model",
+        description="Comma-separated dimensions: day, usage_mode, lender, model, viewer_type",
+    ),
+    start: Optional[datetime] = Query(None, description="Only snapshots at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only snapshots before this time"),
+    db: Session = Depends(get_read_db),
+):
+    dimensions = [name.strip() for name in group_by.split(",") if name.strip()]
+    try:
+        return summarize_model_usage(db, group_by=dimensions, start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get(
+    "/api/portfolio/summary",
+    response_model=List[PortfolioSummary],
+    summary="Score-band distribution, recommended exposure and average tenor across the portfolio",
+)
+def get_portfolio_summary(
+    group_by: Literal["all", "segment", "city", "lender"] = Query(
+        "all",
+        description="Break the portfolio down by segment, city or lender; 'all' returns one row per currency",
+    ),
+    db: Session = Depends(get_read_db),
+):
+    return portfolio_summary(db, group_by=group_by)
+
+
 _DASHBOARD_HTML = (Path(__file__).resolve().parent / "static" / "dashboard.html").read_text()
 
 
 @router.get("/dashboard", response_class=HTMLResponse, include_in_schema=False)
 def dashboard_page() -> str:
     return _DASHBOARD_HTML
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -6,6 +6,23 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 @dataclass
 class Settings:
     env: str
@@ -15,28 +32,188 @@ class Settings:
     log_level: str
     project_name: str = "Silky Credit & Behaviour Engine"
 
+    # Startup side effects; both default to on only when ENV=dev
+    auto_create_schema: bool = False
+    seed_demo_data: bool = False
+
+    # Connection pooling (ignored for in-memory SQLite) and optional read-only replica
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    db_read_url: str = ""
+    # Async engine URL; derived from DB_URL (sqlite+aiosqlite / postgresql+asyncpg) when empty
+    db_async_url: str = ""
+
+    # SQLite pragmas applied on every new connection
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size_bytes: int = 268_435_456
+    sqlite_cache_size_kib: int = 65_536
+
+    # Model provider: openai | local | record | replay
+    model_provider: str = "openai"
+    local_model_latency_ms: float = 0.0
+    local_model_latency_sigma: float = 0.0
+    local_model_seed: int = 0
+    model_recordings_dir: str = "./model_recordings"
+    model_record_inner: str = "openai"
+    # Send the CreditDashboard JSON schema as a strict response format.
+    model_strict_schema: bool = False
+
+    # Model call resilience
+    model_timeout_seconds: float = 60.0
+    model_deadline_seconds: float = 120.0
+    model_max_attempts: int = 3
+    model_retry_base_delay_seconds: float = 0.5
+    model_retry_max_delay_seconds: float = 8.0
+    model_breaker_failure_threshold: int = 5
+    model_breaker_reset_seconds: float = 30.0
+    # Section-targeted repair calls after a validation failure; 0 disables repair.
+    model_repair_max_attempts: int = 2
+
+    # Model pricing (USD per 1M tokens) for snapshot cost accounting
+    model_input_cost_per_mtok: float = 0.0
+    model_cached_input_cost_per_mtok: float = 0.0
+    model_output_cost_per_mtok: float = 0.0
+
+    # Snapshot payload storage: auto | zstd | gzip; deltas disabled when max chain is 0
+    snapshot_compression: str = "auto"
+    snapshot_delta_max_chain: int = 0
+
+    # Snapshot retention: latest N per cache key plus daily/monthly representatives
+    snapshot_retention_keep_latest: int = 3
+    snapshot_retention_daily_days: int = 30
+    snapshot_retention_monthly_months: int = 24
+    snapshot_retention_interval_seconds: float = 0.0  # 0 disables the background job
+
+    # Background dashboard jobs (workers run in the API process unless set to 0)
+    dashboard_job_workers: int = 2
+    dashboard_job_poll_seconds: float = 1.0
+    # Running jobs are requeued after this; the default outlasts a generation and all its
+    # repair calls running into MODEL_DEADLINE_SECONDS, plus a margin.
+    dashboard_job_timeout_seconds: float = 420.0
+    dashboard_job_ttl_seconds: float = 86_400.0
+
+    # Off-peak pre-warming of changed customers' most-viewed dashboards (UTC windows
+    # such as "01:00-05:00,22:30-23:30"; empty disables the scheduler)
+    prewarm_windows: str = ""
+    prewarm_interval_seconds: float = 900.0
+    prewarm_concurrency: int = 2
+    prewarm_max_generations: int = 200
+    prewarm_budget_usd: float = 0.0  # 0 = no cost cap, only the generation cap
+    prewarm_views_per_customer: int = 2
+    prewarm_min_age_seconds: float = 21_600.0
+
+    # Response compression (brotli needs the optional `brotli` package, else gzip)
+    compression_minimum_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+
+    # On-demand request profiling (disabled when the token is empty)
+    profiling_token: str = ""
+    profile_dir: str = "./profiles"
+
     @property
     def is_dev(self) -> bool:
         return self.env.lower() == "dev"
 
+    @property
+    def uses_openai(self) -> bool:
+        return self.model_provider == "openai" or (
+            self.model_provider == "record" and self.model_record_inner == "openai"
+        )
+
+    def require_openai_api_key(self) -> None:
+        if self.uses_openai and not self.openai_api_key:
+            raise RuntimeError("OPENAI_API_KEY is not set")
+
+
+_JOB_TIMEOUT_MARGIN_SECONDS = 60.0
+
 
 def load_settings() -> Settings:
     env = os.getenv("ENV", "dev")
     db_url = os.getenv("DB_URL", "sqlite:///./silky_credit.db")
 
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    if not openai_api_key:
-        raise RuntimeError("OPENAI_API_KEY is not set")
+    model_provider = os.getenv("MODEL_PROVIDER", "openai").lower()
+    model_record_inner = os.getenv("MODEL_RECORD_INNER", "openai").lower()
+
+    # Checked when the OpenAI provider is built or the server starts, not at import.
+    openai_api_key = os.getenv("OPENAI_API_KEY", "")
 
     openai_model = os.getenv("OPENAI_MODEL", "gpt-5.1")
     log_level = os.getenv("LOG_LEVEL", "INFO")
 
+    model_deadline_seconds = _env_float("MODEL_DEADLINE_SECONDS", 120.0)
+    model_repair_max_attempts = _env_int("MODEL_REPAIR_MAX_ATTEMPTS", 2)
+    # A job must not be requeued while its worker can still be waiting on the model.
+    dashboard_job_timeout_seconds = (
+        model_deadline_seconds * (model_repair_max_attempts + 1) + _JOB_TIMEOUT_MARGIN_SECONDS
+    )
+
     return Settings(
         env=env,
         db_url=db_url,
         openai_api_key=openai_api_key,
         openai_model=openai_model,
         log_level=log_level,
+        auto_create_schema=_env_bool("AUTO_CREATE_SCHEMA", env.lower() == "dev"),
+        seed_demo_data=_env_bool("SEED_DEMO_DATA", env.lower() == "dev"),
+        db_pool_size=_env_int("DB_POOL_SIZE", 5),
+        db_max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+        db_pool_timeout_seconds=_env_float("DB_POOL_TIMEOUT_SECONDS", 30.0),
+        db_pool_recycle_seconds=_env_int("DB_POOL_RECYCLE_SECONDS", 1800),
+        db_pool_pre_ping=_env_bool("DB_POOL_PRE_PING", True),
+        db_read_url=os.getenv("DB_READ_URL", ""),
+        db_async_url=os.getenv("DB_ASYNC_URL", ""),
+        sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE", "wal").lower(),
+        sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", "normal").lower(),
+        sqlite_busy_timeout_ms=_env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        sqlite_mmap_size_bytes=_env_int("SQLITE_MMAP_SIZE_BYTES", 268_435_456),
+        sqlite_cache_size_kib=_env_int("SQLITE_CACHE_SIZE_KIB", 65_536),
+        model_provider=model_provider,
+        local_model_latency_ms=_env_float("LOCAL_MODEL_LATENCY_MS", 0.0),
+        local_model_latency_sigma=_env_float("LOCAL_MODEL_LATENCY_SIGMA", 0.0),
+        local_model_seed=_env_int("LOCAL_MODEL_SEED", 0),
+        model_recordings_dir=os.getenv("MODEL_RECORDINGS_DIR", "./model_recordings"),
+        model_record_inner=model_record_inner,
+        model_strict_schema=_env_bool("MODEL_STRICT_SCHEMA", False),
+        model_timeout_seconds=_env_float("MODEL_TIMEOUT_SECONDS", 60.0),
+        model_deadline_seconds=model_deadline_seconds,
+        model_max_attempts=_env_int("MODEL_MAX_ATTEMPTS", 3),
+        model_retry_base_delay_seconds=_env_float("MODEL_RETRY_BASE_DELAY_SECONDS", 0.5),
+        model_retry_max_delay_seconds=_env_float("MODEL_RETRY_MAX_DELAY_SECONDS", 8.0),
+        model_breaker_failure_threshold=_env_int("MODEL_BREAKER_FAILURE_THRESHOLD", 5),
+        model_breaker_reset_seconds=_env_float("MODEL_BREAKER_RESET_SECONDS", 30.0),
+        model_repair_max_attempts=model_repair_max_attempts,
+        model_input_cost_per_mtok=_env_float("MODEL_INPUT_COST_PER_MTOK", 0.0),
+        model_cached_input_cost_per_mtok=_env_float("MODEL_CACHED_INPUT_COST_PER_MTOK", 0.0),
+        model_output_cost_per_mtok=_env_float("MODEL_OUTPUT_COST_PER_MTOK", 0.0),
+        snapshot_compression=os.getenv("SNAPSHOT_COMPRESSION", "auto").lower(),
+        snapshot_delta_max_chain=_env_int("SNAPSHOT_DELTA_MAX_CHAIN", 0),
+        snapshot_retention_keep_latest=_env_int("SNAPSHOT_RETENTION_KEEP_LATEST", 3),
+        snapshot_retention_daily_days=_env_int("SNAPSHOT_RETENTION_DAILY_DAYS", 30),
+        snapshot_retention_monthly_months=_env_int("SNAPSHOT_RETENTION_MONTHLY_MONTHS", 24),
+        snapshot_retention_interval_seconds=_env_float("SNAPSHOT_RETENTION_INTERVAL_SECONDS", 0.0),
+        dashboard_job_workers=_env_int("DASHBOARD_JOB_WORKERS", 2),
+        dashboard_job_poll_seconds=_env_float("DASHBOARD_JOB_POLL_SECONDS", 1.0),
+        dashboard_job_timeout_seconds=_env_float("DASHBOARD_JOB_TIMEOUT_SECONDS", dashboard_job_timeout_seconds),
+        dashboard_job_ttl_seconds=_env_float("DASHBOARD_JOB_TTL_SECONDS", 86_400.0),
+        prewarm_windows=os.getenv("PREWARM_WINDOWS", ""),
+        prewarm_interval_seconds=_env_float("PREWARM_INTERVAL_SECONDS", 900.0),
+        prewarm_concurrency=_env_int("PREWARM_CONCURRENCY", 2),
+        prewarm_max_generations=_env_int("PREWARM_MAX_GENERATIONS", 200),
+        prewarm_budget_usd=_env_float("PREWARM_BUDGET_USD", 0.0),
+        prewarm_views_per_customer=_env_int("PREWARM_VIEWS_PER_CUSTOMER", 2),
+        prewarm_min_age_seconds=_env_float("PREWARM_MIN_AGE_SECONDS", 21_600.0),
+        compression_minimum_bytes=_env_int("COMPRESSION_MINIMUM_BYTES", 1024),
+        compression_gzip_level=_env_int("COMPRESSION_GZIP_LEVEL", 6),
+        compression_brotli_quality=_env_int("COMPRESSION_BROTLI_QUALITY", 5),
+        profiling_token=os.getenv("PROFILING_TOKEN", ""),
+        profile_dir=os.getenv("PROFILE_DIR", "./profiles"),
     )
 
 
@@ -1,18 +1,73 @@
 import logging
+import threading
+from typing import Any, Callable, Dict, List
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.schema import CreateColumn
 
 from .config import settings
 
 logger = logging.getLogger(__name__)
 
 
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """Pool sizing from settings; in-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    if _is_memory_sqlite(url):
+        return {}
+    options: Dict[str, Any] = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if make_url(url).get_backend_name() == "sqlite":
+        # Sessions are handed between the event loop and worker threads.
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def _sqlite_pragmas(read_only: bool):
+    def _on_connect(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_bytes)}")
+            # Negative cache_size is in KiB rather than pages.
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+    return _on_connect
+
+
+def build_engine(url: str, read_only: bool = False):
+    """Create an engine with pool settings and, for SQLite, connection pragmas."""
+    engine_candidate = create_engine(url, future=True, **_engine_options(url))
+    if engine_candidate.dialect.name == "sqlite":
+        event.listen(engine_candidate, "connect", _sqlite_pragmas(read_only))
+    return engine_candidate
+
+
 def _create_engine_with_fallback():
     """Create a SQLAlchemy engine and fall back to local SQLite if unavailable."""
 
     def _try_engine(url: str):
-        engine_candidate = create_engine(url, future=True)
+        engine_candidate = build_engine(url)
         with engine_candidate.connect() as conn:
             conn.execute(text("SELECT 1"))
         return engine_candidate
@@ -32,21 +87,231 @@ def _create_engine_with_fallback():
         return _try_engine(fallback_url)
 
 
-engine = _create_engine_with_fallback()
+# Engines are created on first use rather than at import, so importing models, services
+# or CLIs never opens a connection.
+_engines: Dict[str, Any] = {}
+_engine_lock = threading.Lock()
+_engine_hooks: List[Callable[[Any], None]] = []
+
+
+def register_engine_hook(hook: Callable[[Any], None]) -> None:
+    """Call `hook(sync_engine)` for every engine, including ones created later."""
+    _engine_hooks.append(hook)
+    for bound_engine in {*_engines.values(), *(e.sync_engine for e in _async_engines.values())}:
+        hook(bound_engine)
+
+
+def get_engine():
+    if "primary" not in _engines:
+        with _engine_lock:
+            if "primary" not in _engines:
+                created = _create_engine_with_fallback()
+                for hook in _engine_hooks:
+                    hook(created)
+                _engines["primary"] = created
+    return _engines["primary"]
+
+
+def get_read_engine():
+    """Read-only traffic (listings, rollups) can go to a replica; defaults to the primary engine."""
+    if not settings.db_read_url:
+        return get_engine()
+    if "read" not in _engines:
+        with _engine_lock:
+            if "read" not in _engines:
+                created = build_engine(settings.db_read_url, read_only=True)
+                for hook in _engine_hooks:
+                    hook(created)
+                _engines["read"] = created
+    return _engines["read"]
+
 
-SessionLocal = sessionmaker(
+def __getattr__(name: str):
+    # `from app.db import engine` keeps working; the engine is built on that first access.
+    if name == "engine":
+        return get_engine()
+    if name == "read_engine":
+        return get_read_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazySessionmaker(sessionmaker):
+    """A sessionmaker that binds its engine the first time a session is created."""
+
+    def __init__(self, engine_factory: Callable[[], Any], **kw: Any):
+        super().__init__(**kw)
+        self._engine_factory = engine_factory
+
+    def __call__(self, **local_kw: Any):
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._engine_factory())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(
+    get_engine,
+    autocommit=False,
+    autoflush=False,
+    future=True,
+)
+
+ReadSessionLocal = _LazySessionmaker(
+    get_read_engine,
     autocommit=False,
     autoflush=False,
-    bind=engine,
     future=True,
 )
 
 Base = declarative_base()
 
 
+def add_missing_columns(bind, metadata=None) -> List[str]:
+    """Add model columns that existing tables lack; `create_all` only creates whole tables.
+
+    Only columns that existing rows can take without a value (nullable, or with a server
+    default) are added. Returns them as `table.column`.
+    """
+    metadata = metadata if metadata is not None else Base.metadata
+    added: List[str] = []
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or column.primary_key:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    logger.warning("Cannot add NOT NULL column %s.%s without a default", table.name, column.name)
+                    continue
+                table_name = conn.dialect.identifier_preparer.format_table(table)
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+                added.append(f"{table.name}.{column.name}")
+    if added:
+        logger.info("Added missing columns: %s", ", ".join(added))
+    return added
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# --- Async engine (created on first use; needs aiosqlite or asyncpg) ---
+
+_async_engines: Dict[bool, Any] = {}
+_async_sessionmakers: Dict[bool, Any] = {}
+_async_available: Dict[bool, bool] = {}
+
+
+def async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver known for '{backend}'; set DB_ASYNC_URL explicitly")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _async_engine_url(read_only: bool) -> str:
+    if read_only and settings.db_read_url:
+        return async_url(settings.db_read_url)
+    return settings.db_async_url or async_url(settings.db_url)
+
+
+def async_driver_available(read_only: bool = False) -> bool:
+    """Whether an async URL can be derived for the database and its driver is installed."""
+    available = _async_available.get(read_only)
+    if available is None:
+        try:
+            make_url(_async_engine_url(read_only)).get_dialect().import_dbapi()
+            available = True
+        except (RuntimeError, ImportError) as exc:
+            logger.warning("Async database access unavailable (%s); using the sync engine", exc)
+            available = False
+        _async_available[read_only] = available
+    return available
+
+
+def get_async_engine(read_only: bool = False):
+    if read_only not in _async_engines:
+        with _engine_lock:
+            if read_only not in _async_engines:
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                url = _async_engine_url(read_only)
+                created = create_async_engine(url, **_engine_options(url))
+                if created.dialect.name == "sqlite":
+                    query_only = read_only and bool(settings.db_read_url)
+                    event.listen(created.sync_engine, "connect", _sqlite_pragmas(query_only))
+                for hook in _engine_hooks:
+                    hook(created.sync_engine)
+                _async_engines[read_only] = created
+    return _async_engines[read_only]
+
+
+def get_async_sessionmaker(read_only: bool = False):
+    if read_only not in _async_sessionmakers:
+        bound_engine = get_async_engine(read_only)
+        with _engine_lock:
+            if read_only not in _async_sessionmakers:
+                from sqlalchemy.ext.asyncio import async_sessionmaker
+
+                _async_sessionmakers[read_only] = async_sessionmaker(
+                    bound_engine, autoflush=False, expire_on_commit=False
+                )
+    return _async_sessionmakers[read_only]
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with get_async_sessionmaker(read_only=True)() as db:
+        yield db
+
+
+async def _async_or_sync_session(read_only: bool):
+    if not async_driver_available(read_only=read_only):
+        db = (ReadSessionLocal if read_only else SessionLocal)()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    async with get_async_sessionmaker(read_only=read_only)() as db:
+        yield db
+
+
+async def get_async_db_or_sync():
+    """An async session, or a sync one when no async driver is available (e.g. MySQL)."""
+    async for db in _async_or_sync_session(read_only=False):
+        yield db
+
+
+async def get_async_read_db_or_sync():
+    """An async read session, or a sync one when no async driver is available (e.g. MySQL)."""
+    async for db in _async_or_sync_session(read_only=True):
+        yield db
+
+
+async def dispose_async_engines() -> None:
+    for engine_candidate in list(_async_engines.values()):
+        await engine_candidate.dispose()
+    _async_engines.clear()
+    _async_sessionmakers.clear()
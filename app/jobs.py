@@ -0,0 +1,293 @@
+"""Background dashboard generation jobs.
+
+`POST /api/credit-dashboard/{id}/jobs` enqueues a row in `dashboard_jobs` and returns at
+once; worker threads claim queued rows, run `generate_dashboard_for_customer` and store
+the result or error together with queue and run timings. A second request for a view that
+already has a queued or running job coalesces onto it.
+
+Workers run inside the API process (`DASHBOARD_JOB_WORKERS`, default 2) or separately:
+
+    DASHBOARD_JOB_WORKERS=0 uvicorn main:app ...
+    python -m app.jobs --workers 4
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .metrics import DASHBOARD_JOB_SECONDS, DASHBOARD_JOBS_TOTAL
+from .models import DashboardJob
+from .services.credit_agent_service import generate_dashboard_for_customer
+from .services.resilience import ModelUnavailableError
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+MAX_ATTEMPTS = 3
+_MAINTENANCE_INTERVAL_SECONDS = 60.0
+
+# Set on enqueue so in-process workers pick new jobs up without waiting for the next poll.
+_wakeup = threading.Event()
+
+
+def dedupe_key(
+    customer_id: int,
+    viewer_type: str,
+    usage_mode: Optional[str],
+    subscription_tier: Optional[str],
+    lender_id: Optional[str],
+) -> str:
+    return "|".join(str(part or "") for part in (customer_id, viewer_type, usage_mode, subscription_tier, lender_id))
+
+
+def _active_job(db: Session, key: str) -> Optional[DashboardJob]:
+    return db.execute(
+        select(DashboardJob).where(DashboardJob.dedupe_key == key, DashboardJob.status.in_(ACTIVE_STATUSES))
+    ).scalars().first()
+
+
+def enqueue_job(
+    db: Session,
+    customer_id: int,
+    viewer_type: str = "silky_internal",
+    usage_mode: Optional[str] = None,
+    subscription_tier: Optional[str] = None,
+    lender_id: Optional[str] = None,
+) -> Tuple[DashboardJob, bool]:
+    """Queue a generation; returns (job, coalesced) where coalesced means it already existed."""
+    key = dedupe_key(customer_id, viewer_type, usage_mode, subscription_tier, lender_id)
+    existing = _active_job(db, key)
+    if existing is not None:
+        DASHBOARD_JOBS_TOTAL.inc(outcome="coalesced")
+        return existing, True
+
+    job = DashboardJob(
+        id=uuid.uuid4().hex,
+        dedupe_key=key,
+        customer_id=customer_id,
+        viewer_type=viewer_type,
+        usage_mode=usage_mode,
+        subscription_tier=subscription_tier,
+        lender_id=lender_id,
+        status="queued",
+        attempts=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost the race against a concurrent enqueue for the same view.
+        db.rollback()
+        existing = _active_job(db, key)
+        if existing is None:
+            raise
+        DASHBOARD_JOBS_TOTAL.inc(outcome="coalesced")
+        return existing, True
+
+    DASHBOARD_JOBS_TOTAL.inc(outcome="enqueued")
+    _wakeup.set()
+    return job, False
+
+
+def get_job(db: Session, job_id: str) -> Optional[DashboardJob]:
+    return db.get(DashboardJob, job_id)
+
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[DashboardJob]:
+    """Atomically move the oldest queued job to running; None when the queue is empty."""
+    for _ in range(5):
+        candidate = db.execute(
+            select(DashboardJob.id)
+            .where(DashboardJob.status == "queued")
+            .order_by(DashboardJob.created_at)
+            .limit(1)
+        ).scalar()
+        if candidate is None:
+            return None
+        claimed = db.execute(
+            update(DashboardJob)
+            .where(DashboardJob.id == candidate, DashboardJob.status == "queued")
+            .values(
+                status="running",
+                started_at=datetime.utcnow(),
+                worker_id=worker_id,
+                attempts=DashboardJob.attempts + 1,
+            )
+        )
+        db.commit()
+        if claimed.rowcount == 1:
+            return db.get(DashboardJob, candidate)
+    return None
+
+
+def _retired_key():
+    # Frees the view's key for the next job; the job id keeps retired keys unique.
+    return DashboardJob.dedupe_key + "#" + DashboardJob.id
+
+
+def _finish(db: Session, job_id: str, worker_id: str, status: str, run_started: float, **values) -> None:
+    run_ms = (time.perf_counter() - run_started) * 1000
+    # Only the worker still holding the claim may record the outcome; a job requeued as
+    # stale may already belong to another worker.
+    finished = db.execute(
+        update(DashboardJob)
+        .where(DashboardJob.id == job_id, DashboardJob.status == "running", DashboardJob.worker_id == worker_id)
+        .values(
+            status=status, finished_at=datetime.utcnow(), run_ms=run_ms, dedupe_key=_retired_key(), **values
+        )
+    ).rowcount
+    db.commit()
+    if finished == 0:
+        logger.warning("Dashboard job %s was reclaimed; dropping the %s result of worker %s", job_id, status, worker_id)
+        return
+    DASHBOARD_JOBS_TOTAL.inc(outcome=status)
+    DASHBOARD_JOB_SECONDS.observe(run_ms / 1000, phase="run")
+
+
+def run_job(db: Session, job: DashboardJob) -> None:
+    job_id, worker_id = job.id, job.worker_id
+    queue_ms = (job.started_at - job.created_at).total_seconds() * 1000
+    DASHBOARD_JOB_SECONDS.observe(queue_ms / 1000, phase="queue")
+    run_started = time.perf_counter()
+    try:
+        dashboard = generate_dashboard_for_customer(
+            db=db,
+            customer_id=job.customer_id,
+            viewer_type=job.viewer_type,
+            usage_mode=job.usage_mode,
+            subscription_tier=job.subscription_tier,
+            lender_id=job.lender_id,
+        )
+    except (ValueError, ModelUnavailableError) as exc:
+        db.rollback()
+        _finish(db, job_id, worker_id, "failed", run_started, queue_ms=queue_ms, error=str(exc))
+    except Exception:  # noqa: BLE001
+        logger.exception("Dashboard job %s failed", job_id)
+        db.rollback()
+        _finish(db, job_id, worker_id, "failed", run_started, queue_ms=queue_ms, error="Internal error")
+    else:
+        _finish(
+            db, job_id, worker_id, "succeeded", run_started, queue_ms=queue_ms, result_json=dashboard.model_dump_json()
+        )
+
+
+def requeue_stale_jobs(db: Session, timeout_seconds: float) -> int:
+    """Requeue running jobs whose worker died; fail them after `MAX_ATTEMPTS`."""
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    stale = DashboardJob.status == "running", DashboardJob.started_at < cutoff
+    requeued = db.execute(
+        update(DashboardJob).where(*stale, DashboardJob.attempts < MAX_ATTEMPTS).values(status="queued", worker_id=None)
+    ).rowcount
+    db.execute(
+        update(DashboardJob)
+        .where(*stale)
+        .values(status="failed", finished_at=datetime.utcnow(), error="Timed out", dedupe_key=_retired_key())
+    )
+    db.commit()
+    return requeued
+
+
+def purge_finished_jobs(db: Session, ttl_seconds: float) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+    deleted = (
+        db.query(DashboardJob)
+        .filter(DashboardJob.status.notin_(ACTIVE_STATUSES), DashboardJob.finished_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+class DashboardJobWorker:
+    """A pool of threads that claim and run dashboard jobs."""
+
+    def __init__(
+        self,
+        workers: int,
+        poll_seconds: Optional[float] = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ):
+        if session_factory is None:
+            from .db import SessionLocal
+
+            session_factory = SessionLocal
+        self.workers = workers
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.dashboard_job_poll_seconds
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(index,), name=f"dashboard-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def run_once(self, worker_id: Optional[str] = None) -> bool:
+        """Claim and run one job; returns False when the queue is empty."""
+        with self.session_factory() as db:
+            job = claim_next_job(db, worker_id or f"{self._prefix}-inline")
+            if job is None:
+                return False
+            run_job(db, job)
+            return True
+
+    def _maintain(self) -> None:
+        with self.session_factory() as db:
+            requeued = requeue_stale_jobs(db, settings.dashboard_job_timeout_seconds)
+            purged = purge_finished_jobs(db, settings.dashboard_job_ttl_seconds)
+        if requeued or purged:
+            logger.info("Dashboard jobs: requeued %s stale, purged %s finished", requeued, purged)
+
+    def _run(self, index: int) -> None:
+        worker_id = f"{self._prefix}-{index}"
+        last_maintenance = 0.0
+        while not self._stop.is_set():
+            try:
+                if index == 0 and time.monotonic() - last_maintenance > _MAINTENANCE_INTERVAL_SECONDS:
+                    last_maintenance = time.monotonic()
+                    self._maintain()
+                if self.run_once(worker_id):
+                    continue
+            except Exception:  # noqa: BLE001
+                logger.exception("Dashboard job worker %s crashed; continuing", worker_id)
+            if _wakeup.wait(self.poll_seconds):
+                _wakeup.clear()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(1, settings.dashboard_job_workers))
+    parser.add_argument("--poll-seconds", type=float, default=settings.dashboard_job_poll_seconds)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, settings.log_level.upper(), logging.INFO))
+    worker = DashboardJobWorker(args.workers, args.poll_seconds)
+    worker.start()
+    logger.info("Running %s dashboard job workers", args.workers)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
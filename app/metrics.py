@@ -0,0 +1,292 @@
+"""Low-overhead in-process metrics with Prometheus text exposition.
+
+Metrics are plain Python objects guarded by a lock per metric; recording a sample is a
+dict lookup, a bisect and a couple of additions, cheap enough to leave on in production.
+`REGISTRY.render()` produces the text format served on `/metrics`.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items)
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Application metrics ---
+
+HTTP_REQUEST_SECONDS: Histogram = REGISTRY.register(
+    Histogram("silky_http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status"))
+)
+DB_QUERIES_PER_REQUEST: Histogram = REGISTRY.register(
+    Histogram(
+        "silky_db_queries_per_request",
+        "SQL statements executed per HTTP request.",
+        ("route",),
+        buckets=(1, 2, 5, 10, 20, 50, 100, 250, 1000),
+    )
+)
+DASHBOARD_STAGE_SECONDS: Histogram = REGISTRY.register(
+    Histogram("silky_dashboard_stage_seconds", "Time spent in each dashboard generation stage.", ("stage",))
+)
+DASHBOARD_CACHE_TOTAL: Counter = REGISTRY.register(
+    Counter("silky_dashboard_cache_total", "Dashboard snapshot cache outcomes (hit, miss, stale).", ("result",))
+)
+MODEL_CALLS_TOTAL: Counter = REGISTRY.register(
+    Counter("silky_model_calls_total", "Model calls by outcome.", ("provider", "outcome"))
+)
+MODEL_TOKENS_TOTAL: Counter = REGISTRY.register(
+    Counter("silky_model_tokens_total", "Model tokens consumed by kind (input, cached_input, output).", ("kind",))
+)
+MODEL_CACHED_INPUT_RATIO: Histogram = REGISTRY.register(
+    Histogram(
+        "silky_model_cached_input_ratio",
+        "Share of each model call's input tokens served from the provider's prompt cache.",
+        buckets=(0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 1.0),
+    )
+)
+MODEL_REPAIRS_TOTAL: Counter = REGISTRY.register(
+    Counter("silky_model_repairs_total", "Validation repairs of model output by outcome (repaired, failed).", ("outcome",))
+)
+SNAPSHOTS_DELETED_TOTAL: Counter = REGISTRY.register(
+    Counter("silky_snapshots_deleted_total", "Snapshots removed by the retention job.")
+)
+DASHBOARD_JOBS_TOTAL: Counter = REGISTRY.register(
+    Counter("silky_dashboard_jobs_total", "Dashboard jobs by outcome (enqueued, coalesced, succeeded, failed).", ("outcome",))
+)
+DASHBOARD_JOB_SECONDS: Histogram = REGISTRY.register(
+    Histogram("silky_dashboard_job_seconds", "Dashboard job time spent queued and running.", ("phase",))
+)
+PREWARM_TOTAL: Counter = REGISTRY.register(
+    Counter(
+        "silky_prewarm_total",
+        "Pre-warm scheduler outcomes per view (generated, failed, skipped_cap, skipped_budget).",
+        ("outcome",),
+    )
+)
+MODEL_CALLS_IN_FLIGHT: Gauge = REGISTRY.register(
+    Gauge("silky_model_calls_in_flight", "Model calls currently waiting on the provider.")
+)
+
+
+# --- Per-request SQL statement counting ---
+
+
+class _QueryCount:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+_current_query_count: contextvars.ContextVar[Optional[_QueryCount]] = contextvars.ContextVar(
+    "silky_query_count", default=None
+)
+
+
+def _count_query(*_args) -> None:
+    counter = _current_query_count.get()
+    if counter is not None:
+        counter.count += 1
+
+
+def instrument_engine(engine) -> None:
+    """Count SQL statements issued on `engine` against the current request."""
+    if not event.contains(engine, "before_cursor_execute", _count_query):
+        event.listen(engine, "before_cursor_execute", _count_query)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency and SQL statements per request.
+
+    The query counter lives in a context variable, which Starlette copies into the
+    worker thread that runs sync endpoints, so statements issued there are attributed
+    to the right request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = _QueryCount()
+        token = _current_query_count.set(counter)
+        status = {"code": 500}
+        started = time.perf_counter()
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current_query_count.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route_path,
+                status=str(status["code"]),
+            )
+            DB_QUERIES_PER_REQUEST.observe(counter.count, route=route_path)
@@ -0,0 +1,71 @@
+"""Idempotent schema upgrades and backfills for existing databases.
+
+`Base.metadata.create_all` only creates missing tables. These steps bring tables created
+by earlier versions up to date:
+
+- add columns introduced since (`add_missing_columns`),
+- move inline `dashboard_json` payloads to the payload table (`migrate_inline_payloads`),
+- backfill the latest-snapshot pointers and the portfolio rollup when they are empty.
+
+Startup runs them on every boot, whatever `AUTO_CREATE_SCHEMA` says; each one is a no-op
+once done. Deployments that keep `AUTO_CREATE_SCHEMA` off create missing tables and run
+the upgrades ahead of a release with:
+
+    python -m app.migrate
+    python -m app.migrate --db-url postgresql+psycopg2://...
+"""
+import argparse
+import logging
+from typing import List, Optional
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .db import Base, add_missing_columns
+from .services.portfolio import ensure_portfolio_rollup
+from .services.snapshot_store import ensure_latest_pointers, migrate_inline_payloads
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_database(engine=None) -> bool:
+    """Run every upgrade step; returns False (and changes nothing) while tables are missing."""
+    if engine is None:
+        from .db import get_engine
+
+        engine = get_engine()
+    inspector = inspect(engine)
+    missing = sorted(name for name in Base.metadata.tables if not inspector.has_table(name))
+    if missing:
+        logger.warning(
+            "Skipping schema upgrades; tables missing: %s. Run `python -m app.migrate` or set AUTO_CREATE_SCHEMA.",
+            ", ".join(missing),
+        )
+        return False
+
+    add_missing_columns(engine)
+    with Session(engine) as db:
+        migrate_inline_payloads(db)
+        ensure_latest_pointers(db)
+        ensure_portfolio_rollup(db)
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=None, help="Target database (defaults to DB_URL)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, settings.log_level.upper(), logging.INFO))
+    if args.db_url:
+        engine = create_engine(args.db_url, future=True)
+    else:
+        from .db import engine
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_database(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
+    LargeBinary,
     Text,
 )
 from sqlalchemy.orm import relationship
@@ -118,8 +120,6 @@ class SilkyCreditProfileSnapshot(Base):
     subscription_tier = Column(String(32), nullable=True)
     lender_id = Column(String(64), nullable=True)
 
-    dashboard_json = Column(Text, nullable=False)
-
     credit_score = Column(Integer, nullable=False)
     credit_band = Column(String(4), nullable=False)
     recommended_credit_limit_amount = Column(Float, nullable=False)
@@ -131,4 +131,157 @@ class SilkyCreditProfileSnapshot(Base):
     model_provider = Column(String(50), nullable=True)
     input_data_date_range = Column(String(100), nullable=True)
 
+    # Model usage & cost accounting (null for snapshots not produced by a model call)
+    input_tokens = Column(Integer, nullable=True)
+    output_tokens = Column(Integer, nullable=True)
+    cached_tokens = Column(Integer, nullable=True)
+    model_latency_ms = Column(Float, nullable=True)
+    estimated_cost_usd = Column(Float, nullable=True)
+
+    # `CustomerDataVersion.version` the features were extracted at (null for older snapshots)
+    data_version = Column(Integer, nullable=True)
+
     customer = relationship("Customer", back_populates="credit_profiles")
+    payload = relationship(
+        "SilkyCreditSnapshotPayload",
+        uselist=False,
+        foreign_keys="SilkyCreditSnapshotPayload.snapshot_id",
+        back_populates="snapshot",
+    )
+
+    # Serves per-customer history range scans.
+    __table_args__ = (Index("ix_snapshots_customer_snapshot_at", "customer_id", "snapshot_at"),)
+
+
+class CustomerDataVersion(Base):
+    """Counter bumped whenever a customer's source rows are written (see `data_versions`).
+
+    A cached snapshot is current while its `data_version` equals this `version`.
+    """
+
+    __tablename__ = "customer_data_versions"
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class LatestCreditSnapshot(Base):
+    """Pointer to the current snapshot per cache key, upserted with every snapshot insert.
+
+    `lender_key` is `lender_id` with NULL stored as "" so it can be part of the primary key.
+    """
+
+    __tablename__ = "latest_credit_snapshots"
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    viewer_type = Column(String(32), primary_key=True)
+    usage_mode = Column(String(32), primary_key=True)
+    subscription_tier = Column(String(32), primary_key=True)
+    lender_key = Column(String(64), primary_key=True, default="")
+    snapshot_id = Column(Integer, ForeignKey("silky_credit_profile_snapshots.id"), nullable=False)
+    snapshot_at = Column(DateTime, nullable=False)
+    data_version = Column(Integer, nullable=True)
+    # Cache hits served from this view; the pre-warm scheduler refreshes the most-viewed first.
+    hits = Column(Integer, default=0, server_default="0", nullable=False)
+    last_hit_at = Column(DateTime, nullable=True)
+
+    snapshot = relationship("SilkyCreditProfileSnapshot")
+
+
+class PortfolioPosition(Base):
+    """A customer's current assessment per lender ("" = no lender), from its newest snapshot.
+
+    Kept alongside `PortfolioRollup` so a new snapshot can subtract the position it
+    replaces before adding its own contribution.
+    """
+
+    __tablename__ = "portfolio_positions"
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    lender_key = Column(String(64), primary_key=True, default="")
+    snapshot_id = Column(Integer, nullable=False)
+    snapshot_at = Column(DateTime, nullable=False)
+    segment = Column(String(100), nullable=False, default="")
+    city = Column(String(50), nullable=False, default="")
+    credit_score = Column(Integer, nullable=False)
+    credit_band = Column(String(4), nullable=False)
+    exposure = Column(Float, nullable=False)
+    currency = Column(String(8), nullable=False)
+    tenor_months = Column(Integer, nullable=False)
+
+
+class PortfolioRollup(Base):
+    """Running totals of `portfolio_positions` per dimension value, band and currency.
+
+    `dimension` is one of all | segment | city | lender; averages are the sums divided
+    by `positions`.
+    """
+
+    __tablename__ = "portfolio_rollups"
+
+    dimension = Column(String(16), primary_key=True)
+    dimension_value = Column(String(100), primary_key=True)
+    credit_band = Column(String(4), primary_key=True)
+    currency = Column(String(8), primary_key=True)
+    positions = Column(Integer, nullable=False, default=0)
+    exposure = Column(Float, nullable=False, default=0.0)
+    tenor_months_sum = Column(Integer, nullable=False, default=0)
+    credit_score_sum = Column(Integer, nullable=False, default=0)
+
+
+class SilkyCreditSnapshotPayload(Base):
+    """Full dashboard JSON for a snapshot, kept out of the hot summary table.
+
+    `data` is compressed with `codec`; when `base_snapshot_id` is set it holds a
+    top-level-key delta against that snapshot's payload (see `snapshot_store`).
+    """
+
+    __tablename__ = "silky_credit_snapshot_payloads"
+
+    snapshot_id = Column(Integer, ForeignKey("silky_credit_profile_snapshots.id"), primary_key=True)
+    codec = Column(String(8), nullable=False)  # gzip | zstd
+    base_snapshot_id = Column(Integer, ForeignKey("silky_credit_profile_snapshots.id"), nullable=True)
+    chain_depth = Column(Integer, default=0, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    snapshot = relationship(
+        "SilkyCreditProfileSnapshot", foreign_keys=[snapshot_id], back_populates="payload"
+    )
+
+
+class DashboardJob(Base):
+    """A queued dashboard generation, claimed and run by `app.jobs` workers.
+
+    `dedupe_key` identifies the requested view while the job is queued or running; a
+    finished job gets its id appended to it. The unique index therefore allows only one
+    active job per view on every backend, so duplicate requests coalesce onto it.
+    """
+
+    __tablename__ = "dashboard_jobs"
+
+    id = Column(String(32), primary_key=True)
+    dedupe_key = Column(String(255), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    viewer_type = Column(String(32), nullable=False)
+    usage_mode = Column(String(32), nullable=True)
+    subscription_tier = Column(String(32), nullable=True)
+    lender_id = Column(String(64), nullable=True)
+
+    status = Column(String(16), nullable=False, default="queued")  # queued | running | succeeded | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    queue_ms = Column(Float, nullable=True)
+    run_ms = Column(Float, nullable=True)
+
+    result_json = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("uq_dashboard_jobs_active", "dedupe_key", unique=True),
+        Index("ix_dashboard_jobs_status_created", "status", "created_at"),
+    )
@@ -0,0 +1,338 @@
+"""Off-peak pre-warming of dashboards whose underlying data changed.
+
+Inside the configured UTC windows (`PREWARM_WINDOWS`, e.g. "01:00-05:00"), the scheduler:
+
+1. finds cached views built from an older customer data version (see
+   `services.data_versions`), plus customers that have never been generated;
+2. keeps each customer's `PREWARM_VIEWS_PER_CUSTOMER` most-viewed outdated views that are
+   older than `PREWARM_MIN_AGE_SECONDS`;
+3. ranks them by staleness, recent activity and credit exposure;
+4. regenerates them with `PREWARM_CONCURRENCY` parallel model calls until the generation
+   cap or the estimated-cost budget is reached.
+
+    python -m app.prewarm --dry-run
+    python -m app.prewarm --ignore-window
+"""
+import argparse
+import json
+import logging
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .metrics import PREWARM_TOTAL
+from .models import (
+    Customer,
+    CustomerDataVersion,
+    LatestCreditSnapshot,
+    PosTransaction,
+    SilkyCreditProfileSnapshot,
+    UsageEvent,
+)
+from .services.credit_agent_service import generate_dashboard_for_customer, model_breaker
+
+logger = logging.getLogger(__name__)
+
+Snapshot = SilkyCreditProfileSnapshot
+
+ACTIVITY_DAYS = 7
+# Relative weights of the log-scaled ranking signals.
+STALENESS_WEIGHT = 1.0
+ACTIVITY_WEIGHT = 1.0
+EXPOSURE_WEIGHT = 0.5
+
+Window = Tuple[dt_time, dt_time]
+
+
+def parse_windows(spec: str) -> List[Window]:
+    """Parse "HH:MM-HH:MM[,HH:MM-HH:MM...]"; a window may wrap past midnight."""
+    windows: List[Window] = []
+    for part in filter(None, (chunk.strip() for chunk in spec.split(","))):
+        try:
+            start, end = (dt_time.fromisoformat(value.strip()) for value in part.split("-"))
+        except ValueError:
+            raise ValueError(f"Invalid pre-warm window '{part}'; expected HH:MM-HH:MM") from None
+        windows.append((start, end))
+    return windows
+
+
+def in_window(now: datetime, windows: List[Window]) -> bool:
+    current = now.time()
+    for start, end in windows:
+        if start <= end:
+            if start <= current < end:
+                return True
+        elif current >= start or current < end:
+            return True
+    return False
+
+
+@dataclass
+class PrewarmCandidate:
+    customer_id: int
+    viewer_type: str
+    usage_mode: Optional[str]
+    subscription_tier: Optional[str]
+    lender_id: Optional[str]
+    snapshot_at: Optional[datetime]
+    hits: int
+    activity: int
+    exposure: float
+    score: float = 0.0
+
+
+@dataclass
+class PrewarmReport:
+    candidates: int = 0
+    generated: int = 0
+    failed: int = 0
+    skipped_cap: int = 0
+    skipped_budget: int = 0
+    estimated_cost_usd: float = 0.0
+    dry_run: bool = False
+    duration_s: float = 0.0
+    views: List[Dict[str, object]] = field(default_factory=list)
+
+
+def _score(candidate: PrewarmCandidate, now: datetime) -> float:
+    if candidate.snapshot_at is None:
+        staleness_hours = 24.0 * 30
+    else:
+        staleness_hours = max(0.0, (now - candidate.snapshot_at).total_seconds() / 3600)
+    return (
+        STALENESS_WEIGHT * math.log1p(staleness_hours)
+        + ACTIVITY_WEIGHT * math.log1p(candidate.activity)
+        + EXPOSURE_WEIGHT * math.log1p(max(candidate.exposure, 0.0)) / math.log(10)
+    )
+
+
+def find_candidates(db: Session, now: Optional[datetime] = None) -> List[PrewarmCandidate]:
+    """Outdated views ranked best-first, from a handful of set-based queries."""
+    now = now or datetime.utcnow()
+    min_age_cutoff = now - timedelta(seconds=settings.prewarm_min_age_seconds)
+
+    activity_since = now - timedelta(days=ACTIVITY_DAYS)
+    activity: Dict[int, int] = dict(
+        db.execute(
+            select(UsageEvent.customer_id, func.count())
+            .where(UsageEvent.timestamp >= activity_since)
+            .group_by(UsageEvent.customer_id)
+        ).all()
+    )
+    for customer_id, count in db.execute(
+        select(PosTransaction.customer_id, func.count())
+        .where(PosTransaction.date >= activity_since.date())
+        .group_by(PosTransaction.customer_id)
+    ):
+        activity[customer_id] = activity.get(customer_id, 0) + count
+
+    generated = set(db.execute(select(LatestCreditSnapshot.customer_id).distinct()).scalars())
+    views_by_customer: Dict[int, List[PrewarmCandidate]] = {}
+    rows = db.execute(
+        select(
+            LatestCreditSnapshot.customer_id,
+            LatestCreditSnapshot.viewer_type,
+            LatestCreditSnapshot.usage_mode,
+            LatestCreditSnapshot.subscription_tier,
+            LatestCreditSnapshot.lender_key,
+            LatestCreditSnapshot.snapshot_at,
+            LatestCreditSnapshot.hits,
+            Snapshot.recommended_credit_limit_amount,
+        )
+        .join(Snapshot, Snapshot.id == LatestCreditSnapshot.snapshot_id)
+        .outerjoin(CustomerDataVersion, CustomerDataVersion.customer_id == LatestCreditSnapshot.customer_id)
+        .where(func.coalesce(LatestCreditSnapshot.data_version, 0) != func.coalesce(CustomerDataVersion.version, 0))
+        .order_by(LatestCreditSnapshot.customer_id, LatestCreditSnapshot.hits.desc())
+    )
+    for customer_id, viewer_type, usage_mode, tier, lender, snapshot_at, hits, exposure in rows:
+        if snapshot_at > min_age_cutoff:
+            continue
+        views = views_by_customer.setdefault(customer_id, [])
+        if len(views) >= settings.prewarm_views_per_customer:
+            continue
+        views.append(
+            PrewarmCandidate(
+                customer_id, viewer_type, usage_mode, tier, lender or None, snapshot_at, hits or 0,
+                activity.get(customer_id, 0), exposure or 0.0,
+            )
+        )
+
+    candidates: List[PrewarmCandidate] = []
+    for (customer_id,) in db.execute(select(Customer.id)):
+        if customer_id not in generated:
+            # Never generated: warm the default internal view.
+            candidates.append(
+                PrewarmCandidate(customer_id, "silky_internal", None, None, None, None, 0, activity.get(customer_id, 0), 0.0)
+            )
+            continue
+        candidates.extend(views_by_customer.get(customer_id, []))
+
+    for candidate in candidates:
+        candidate.score = _score(candidate, now)
+    candidates.sort(key=lambda candidate: (-candidate.score, -candidate.hits, candidate.customer_id))
+    return candidates
+
+
+def _estimated_cost_per_generation(db: Session) -> float:
+    recent = (
+        select(Snapshot.estimated_cost_usd)
+        .where(Snapshot.estimated_cost_usd.isnot(None))
+        .order_by(Snapshot.snapshot_at.desc())
+        .limit(100)
+        .subquery()
+    )
+    return float(db.execute(select(func.avg(recent.c.estimated_cost_usd))).scalar() or 0.0)
+
+
+def run_prewarm(
+    session_factory: Callable[[], Session],
+    max_generations: Optional[int] = None,
+    budget_usd: Optional[float] = None,
+    concurrency: Optional[int] = None,
+    dry_run: bool = False,
+    now: Optional[datetime] = None,
+) -> PrewarmReport:
+    max_generations = settings.prewarm_max_generations if max_generations is None else max_generations
+    budget_usd = settings.prewarm_budget_usd if budget_usd is None else budget_usd
+    concurrency = concurrency or settings.prewarm_concurrency
+    started = time.perf_counter()
+    report = PrewarmReport(dry_run=dry_run)
+
+    with session_factory() as db:
+        candidates = find_candidates(db, now)
+        unit_cost = _estimated_cost_per_generation(db)
+    report.candidates = len(candidates)
+
+    selected: List[PrewarmCandidate] = []
+    for candidate in candidates:
+        if len(selected) >= max_generations:
+            report.skipped_cap += 1
+        elif budget_usd > 0 and report.estimated_cost_usd + unit_cost > budget_usd:
+            report.skipped_budget += 1
+        else:
+            selected.append(candidate)
+            report.estimated_cost_usd += unit_cost
+    for outcome in ("skipped_cap", "skipped_budget"):
+        if getattr(report, outcome):
+            PREWARM_TOTAL.inc(getattr(report, outcome), outcome=outcome)
+    report.views = [
+        {key: value for key, value in asdict(candidate).items() if key != "snapshot_at"} for candidate in selected
+    ]
+
+    if dry_run:
+        report.duration_s = time.perf_counter() - started
+        return report
+
+    lock = threading.Lock()
+
+    def _generate(candidate: PrewarmCandidate) -> None:
+        # Leave the remaining budget alone while upstream is down; interactive traffic
+        # falls back to stale snapshots anyway.
+        if model_breaker.state == "open":
+            outcome = "failed"
+        else:
+            try:
+                with session_factory() as db:
+                    generate_dashboard_for_customer(
+                        db=db,
+                        customer_id=candidate.customer_id,
+                        viewer_type=candidate.viewer_type,
+                        usage_mode=candidate.usage_mode,
+                        subscription_tier=candidate.subscription_tier,
+                        lender_id=candidate.lender_id,
+                        force_refresh=True,
+                    )
+                outcome = "generated"
+            except Exception:  # noqa: BLE001
+                logger.exception("Pre-warm failed for customer_id=%s viewer_type=%s", candidate.customer_id, candidate.viewer_type)
+                outcome = "failed"
+        PREWARM_TOTAL.inc(outcome=outcome)
+        with lock:
+            setattr(report, outcome, getattr(report, outcome) + 1)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="prewarm") as pool:
+        list(pool.map(_generate, selected))
+
+    report.duration_s = time.perf_counter() - started
+    logger.info(
+        "Pre-warm: candidates=%s generated=%s failed=%s skipped_cap=%s skipped_budget=%s",
+        report.candidates,
+        report.generated,
+        report.failed,
+        report.skipped_cap,
+        report.skipped_budget,
+    )
+    return report
+
+
+class PrewarmScheduler:
+    """Runs `run_prewarm` every `interval_seconds` while inside an off-peak window."""
+
+    def __init__(self, windows: List[Window], interval_seconds: float, session_factory: Optional[Callable[[], Session]] = None):
+        if session_factory is None:
+            from .db import SessionLocal
+
+            session_factory = SessionLocal
+        self.windows = windows
+        self.interval_seconds = interval_seconds
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="dashboard-prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            if not in_window(datetime.utcnow(), self.windows):
+                continue
+            try:
+                run_prewarm(self.session_factory)
+            except Exception:  # noqa: BLE001
+                logger.exception("Pre-warm run failed")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-generations", type=int, default=settings.prewarm_max_generations)
+    parser.add_argument("--budget-usd", type=float, default=settings.prewarm_budget_usd)
+    parser.add_argument("--concurrency", type=int, default=settings.prewarm_concurrency)
+    parser.add_argument("--dry-run", action="store_true", help="Rank and list views without generating")
+    parser.add_argument("--ignore-window", action="store_true", help="Run even outside PREWARM_WINDOWS")
+    args = parser.parse_args(argv)
+
+    windows = parse_windows(settings.prewarm_windows)
+    if not args.ignore_window and not args.dry_run and not in_window(datetime.utcnow(), windows):
+        print("Outside the configured PREWARM_WINDOWS; pass --ignore-window to run anyway.", file=sys.stderr)
+        sys.exit(1)
+
+    from .db import SessionLocal
+
+    report = run_prewarm(
+        SessionLocal,
+        max_generations=args.max_generations,
+        budget_usd=args.budget_usd,
+        concurrency=args.concurrency,
+        dry_run=args.dry_run,
+    )
+    print(json.dumps(asdict(report), indent=2, default=str), file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Opt-in, per-request profiling for diagnosing slow requests in place.
+
+A request is profiled when it carries `X-Silky-Profile: <PROFILING_TOKEN>` (or
+`?silky_profile=<PROFILING_TOKEN>`); with no token configured profiling is disabled.
+Endpoints decorated with `@profiled` then run under cProfile in their worker thread, every
+SQL statement is captured with its duration, and generation stages are timed. The
+results are written to `PROFILE_DIR/<id>.prof` (pstats, e.g. for snakeviz) and
+`PROFILE_DIR/<id>.json` (timing breakdown, SQL log, hottest functions), and the id is
+returned in the `X-Silky-Profile-Id` response header.
+"""
+import contextvars
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import json
+import logging
+import pstats
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-silky-profile"
+PROFILE_QUERY_PARAM = "silky_profile"
+PROFILE_ID_HEADER = b"x-silky-profile-id"
+_MAX_SQL_STATEMENTS = 5000
+
+
+class ProfileSession:
+    def __init__(self, method: str, path: str):
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.sql: List[Dict[str, Any]] = []
+        self.stages: Dict[str, float] = {}
+        # One per thread the request ran Python in (the event loop and worker threads).
+        self.profilers: List[cProfile.Profile] = []
+
+    def record_sql(self, statement: str, duration: float, executemany: bool) -> None:
+        if len(self.sql) < _MAX_SQL_STATEMENTS:
+            self.sql.append(
+                {
+                    "statement": statement,
+                    "duration_ms": round(duration * 1000, 3),
+                    "executemany": executemany,
+                    "offset_ms": round((time.perf_counter() - self.started) * 1000, 3),
+                }
+            )
+
+    def record_stage(self, stage: str, duration: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + duration
+
+    def write(self, directory: Path, status: int) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        top_functions = ""
+        if self.profilers:
+            buffer = io.StringIO()
+            stats = pstats.Stats(*self.profilers, stream=buffer)
+            stats.dump_stats(str(directory / f"{self.id}.prof"))
+            stats.sort_stats("cumulative").print_stats(30)
+            top_functions = buffer.getvalue()
+
+        sql_total = sum(item["duration_ms"] for item in self.sql)
+        report = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "sql_count": len(self.sql),
+            "sql_total_ms": round(sql_total, 3),
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            "sql": self.sql,
+            "top_functions": top_functions,
+        }
+        (directory / f"{self.id}.json").write_text(json.dumps(report, indent=2))
+
+
+_current_session: contextvars.ContextVar[Optional[ProfileSession]] = contextvars.ContextVar(
+    "silky_profile_session", default=None
+)
+
+
+def current_session() -> Optional[ProfileSession]:
+    return _current_session.get()
+
+
+def record_stage(stage: str, duration: float) -> None:
+    session = _current_session.get()
+    if session is not None:
+        session.record_stage(stage, duration)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_session.get() is not None:
+        conn.info.setdefault("silky_profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    session = _current_session.get()
+    if session is None:
+        return
+    started = conn.info.get("silky_profile_started")
+    if started:
+        session.record_sql(statement, time.perf_counter() - started.pop(), executemany)
+
+
+def instrument_engine(engine) -> None:
+    """Capture SQL statements and durations for profiled requests."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def profiled(fn):
+    """Run an endpoint under cProfile when the current request is being profiled.
+
+    Sync endpoints execute in a worker thread and cProfile only sees the thread that
+    enabled it, so the profiler has to be switched on here rather than in middleware.
+    Async endpoints are profiled on the event loop thread, so coroutines of concurrent
+    requests interleaved with the profiled one show up in its report too; sync functions
+    they hand to a worker thread can be decorated as well, and their profiles are merged.
+    """
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            session = _current_session.get()
+            if session is None:
+                return await fn(*args, **kwargs)
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+                session.profilers.append(profiler)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        session = _current_session.get()
+        if session is None:
+            return fn(*args, **kwargs)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            session.profilers.append(profiler)
+
+    return wrapper
+
+
+def _requested_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers") or []:
+        if name == PROFILE_HEADER.encode("latin-1"):
+            return value.decode("latin-1")
+    query = parse_qs((scope.get("query_string") or b"").decode("latin-1"))
+    values = query.get(PROFILE_QUERY_PARAM)
+    return values[0] if values else None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware that starts a `ProfileSession` for authorised requests."""
+
+    def __init__(self, app, token: Optional[str] = None, directory: Optional[str] = None):
+        self.app = app
+        self.token = token if token is not None else settings.profiling_token
+        self.directory = Path(directory or settings.profile_dir)
+
+    def _authorised(self, scope) -> bool:
+        if not self.token:
+            return False
+        requested = _requested_token(scope)
+        # Compared as bytes: compare_digest rejects non-ASCII str.
+        return requested is not None and hmac.compare_digest(requested.encode("utf-8"), self.token.encode("utf-8"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._authorised(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope["method"], scope["path"])
+        token = _current_session.set(session)
+        written = False
+
+        async def _send(message):
+            nonlocal written
+            if message["type"] == "http.response.start" and not written:
+                written = True
+                # The endpoint has finished; persist before the client sees the id.
+                try:
+                    session.write(self.directory, message["status"])
+                except OSError:
+                    logger.exception("Failed to write profile %s", session.id)
+                headers = list(message.get("headers") or [])
+                headers.append((PROFILE_ID_HEADER, session.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current_session.reset(token)
+        logger.info("Profiled %s %s -> %s", scope["method"], scope["path"], self.directory / f"{session.id}.json")
@@ -0,0 +1,200 @@
+"""Fast JSON responses and negotiated response compression.
+
+`FastJSONResponse` serialises Pydantic models with pydantic-core and plain data with
+`orjson` (falling back to the standard library when it is not installed). Endpoints that
+already hold validated models return it directly, which skips FastAPI's second
+validation pass and `jsonable_encoder`.
+
+`CompressionMiddleware` compresses responses of at least `COMPRESSION_MINIMUM_BYTES`
+with brotli when the optional `brotli` package is installed and the client accepts `br`,
+and with gzip otherwise, giving the compressed representation its own ETag.
+"""
+import gzip
+from typing import Any, Dict, List, Optional, Tuple
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .config import settings
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel) or (
+            isinstance(content, list) and content and isinstance(content[0], BaseModel)
+        ):
+            return pydantic_core.to_json(content)
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
+
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    """Pick `br` or `gzip` from an Accept-Encoding header, or None for identity."""
+    if not header:
+        return None
+    accepted = _accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    options = [("br", 2)] if brotli is not None else []
+    options.append(("gzip", 1))
+    best: Optional[Tuple[float, int, str]] = None
+    for name, preference in options:
+        quality = accepted.get(name, wildcard)
+        if quality > 0 and (best is None or (quality, preference) > best[:2]):
+            best = (quality, preference, name)
+    return best[2] if best else None
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.compression_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level)
+
+
+def _with_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Add Accept-Encoding to the Vary header, keeping any values already listed."""
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            listed = [part.strip().lower() for part in value.split(b",")]
+            if b"accept-encoding" not in listed and b"*" not in listed:
+                headers[index] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+def _encoded_etag(etag: bytes, encoding: str) -> bytes:
+    """The validator of the `encoding`-compressed representation: `"abc"` -> `"abc-gzip"`."""
+    if not etag.endswith(b'"'):
+        return etag
+    return etag[:-1] + b"-" + encoding.encode("latin-1") + b'"'
+
+
+def _decoded_if_none_match(header: bytes, encoding: str) -> Tuple[bytes, bool]:
+    """Strip `encoding` suffixes from If-None-Match so the app compares its own ETags.
+
+    Tags carrying another encoding's suffix are left alone, so they never match.
+    """
+    suffix = b"-" + encoding.encode("latin-1") + b'"'
+    decoded, changed = [], False
+    for candidate in header.split(b","):
+        candidate = candidate.strip()
+        if candidate.endswith(suffix):
+            candidate = candidate[: -len(suffix)] + b'"'
+            changed = True
+        decoded.append(candidate)
+    return b", ".join(decoded), changed
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware; buffers a response body, then compresses it when worthwhile.
+
+    A compressed body is a different representation from the identity one, so its strong
+    ETag gets the encoding as a suffix; an identity request never revalidates against it.
+    Every response carries `Vary: Accept-Encoding`, compressed or not.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.compression_minimum_bytes if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        request_headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+
+            async def _send_identity(message):
+                if message["type"] == "http.response.start" and message["status"] != 204:
+                    message = {**message, "headers": _with_vary(list(message.get("headers", [])))}
+                await send(message)
+
+            await self.app(scope, receive, _send_identity)
+            return
+
+        revalidating_encoded = False
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match:
+            decoded, revalidating_encoded = _decoded_if_none_match(if_none_match, encoding)
+            scope = {
+                **scope,
+                "headers": [
+                    (name, decoded if name == b"if-none-match" else value) for name, value in scope["headers"]
+                ],
+            }
+
+        start: Optional[dict] = None
+        chunks: List[bytes] = []
+
+        async def _send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(send, start, b"".join(chunks), encoding, revalidating_encoded)
+
+        await self.app(scope, receive, _send)
+
+    async def _finish(self, send, start: dict, body: bytes, encoding: str, revalidating_encoded: bool) -> None:
+        headers = [(name, value) for name, value in start.get("headers", [])]
+        lookup = {name.lower(): value for name, value in headers}
+        content_type = lookup.get(b"content-type", b"").decode("latin-1")
+        compress = (
+            start["status"] not in (204, 304)
+            and len(body) >= self.minimum_size
+            and b"content-encoding" not in lookup
+            and content_type.startswith(_COMPRESSIBLE_TYPES)
+        )
+        if compress:
+            body = compress_body(body, encoding)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ]
+        if compress or (start["status"] == 304 and revalidating_encoded):
+            headers = [
+                (name, _encoded_etag(value, encoding) if name.lower() == b"etag" else value) for name, value in headers
+            ]
+        if start["status"] != 204:
+            headers = _with_vary(headers)
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,295 @@
+"""Snapshot retention and compaction.
+
+Every cache miss inserts a snapshot and nothing else ever removes one. The policy keeps,
+per cache key (customer, viewer_type, usage_mode, subscription_tier, lender_id):
+
+- the latest `keep_latest` snapshots,
+- the latest snapshot of each day for the last `daily_days` days,
+- the latest snapshot of each month for the last `monthly_months` months,
+
+and deletes the rest, optionally archiving them first as gzipped JSON lines:
+
+    python -m app.retention --dry-run
+    python -m app.retention --archive-dir ./archive --vacuum
+
+Deletes run newest-first in small chunks, each in its own short transaction. Delta
+payloads whose base is about to go are rewritten as full payloads beforehand.
+"""
+import argparse
+import gzip
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence, Set, Tuple
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from .config import settings
+from .metrics import SNAPSHOTS_DELETED_TOTAL
+from .models import LatestCreditSnapshot, SilkyCreditProfileSnapshot, SilkyCreditSnapshotPayload
+from .services.snapshot_store import load_payload_json, rematerialize_payload
+
+logger = logging.getLogger(__name__)
+
+Snapshot = SilkyCreditProfileSnapshot
+Payload = SilkyCreditSnapshotPayload
+
+DEFAULT_CHUNK_SIZE = 500
+
+_KEY_COLUMNS = (
+    Snapshot.customer_id,
+    Snapshot.viewer_type,
+    Snapshot.usage_mode,
+    Snapshot.subscription_tier,
+    Snapshot.lender_id,
+)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    keep_latest: int = 3
+    daily_days: int = 30
+    monthly_months: int = 24
+
+    def __post_init__(self):
+        if self.keep_latest < 1:
+            raise ValueError("keep_latest must be at least 1 so every cache key keeps its latest snapshot")
+
+    @classmethod
+    def from_settings(cls) -> "RetentionPolicy":
+        return cls(
+            keep_latest=settings.snapshot_retention_keep_latest,
+            daily_days=settings.snapshot_retention_daily_days,
+            monthly_months=settings.snapshot_retention_monthly_months,
+        )
+
+
+@dataclass
+class RetentionReport:
+    scanned: int = 0
+    kept: int = 0
+    deleted: int = 0
+    rematerialized: int = 0
+    payload_bytes_freed: int = 0
+    raw_bytes_freed: int = 0
+    database_bytes_before: Optional[int] = None
+    database_bytes_after: Optional[int] = None
+    archive_path: Optional[str] = None
+    dry_run: bool = False
+    duration_s: float = 0.0
+
+
+def select_expired(
+    rows: Iterable[Tuple[Any, ...]], policy: RetentionPolicy, now: datetime
+) -> Tuple[List[int], int]:
+    """Return (ids to delete, rows scanned).
+
+    `rows` are `(id, *key, snapshot_at)` tuples ordered by key, then newest first.
+    """
+    daily_cutoff = now - timedelta(days=policy.daily_days)
+    monthly_cutoff = now - relativedelta(months=policy.monthly_months)
+    expired: List[int] = []
+    scanned = 0
+
+    for _, group in itertools.groupby(rows, key=lambda row: tuple(row[1:-1])):
+        days: Set[Any] = set()
+        months: Set[Tuple[int, int]] = set()
+        for index, row in enumerate(group):
+            scanned += 1
+            snapshot_id, snapshot_at = row[0], row[-1]
+            day = snapshot_at.date()
+            month = (snapshot_at.year, snapshot_at.month)
+            keep = (
+                index < policy.keep_latest
+                or (snapshot_at >= daily_cutoff and day not in days)
+                or (snapshot_at >= monthly_cutoff and month not in months)
+            )
+            if keep:
+                days.add(day)
+                months.add(month)
+            else:
+                expired.append(snapshot_id)
+    return expired, scanned
+
+
+def _chunks(ids: Sequence[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(ids), size):
+        yield list(ids[start : start + size])
+
+
+def _sqlite_database_bytes(engine: Engine) -> Optional[int]:
+    if engine.dialect.name != "sqlite":
+        return None
+    with engine.connect() as conn:
+        page_count = conn.execute(text("PRAGMA page_count")).scalar()
+        page_size = conn.execute(text("PRAGMA page_size")).scalar()
+    return int(page_count * page_size)
+
+
+def _archive_chunk(db: Session, archive, ids: List[int]) -> None:
+    for snapshot in db.query(Snapshot).filter(Snapshot.id.in_(ids)):
+        dashboard_json = load_payload_json(db, snapshot.id)
+        record = {
+            column.name: getattr(snapshot, column.name) for column in Snapshot.__table__.columns
+        }
+        record["snapshot_at"] = snapshot.snapshot_at.isoformat()
+        record["dashboard"] = json.loads(dashboard_json) if dashboard_json is not None else None
+        archive.write(json.dumps(record) + "\n")
+
+
+def run_retention(
+    engine: Engine,
+    policy: Optional[RetentionPolicy] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dry_run: bool = False,
+    archive_dir: Optional[str] = None,
+    vacuum: bool = False,
+    now: Optional[datetime] = None,
+) -> RetentionReport:
+    policy = policy or RetentionPolicy.from_settings()
+    now = now or datetime.utcnow()
+    report = RetentionReport(dry_run=dry_run, database_bytes_before=_sqlite_database_bytes(engine))
+    started = time.perf_counter()
+    session_factory = sessionmaker(bind=engine, autoflush=False, future=True)
+
+    with session_factory() as db:
+        rows = (
+            db.query(Snapshot.id, *_KEY_COLUMNS, Snapshot.snapshot_at)
+            .order_by(*_KEY_COLUMNS, Snapshot.snapshot_at.desc(), Snapshot.id.desc())
+            .yield_per(10_000)
+        )
+        expired, report.scanned = select_expired(rows, policy, now)
+        # Never delete a snapshot a latest-pointer still references (e.g. same-timestamp ties).
+        pointed = {snapshot_id for (snapshot_id,) in db.query(LatestCreditSnapshot.snapshot_id)}
+        expired = [snapshot_id for snapshot_id in expired if snapshot_id not in pointed]
+    report.kept = report.scanned - len(expired)
+    # Newest first: a delta always points at an older snapshot, so dependents go before bases.
+    expired.sort(reverse=True)
+    expired_set = set(expired)
+
+    with session_factory() as db:
+        for ids in _chunks(expired, chunk_size):
+            raw, stored = db.query(
+                func.coalesce(func.sum(Payload.raw_bytes), 0), func.coalesce(func.sum(func.length(Payload.data)), 0)
+            ).filter(Payload.snapshot_id.in_(ids)).one()
+            report.raw_bytes_freed += int(raw)
+            report.payload_bytes_freed += int(stored)
+
+        if dry_run:
+            report.deleted = len(expired)
+            report.duration_s = time.perf_counter() - started
+            return report
+
+        for ids in _chunks(expired, chunk_size):
+            dependents = [
+                snapshot_id
+                for (snapshot_id,) in db.query(Payload.snapshot_id).filter(Payload.base_snapshot_id.in_(ids))
+                if snapshot_id not in expired_set
+            ]
+            for snapshot_id in dependents:
+                if rematerialize_payload(db, snapshot_id):
+                    report.rematerialized += 1
+            db.commit()
+
+        archive = None
+        if archive_dir:
+            path = Path(archive_dir) / f"snapshots-{now:%Y%m%dT%H%M%S}.jsonl.gz"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            archive = gzip.open(path, "at", encoding="utf-8")
+            report.archive_path = str(path)
+        try:
+            for ids in _chunks(expired, chunk_size):
+                if archive is not None:
+                    _archive_chunk(db, archive, ids)
+                db.query(Payload).filter(Payload.snapshot_id.in_(ids)).delete(synchronize_session=False)
+                db.query(Snapshot).filter(Snapshot.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+                db.expunge_all()
+                report.deleted += len(ids)
+                SNAPSHOTS_DELETED_TOTAL.inc(len(ids))
+        finally:
+            if archive is not None:
+                archive.close()
+
+    if vacuum and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+    report.database_bytes_after = _sqlite_database_bytes(engine)
+    report.duration_s = time.perf_counter() - started
+    logger.info(
+        "Snapshot retention: scanned=%s deleted=%s rematerialized=%s payload_bytes_freed=%s",
+        report.scanned,
+        report.deleted,
+        report.rematerialized,
+        report.payload_bytes_freed,
+    )
+    return report
+
+
+class RetentionWorker:
+    """Runs `run_retention` every `interval_seconds` on a daemon thread."""
+
+    def __init__(self, engine: Engine, interval_seconds: float, policy: Optional[RetentionPolicy] = None):
+        self.engine = engine
+        self.interval_seconds = interval_seconds
+        self.policy = policy
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="snapshot-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                run_retention(self.engine, self.policy)
+            except Exception:  # noqa: BLE001
+                logger.exception("Snapshot retention run failed")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=None, help="Target database (defaults to DB_URL)")
+    parser.add_argument("--keep-latest", type=int, default=settings.snapshot_retention_keep_latest)
+    parser.add_argument("--daily-days", type=int, default=settings.snapshot_retention_daily_days)
+    parser.add_argument("--monthly-months", type=int, default=settings.snapshot_retention_monthly_months)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--archive-dir", default=None, help="Write deleted snapshots here as .jsonl.gz first")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards (SQLite; locks the database)")
+    args = parser.parse_args(argv)
+
+    if args.db_url:
+        engine = create_engine(args.db_url, future=True)
+    else:
+        from .db import engine
+
+    policy = RetentionPolicy(args.keep_latest, args.daily_days, args.monthly_months)
+    report = run_retention(
+        engine,
+        policy,
+        chunk_size=args.chunk_size,
+        dry_run=args.dry_run,
+        archive_dir=args.archive_dir,
+        vacuum=args.vacuum,
+    )
+    print(json.dumps(asdict(report), indent=2), file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
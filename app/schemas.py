@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import List, Literal, Optional, Union
+from datetime import date, datetime
+from typing import Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -232,6 +232,10 @@ class CreditDashboard(BaseModel):
     subscription_tier: Literal["free", "standard", "pro", "enterprise"]
     lender_profile: Optional[LenderProfile] = None
 
+    # Set by the service (never by the model) when a last-good snapshot is served
+    # because the model is unavailable.
+    stale: bool = False
+
 
 # --- Customer summaries ---
 
@@ -253,3 +257,70 @@ class CustomerSummary(BaseModel):
     city: Optional[str] = None
     subscription_plan: Optional[str] = None
     latest_credit: Optional[CreditSnapshotSummary] = None
+
+
+# --- Model usage ---
+
+
+class ModelUsageSummary(BaseModel):
+    group: dict
+    snapshots: int
+    input_tokens: int
+    cached_tokens: int
+    output_tokens: int
+    cached_input_ratio: Optional[float] = None
+    avg_input_tokens: Optional[float] = None
+    avg_model_latency_ms: Optional[float] = None
+    max_model_latency_ms: Optional[float] = None
+    estimated_cost_usd: float
+
+
+class CreditHistoryPoint(BaseModel):
+    period_start: date
+    snapshot_at: datetime
+    snapshots: int
+    # Closing (last) snapshot of the period
+    credit_score: int
+    credit_band: str
+    recommended_credit_limit_amount: float
+    recommended_credit_limit_currency: str
+    max_safe_tenor_months: int
+    min_credit_score: int
+    max_credit_score: int
+    avg_credit_score: float
+
+
+# --- Portfolio ---
+
+
+class PortfolioBand(BaseModel):
+    positions: int
+    exposure: float
+
+
+class PortfolioSummary(BaseModel):
+    dimension: Literal["all", "segment", "city", "lender"]
+    value: Optional[str] = None
+    currency: str
+    positions: int
+    total_exposure: float
+    avg_tenor_months: float
+    avg_credit_score: float
+    bands: Dict[str, PortfolioBand]
+
+
+# --- Background jobs ---
+
+
+class DashboardJobStatus(BaseModel):
+    job_id: str
+    customer_id: int
+    status: Literal["queued", "running", "succeeded", "failed"]
+    coalesced: bool = False
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_ms: Optional[float] = None
+    run_ms: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[CreditDashboard] = None
@@ -1,8 +1,8 @@
 from datetime import date, datetime, timedelta
-from random import randint, uniform
+from random import Random
 from typing import Iterable, List
 
-from .db import Base, SessionLocal, engine
+from .db import Base, SessionLocal, add_missing_columns, get_engine
 from .models import (
     Customer,
     CustomerSetting,
@@ -11,6 +11,7 @@ from .models import (
     UsageEvent,
     User,
 )
+from .services import data_versions
 
 
 def _create_users(db, customer: Customer, roles: Iterable[str]) -> List[User]:
@@ -20,61 +21,61 @@ def _create_users(db, customer: Customer, roles: Iterable[str]) -> List[User]:
     return users
 
 
-def _seed_usage_events(db, customer: Customer, user_ids: List[int], activity_bias: int) -> None:
+def _seed_usage_events(db, rng: Random, customer: Customer, user_ids: List[int], activity_bias: int) -> None:
     now = datetime.utcnow()
     for day_offset in range(0, 75):
         day = now - timedelta(days=day_offset)
-        if randint(0, 100) < activity_bias:
-            for _ in range(randint(3, 12)):
+        if rng.randint(0, 100) < activity_bias:
+            for _ in range(rng.randint(3, 12)):
                 db.add(
                     UsageEvent(
                         customer_id=customer.id,
-                        user_id=user_ids[randint(0, len(user_ids) - 1)],
+                        user_id=user_ids[rng.randint(0, len(user_ids) - 1)],
                         module="POS",
                         event_type="login",
-                        timestamp=day - timedelta(minutes=randint(0, 600)),
+                        timestamp=day - timedelta(minutes=rng.randint(0, 600)),
                     )
                 )
-            for _ in range(randint(0, 4)):
+            for _ in range(rng.randint(0, 4)):
                 db.add(
                     UsageEvent(
                         customer_id=customer.id,
-                        user_id=user_ids[randint(0, len(user_ids) - 1)],
+                        user_id=user_ids[rng.randint(0, len(user_ids) - 1)],
                         module="Inventory",
                         event_type="stock_update",
-                        timestamp=day - timedelta(minutes=randint(0, 600)),
+                        timestamp=day - timedelta(minutes=rng.randint(0, 600)),
                     )
                 )
 
 
-def _seed_transactions(db, customer: Customer, base: float, volatility: float) -> None:
+def _seed_transactions(db, rng: Random, customer: Customer, base: float, volatility: float) -> None:
     today = date.today()
     for month_offset in range(0, 12):
         month_start = today - timedelta(days=month_offset * 30)
         for _ in range(15):
-            sales = round(uniform(base * (1 - volatility), base * (1 + volatility)), 2)
+            sales = round(rng.uniform(base * (1 - volatility), base * (1 + volatility)), 2)
             db.add(
                 PosTransaction(
                     customer_id=customer.id,
-                    date=month_start - timedelta(days=randint(0, 25)),
+                    date=month_start - timedelta(days=rng.randint(0, 25)),
                     net_sales=sales,
-                    branch_id=randint(1, max(customer.branches_count, 1)),
+                    branch_id=rng.randint(1, max(customer.branches_count, 1)),
                     payment_method="card",
                 )
             )
 
 
-def _seed_invoices(db, customer: Customer) -> None:
+def _seed_invoices(db, rng: Random, customer: Customer) -> None:
     today = date.today()
     for month_offset in range(0, 6):
         month_start = today - timedelta(days=month_offset * 30)
         for _ in range(4):
-            issue = month_start - timedelta(days=randint(0, 10))
+            issue = month_start - timedelta(days=rng.randint(0, 10))
             due = issue + timedelta(days=30)
-            amount = round(uniform(3500, 24000), 2)
-            if randint(0, 100) < 70:
+            amount = round(rng.uniform(3500, 24000), 2)
+            if rng.randint(0, 100) < 70:
                 status = "paid"
-                paid_date = due + timedelta(days=randint(-5, 10))
+                paid_date = due + timedelta(days=rng.randint(-5, 10))
             else:
                 status = "overdue"
                 paid_date = None
@@ -91,11 +92,20 @@ def _seed_invoices(db, customer: Customer) -> None:
             )
 
 
-def seed_database() -> None:
-    """Create tables and seed a multi-customer demo dataset if DB is empty."""
+def seed_database(seed: int = 42, create_schema: bool = True) -> None:
+    """Create tables (unless `create_schema` is False) and seed a multi-customer demo
+    dataset if DB is empty.
 
-    Base.metadata.create_all(bind=engine)
+    The demo data is reproducible for a given `seed`; use `app.synthetic_data` for
+    large load-testing datasets.
+    """
+
+    if create_schema:
+        Base.metadata.create_all(bind=get_engine())
+        add_missing_columns(get_engine())
+    data_versions.register()
     db = SessionLocal()
+    rng = Random(seed)
     try:
         if db.query(Customer).first():
             return
@@ -190,8 +200,8 @@ def seed_database() -> None:
                 country="Saudi Arabia",
                 city=info["city"],
                 industry=info["industry"],
-                founded_date=today.replace(year=today.year - randint(3, 8)),
-                branches_count=randint(1, 5),
+                founded_date=today.replace(year=today.year - rng.randint(3, 8)),
+                branches_count=rng.randint(1, 5),
                 acquisition_channel="silky_direct",
                 referral_partner_id=None,
             )
@@ -203,7 +213,7 @@ def seed_database() -> None:
                     customer_id=customer.id,
                     subscription_plan=info["subscription_plan"],
                     modules_enabled=info["modules"],
-                    go_live_date=today.replace(year=today.year - randint(1, 3)),
+                    go_live_date=today.replace(year=today.year - rng.randint(1, 3)),
                     status="active",
                 )
             )
@@ -211,9 +221,9 @@ def seed_database() -> None:
             users = _create_users(db, customer, roles=["manager", "cashier", "ops"])
             user_ids = [u.id for u in users]
 
-            _seed_usage_events(db, customer, user_ids, activity_bias=info["activity_bias"])
-            _seed_transactions(db, customer, base=info["base_sales"], volatility=info["volatility"])
-            _seed_invoices(db, customer)
+            _seed_usage_events(db, rng, customer, user_ids, activity_bias=info["activity_bias"])
+            _seed_transactions(db, rng, customer, base=info["base_sales"], volatility=info["volatility"])
+            _seed_invoices(db, rng, customer)
 
         db.commit()
     finally:
@@ -0,0 +1,120 @@
+"""`AsyncSession` versions of the feature extraction, snapshot and dashboard cache reads.
+
+They issue the same statements as `data_service` / `snapshot_store` /
+`credit_agent_service` and reuse their row-shaping helpers, so sync callers (scripts,
+CLIs, the generation pipeline) and async request paths return identical results. Every
+relationship they touch is loaded eagerly; an `AsyncSession` cannot lazy-load.
+
+Generation itself, including the snapshot write, stays on a sync `Session`; async
+endpoints run it in a worker thread on a cache miss.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..metrics import DASHBOARD_CACHE_TOTAL
+from ..models import SilkyCreditSnapshotPayload
+from . import credit_agent_service, data_service, data_versions, snapshot_store
+from .credit_agent_service import CachedView
+
+
+async def _get_customer_or_raise(db: AsyncSession, customer_id: int):
+    result = await db.execute(data_service.customer_statement(customer_id))
+    return data_service.customer_or_raise(result.scalars().first(), customer_id)
+
+
+async def fetch_customer_kyc(db: AsyncSession, customer_id: int) -> Dict[str, Any]:
+    return data_service.build_kyc(await _get_customer_or_raise(db, customer_id))
+
+
+async def fetch_usage_metrics(db: AsyncSession, customer_id: int) -> Dict[str, Any]:
+    await _get_customer_or_raise(db, customer_id)
+    events_statement, total_users_statement = data_service.usage_statements(customer_id)
+    events = list((await db.execute(events_statement)).scalars())
+    total_users = (await db.execute(total_users_statement)).scalar_one()
+    return data_service.build_usage(events, total_users)
+
+
+async def fetch_financial_metrics(db: AsyncSession, customer_id: int) -> Dict[str, Any]:
+    await _get_customer_or_raise(db, customer_id)
+    txs_statement, invoices_statement = data_service.financial_statements(customer_id)
+    txs = list((await db.execute(txs_statement)).scalars())
+    invoices = list((await db.execute(invoices_statement)).scalars())
+    return data_service.build_financial(txs, invoices)
+
+
+async def list_customers_with_latest_credit(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(data_service.customers_with_latest_credit_statement())
+    return [data_service.customer_summary(row) for row in result]
+
+
+async def portfolio_etag(db: AsyncSession) -> str:
+    result = await db.execute(data_service.portfolio_version_statement())
+    return data_service.portfolio_etag(result.one())
+
+
+# --- Snapshot repository ---
+
+
+async def latest_pointer(
+    db: AsyncSession,
+    customer_id: int,
+    viewer_type: str,
+    usage_mode: str,
+    subscription_tier: str,
+    lender_id: Optional[str],
+) -> Optional[Tuple[int, Optional[int]]]:
+    result = await db.execute(
+        snapshot_store.latest_pointer_statement(customer_id, viewer_type, usage_mode, subscription_tier, lender_id)
+    )
+    row = result.first()
+    return tuple(row) if row is not None else None
+
+
+async def load_payload_json(db: AsyncSession, snapshot_id: int) -> Optional[str]:
+    chain: List[SilkyCreditSnapshotPayload] = []
+    current = await db.get(SilkyCreditSnapshotPayload, snapshot_id)
+    while current is not None:
+        chain.append(current)
+        if current.base_snapshot_id is None:
+            return snapshot_store.decode_chain(chain)
+        current = await db.get(SilkyCreditSnapshotPayload, current.base_snapshot_id)
+    return None
+
+
+# --- Dashboard cache reads ---
+
+
+async def fresh_cached_view(
+    db: AsyncSession,
+    customer_id: int,
+    viewer_type: str = "silky_internal",
+    usage_mode: Optional[str] = None,
+    subscription_tier: Optional[str] = None,
+    lender_id: Optional[str] = None,
+) -> Optional[CachedView]:
+    plan = None
+    if not subscription_tier:
+        plan = (await db.execute(credit_agent_service.subscription_plan_statement(customer_id))).scalar()
+    usage_mode, subscription_tier = credit_agent_service.resolve_view(viewer_type, usage_mode, subscription_tier, plan)
+    pointer = await latest_pointer(db, customer_id, viewer_type, usage_mode, subscription_tier, lender_id)
+    if pointer is None:
+        return None
+    data_version = (await db.execute(data_versions.data_version_statement(customer_id))).scalar() or 0
+    return credit_agent_service.cached_view_if_fresh(pointer, data_version, usage_mode, subscription_tier)
+
+
+async def load_cached_dashboard_json(
+    db: AsyncSession, customer_id: int, viewer_type: str, lender_id: Optional[str], cached: CachedView
+) -> Optional[str]:
+    dashboard_json = await load_payload_json(db, cached.snapshot_id)
+    if dashboard_json is None:
+        return None
+    DASHBOARD_CACHE_TOTAL.inc(result="hit")
+    await db.execute(
+        snapshot_store.pointer_hit_statement(
+            customer_id, viewer_type, cached.usage_mode, cached.subscription_tier, lender_id
+        )
+    )
+    await db.commit()
+    return dashboard_json
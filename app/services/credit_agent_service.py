@@ -1,23 +1,49 @@
 import json
 import logging
+import time
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
-import json
-import logging
-from datetime import datetime
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, Iterator, List, Literal, NamedTuple, Optional, Tuple
 
-from openai import OpenAI
 from pydantic import ValidationError
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
 from ..config import settings
-from ..models import SilkyCreditProfileSnapshot
+from ..metrics import (
+    DASHBOARD_CACHE_TOTAL,
+    DASHBOARD_STAGE_SECONDS,
+    MODEL_CALLS_IN_FLIGHT,
+    MODEL_CACHED_INPUT_RATIO,
+    MODEL_CALLS_TOTAL,
+    MODEL_REPAIRS_TOTAL,
+    MODEL_TOKENS_TOTAL,
+)
+from ..models import CustomerSetting, SilkyCreditProfileSnapshot
+from ..profiling import record_stage
 from ..schemas import CreditDashboard, LenderProfile
+from . import repair
+from .portfolio import apply_snapshot
+from .data_versions import current_data_version
 from .data_service import fetch_customer_kyc, fetch_usage_metrics, fetch_financial_metrics
+from .model_providers import ModelProvider, ModelRequest, ModelResult, get_model_provider
+from .resilience import CircuitBreaker, CircuitOpenError, ModelUnavailableError, call_with_retries
+from .structured_output import CREDIT_DASHBOARD_SCHEMA, restore_free_form_objects
+from .snapshot_store import (
+    latest_pointer,
+    load_payload_json,
+    record_pointer_hit,
+    save_payload,
+    upsert_latest_pointer,
+)
 
 logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=settings.openai_api_key)
+model_breaker = CircuitBreaker(
+    failure_threshold=settings.model_breaker_failure_threshold,
+    reset_timeout_seconds=settings.model_breaker_reset_seconds,
+)
 
 
 SYSTEM_PROMPT = """
@@ -134,6 +160,50 @@ Views:
 CRITICAL: Return ONLY valid JSON. Do not add markdown, code blocks, or explanations.
 """
 
+TASK_PROMPT = """
+TASK:
+1. Generate a complete CreditDashboard JSON object for the customer in the INPUT DATA that matches ALL the required structures defined above.
+2. Map input data into the correct nested structure:
+   - behaviour_profile: Derive from usage_metrics (active_days_last_90, logins, feature_adoption).
+   - financial_health: Derive from financial_metrics (revenue, trend, liquidity, concentration, seasonality).
+   - cashflow_forecast: Generate base/conservative/optimistic scenarios based on revenue volatility.
+   - credit_analysis: Score (0–100), band (A+ | A | B | C | D), recommended_credit_limit, max_safe_tenor_months, offers.
+   - safety_and_compliance & audit_metadata: Fill with appropriate metadata and disclaimers.
+3. Ensure ALL root-level required fields present: customer_id, usage_mode, subscription_tier, kyc_profile, behaviour_profile, financial_health, cashflow_forecast, credit_analysis, safety_and_compliance, audit_metadata.
+4. Ensure credit_analysis.max_safe_tenor_months is always present (typically 6–24 months).
+5. Tailor recommendations, flags, and insights to the merchant's segment and viewer_type.
+6. For missing data, set to null/empty and document in data_quality_comment and regulatory_flags.
+
+Return ONLY valid JSON. No markdown, code blocks, explanations, or extra text.
+"""
+
+# Everything that does not depend on the customer goes in `instructions`, so every call
+# starts with the same bytes and upstream prompt caching can reuse the prefix; the
+# per-customer features follow in the input.
+DASHBOARD_INSTRUCTIONS = SYSTEM_PROMPT + TASK_PROMPT
+DASHBOARD_PROMPT_CACHE_KEY = f"credit-dashboard-{zlib.crc32(DASHBOARD_INSTRUCTIONS.encode('utf-8')):08x}"
+
+
+def _dashboard_input(customer_id: int, features: Dict[str, Any]) -> str:
+    # Sorted, compact keys keep identical features byte-identical across calls.
+    return (
+        f"You are generating a CreditDashboard for customer_id={customer_id}.\n\n"
+        "INPUT DATA from Silky Systems:\n"
+        f"```json\n{json.dumps(features, sort_keys=True, separators=(',', ':'), default=str)}\n```\n"
+    )
+
+
+@contextmanager
+def _stage(name: str) -> Iterator[None]:
+    """Time a generation stage for /metrics and, when active, the request profile."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        DASHBOARD_STAGE_SECONDS.observe(elapsed, stage=name)
+        record_stage(name, elapsed)
+
 
 def _derive_usage_mode(viewer_type: str, usage_mode: Optional[str]) -> str:
     if usage_mode:
@@ -260,37 +330,348 @@ def _get_cached_dashboard(
     usage_mode: str,
     subscription_tier: str,
     lender_id: Optional[str],
+    data_version: Optional[int] = None,
 ) -> Optional[CreditDashboard]:
-    """Return a cached snapshot if one already exists for this view."""
+    """Return the cached snapshot for this view; with `data_version`, only if built from it."""
 
-    lender_clause = (
-        SilkyCreditProfileSnapshot.lender_id.is_(None)
-        if lender_id is None
-        else SilkyCreditProfileSnapshot.lender_id == lender_id
-    )
-
-    snapshot = (
-        db.query(SilkyCreditProfileSnapshot)
-        .filter(
-            SilkyCreditProfileSnapshot.customer_id == customer_id,
-            SilkyCreditProfileSnapshot.viewer_type == viewer_type,
-            SilkyCreditProfileSnapshot.usage_mode == usage_mode,
-            SilkyCreditProfileSnapshot.subscription_tier == subscription_tier,
-            lender_clause,
+    pointer = latest_pointer(db, customer_id, viewer_type, usage_mode, subscription_tier, lender_id)
+    if pointer is None:
+        return None
+    snapshot_id, snapshot_version = pointer
+    if data_version is not None and (snapshot_version or 0) != data_version:
+        logger.debug(
+            "Snapshot %s is at data version %s, customer_id=%s is at %s",
+            snapshot_id,
+            snapshot_version,
+            customer_id,
+            data_version,
         )
-        .order_by(SilkyCreditProfileSnapshot.snapshot_at.desc())
-        .first()
-    )
+        return None
+
+    return _load_dashboard(db, snapshot_id)
+
 
-    if not snapshot:
+class CachedView(NamedTuple):
+    snapshot_id: int
+    data_version: int
+    usage_mode: str
+    subscription_tier: str
+
+
+def dashboard_etag(snapshot_id: int, data_version: int, fields: str = "") -> str:
+    suffix = f".f{zlib.crc32(fields.encode()):08x}" if fields else ""
+    return f'"d{snapshot_id}.{data_version}{suffix}"'
+
+
+def subscription_plan_statement(customer_id: int) -> Select:
+    return select(CustomerSetting.subscription_plan).where(CustomerSetting.customer_id == customer_id)
+
+
+def resolve_view(
+    viewer_type: str, usage_mode: Optional[str], subscription_tier: Optional[str], plan: Optional[str]
+) -> Tuple[str, str]:
+    """(usage_mode, subscription_tier) a request is cached under; `plan` is only read without a tier."""
+    tier = _infer_subscription_tier(subscription_tier, {"relationship_with_silky": {"subscription_plan": plan}})
+    return _derive_usage_mode(viewer_type, usage_mode), tier
+
+
+def cached_view_if_fresh(
+    pointer: Optional[Tuple[int, Optional[int]]], data_version: int, usage_mode: str, subscription_tier: str
+) -> Optional[CachedView]:
+    if pointer is None:
         return None
+    snapshot_id, snapshot_version = pointer
+    if (snapshot_version or 0) != data_version:
+        return None
+    return CachedView(snapshot_id, data_version, usage_mode, subscription_tier)
+
 
+def fresh_cached_view(
+    db: Session,
+    customer_id: int,
+    viewer_type: str = "silky_internal",
+    usage_mode: Optional[str] = None,
+    subscription_tier: Optional[str] = None,
+    lender_id: Optional[str] = None,
+) -> Optional[CachedView]:
+    """The snapshot this request would be served from cache, or None if it would regenerate.
+
+    Costs a few primary-key lookups; nothing is decompressed or validated.
+    """
+    plan = None if subscription_tier else db.execute(subscription_plan_statement(customer_id)).scalar()
+    usage_mode, subscription_tier = resolve_view(viewer_type, usage_mode, subscription_tier, plan)
+    pointer = latest_pointer(db, customer_id, viewer_type, usage_mode, subscription_tier, lender_id)
+    if pointer is None:
+        return None
+    return cached_view_if_fresh(pointer, current_data_version(db, customer_id), usage_mode, subscription_tier)
+
+
+def load_cached_dashboard_json(
+    db: Session, customer_id: int, viewer_type: str, lender_id: Optional[str], cached: CachedView
+) -> Optional[str]:
+    """Stored JSON of a fresh cached view, counted as a cache hit; None if the payload is gone."""
+    dashboard_json = load_payload_json(db, cached.snapshot_id)
+    if dashboard_json is None:
+        return None
+    DASHBOARD_CACHE_TOTAL.inc(result="hit")
+    record_pointer_hit(db, customer_id, viewer_type, cached.usage_mode, cached.subscription_tier, lender_id)
+    db.commit()
+    return dashboard_json
+
+
+def _load_dashboard(db: Session, snapshot_id: int) -> Optional[CreditDashboard]:
+    dashboard_json = load_payload_json(db, snapshot_id)
+    if dashboard_json is None:
+        return None
     try:
-        return CreditDashboard.model_validate_json(snapshot.dashboard_json)
+        return CreditDashboard.model_validate_json(dashboard_json)
     except ValidationError:
         return None
 
 
+def _get_last_good_dashboard(
+    db: Session,
+    customer_id: int,
+    viewer_type: str,
+    usage_mode: str,
+    subscription_tier: str,
+    lender_id: Optional[str],
+) -> Optional[CreditDashboard]:
+    """Return the most recent snapshot of this exact view as a stale fallback, marked `stale=True`.
+
+    Only the same viewer type, usage mode, tier and lender qualify: another lender's or a
+    higher tier's snapshot carries content this caller must not see, so None (and a 503)
+    is the answer when the view was never generated.
+    """
+    dashboard = _get_cached_dashboard(
+        db=db,
+        customer_id=customer_id,
+        viewer_type=viewer_type,
+        usage_mode=usage_mode,
+        subscription_tier=subscription_tier,
+        lender_id=lender_id,
+    )
+    if dashboard is None:
+        # The pointer's payload may be unreadable; try the view's older snapshots.
+        Snapshot = SilkyCreditProfileSnapshot
+        snapshots = (
+            db.query(Snapshot)
+            .filter(
+                Snapshot.customer_id == customer_id,
+                Snapshot.viewer_type == viewer_type,
+                Snapshot.usage_mode == usage_mode,
+                Snapshot.subscription_tier == subscription_tier,
+                Snapshot.lender_id.is_(None) if lender_id is None else Snapshot.lender_id == lender_id,
+            )
+            .order_by(Snapshot.snapshot_at.desc())
+            .limit(5)
+            .all()
+        )
+        for snapshot in snapshots:
+            dashboard = _load_dashboard(db, snapshot.id)
+            if dashboard is not None:
+                break
+
+    if dashboard is None:
+        return None
+    dashboard.stale = True
+    return dashboard
+
+
+def _call_model(
+    provider: ModelProvider,
+    prompt: str,
+    features: Dict[str, Any],
+    response_schema: Optional[Dict[str, Any]] = None,
+    instructions: Optional[str] = None,
+    cache_key: Optional[str] = None,
+) -> ModelResult:
+    """Call the model behind the circuit breaker with deadlines and jittered retries."""
+    if not model_breaker.allow_request():
+        MODEL_CALLS_TOTAL.inc(provider=provider.name, outcome="circuit_open")
+        raise CircuitOpenError("Model circuit breaker is open")
+
+    def _attempt(timeout: float) -> ModelResult:
+        return provider.generate(
+            ModelRequest(
+                prompt=prompt,
+                features=features,
+                timeout=timeout,
+                response_schema=response_schema,
+                instructions=instructions,
+                cache_key=cache_key,
+            )
+        )
+
+    started = time.perf_counter()
+    try:
+        with MODEL_CALLS_IN_FLIGHT.track_inprogress():
+            result = call_with_retries(
+                _attempt,
+                is_retryable=provider.is_retryable,
+                max_attempts=settings.model_max_attempts,
+                timeout_seconds=settings.model_timeout_seconds,
+                deadline_seconds=settings.model_deadline_seconds,
+                base_delay_seconds=settings.model_retry_base_delay_seconds,
+                max_delay_seconds=settings.model_retry_max_delay_seconds,
+            )
+    except ModelUnavailableError:
+        model_breaker.record_failure()
+        MODEL_CALLS_TOTAL.inc(provider=provider.name, outcome="unavailable")
+        raise
+    except Exception:
+        # Non-retryable errors (bad request, auth) still prove upstream is reachable.
+        model_breaker.record_success()
+        MODEL_CALLS_TOTAL.inc(provider=provider.name, outcome="error")
+        raise
+
+    model_breaker.record_success()
+    MODEL_CALLS_TOTAL.inc(provider=provider.name, outcome="success")
+    result.latency_ms = (time.perf_counter() - started) * 1000
+    _record_token_usage(result)
+    return result
+
+
+def _record_token_usage(result: ModelResult) -> None:
+    cached = result.cached_tokens or 0
+    if result.input_tokens is not None:
+        MODEL_TOKENS_TOTAL.inc(result.input_tokens - cached, kind="input")
+        MODEL_TOKENS_TOTAL.inc(cached, kind="cached_input")
+        if result.input_tokens > 0:
+            MODEL_CACHED_INPUT_RATIO.observe(cached / result.input_tokens)
+    if result.output_tokens is not None:
+        MODEL_TOKENS_TOTAL.inc(result.output_tokens, kind="output")
+
+
+def _estimate_cost_usd(result: ModelResult) -> Optional[float]:
+    """Price a call from its token usage and the configured per-1M-token rates."""
+    if result.input_tokens is None and result.output_tokens is None:
+        return None
+    cached = result.cached_tokens or 0
+    uncached = max(0, (result.input_tokens or 0) - cached)
+    cost = (
+        uncached * settings.model_input_cost_per_mtok
+        + cached * settings.model_cached_input_cost_per_mtok
+        + (result.output_tokens or 0) * settings.model_output_cost_per_mtok
+    )
+    return round(cost / 1_000_000, 6)
+
+
+def _add_usage(first: ModelResult, extra: ModelResult) -> ModelResult:
+    def _add(a: Optional[float], b: Optional[float]) -> Optional[float]:
+        return None if a is None and b is None else (a or 0) + (b or 0)
+
+    return ModelResult(
+        text=first.text,
+        input_tokens=_add(first.input_tokens, extra.input_tokens),
+        output_tokens=_add(first.output_tokens, extra.output_tokens),
+        cached_tokens=_add(first.cached_tokens, extra.cached_tokens),
+        latency_ms=_add(first.latency_ms, extra.latency_ms),
+    )
+
+
+def _validate_with_repairs(
+    provider: ModelProvider,
+    data: Dict[str, Any],
+    raw_json: str,
+    result: ModelResult,
+    customer_id: int,
+) -> Tuple[CreditDashboard, ModelResult]:
+    """Validate model output, re-asking only for the failing sections when it does not fit.
+
+    Up to `MODEL_REPAIR_MAX_ATTEMPTS` short repair calls are made; their token usage is
+    added to `result` so the snapshot is costed in full.
+    """
+    max_attempts = max(0, settings.model_repair_max_attempts)
+    for attempt in range(max_attempts + 1):
+        try:
+            with _stage("validate"):
+                dashboard = CreditDashboard.model_validate(data)
+        except ValidationError as e:
+            errors = e.errors(include_url=False)
+            logger.warning(
+                "CreditDashboard validation failed for customer_id=%s (attempt %s): %s",
+                customer_id,
+                attempt + 1,
+                errors,
+            )
+            if attempt == max_attempts:
+                break
+            targets = repair.repair_targets(data, errors)
+            try:
+                with _stage("repair"):
+                    repair_result = _call_model(
+                        provider, repair.build_repair_prompt(data, targets), {}, instructions=repair.REPAIR_PROMPT
+                    )
+                    repaired = json.loads(repair_result.text)
+            except (ModelUnavailableError, ValueError) as exc:
+                logger.warning("Repair call failed for customer_id=%s: %s", customer_id, exc)
+                break
+            result = _add_usage(result, repair_result)
+            if not isinstance(repaired, dict) or not repair.apply_repairs(data, list(targets), repaired):
+                break
+        else:
+            if attempt:
+                MODEL_REPAIRS_TOTAL.inc(outcome="repaired")
+                logger.info("Repaired model output for customer_id=%s in %s call(s)", customer_id, attempt)
+            return dashboard, result
+
+    if max_attempts:
+        MODEL_REPAIRS_TOTAL.inc(outcome="failed")
+    # Log the raw model output to help debugging, and raise a ValueError so the API
+    # layer returns a clear 502 instead of a generic 500/422.
+    logger.debug("Raw model output: %s", raw_json)
+    raise ValueError(f"Model output did not match CreditDashboard schema: {errors}. Raw output: {raw_json}")
+
+
+def _save_snapshot(
+    db: Session,
+    dashboard: CreditDashboard,
+    customer_id: int,
+    viewer_type: str,
+    usage_mode: str,
+    subscription_tier: str,
+    lender_id: Optional[str],
+    provider: ModelProvider,
+    features: Dict[str, Any],
+    result: ModelResult,
+    data_version: Optional[int] = None,
+) -> SilkyCreditProfileSnapshot:
+    # Key the snapshot by the requested (resolved) view so `_get_cached_dashboard`
+    # finds it again, whatever the model echoed back.
+    snapshot = SilkyCreditProfileSnapshot(
+        customer_id=customer_id,
+        snapshot_at=datetime.utcnow(),
+        viewer_type=viewer_type,
+        usage_mode=usage_mode,
+        subscription_tier=subscription_tier,
+        lender_id=lender_id,
+        credit_score=dashboard.credit_analysis.credit_score,
+        credit_band=dashboard.credit_analysis.credit_band,
+        recommended_credit_limit_amount=dashboard.credit_analysis.recommended_credit_limit.amount,
+        recommended_credit_limit_currency=dashboard.credit_analysis.recommended_credit_limit.currency,
+        max_safe_tenor_months=dashboard.credit_analysis.max_safe_tenor_months,
+        data_quality_comment=dashboard.credit_analysis.data_quality_comment,
+        model_version=provider.model_version,
+        model_provider=provider.name,
+        input_data_date_range=features.get("input_data_date_range"),
+        input_tokens=result.input_tokens,
+        output_tokens=result.output_tokens,
+        cached_tokens=result.cached_tokens,
+        model_latency_ms=result.latency_ms,
+        estimated_cost_usd=_estimate_cost_usd(result),
+        data_version=data_version,
+    )
+    db.add(snapshot)
+    db.flush()
+    save_payload(db, snapshot, dashboard.model_dump_json())
+    upsert_latest_pointer(db, snapshot)
+    apply_snapshot(db, snapshot)
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
+
+
 def generate_dashboard_for_customer(
     db: Session,
     customer_id: int,
@@ -298,39 +679,81 @@ def generate_dashboard_for_customer(
     usage_mode: Optional[str] = None,
     subscription_tier: Optional[str] = None,
     lender_id: Optional[str] = None,
+    force_refresh: bool = False,
 ) -> CreditDashboard:
     """Main pipeline:
 
+    - Return the cached snapshot for this view unless `force_refresh` is set.
     - Fetch features from the Silky database.
     - Build a structured features dict for the model.
-    - Call OpenAI Responses API with JSON schema (CreditDashboard).
+    - Call the configured model provider (OpenAI Responses API by default).
     - Persist snapshot.
     - Return the dashboard object.
     """
     logger.info("Generating credit dashboard for customer_id=%s viewer_type=%s", customer_id, viewer_type)
 
-    kyc = fetch_customer_kyc(db, customer_id)
-    usage_metrics = fetch_usage_metrics(db, customer_id)
-    financial_metrics = fetch_financial_metrics(db, customer_id)
+    with _stage("kyc"):
+        kyc = fetch_customer_kyc(db, customer_id)
 
     resolved_usage_mode = _derive_usage_mode(viewer_type, usage_mode)
     resolved_subscription_tier = _infer_subscription_tier(subscription_tier, kyc)
 
-    cached = _get_cached_dashboard(
-        db=db,
-        customer_id=customer_id,
-        viewer_type=viewer_type,
-        usage_mode=resolved_usage_mode,
-        subscription_tier=resolved_subscription_tier,
-        lender_id=lender_id,
-    )
+    cached = None
+    with _stage("cache_lookup"):
+        # Read before feature extraction: a write landing mid-generation leaves the
+        # snapshot behind the counter, so the next request regenerates.
+        data_version = current_data_version(db, customer_id)
+        if not force_refresh:
+            cached = _get_cached_dashboard(
+                db=db,
+                customer_id=customer_id,
+                viewer_type=viewer_type,
+                usage_mode=resolved_usage_mode,
+                subscription_tier=resolved_subscription_tier,
+                lender_id=lender_id,
+                data_version=data_version,
+            )
     if cached:
+        DASHBOARD_CACHE_TOTAL.inc(result="hit")
+        record_pointer_hit(
+            db, customer_id, viewer_type, resolved_usage_mode, resolved_subscription_tier, lender_id
+        )
+        db.commit()
         logger.info(
             "Returning cached dashboard for customer_id=%s viewer_type=%s",
             customer_id,
             viewer_type,
         )
         return cached
+    DASHBOARD_CACHE_TOTAL.inc(result="refresh" if force_refresh else "miss")
+
+    def _stale_or_raise(exc: ModelUnavailableError) -> CreditDashboard:
+        fallback = _get_last_good_dashboard(
+            db=db,
+            customer_id=customer_id,
+            viewer_type=viewer_type,
+            usage_mode=resolved_usage_mode,
+            subscription_tier=resolved_subscription_tier,
+            lender_id=lender_id,
+        )
+        if fallback is None:
+            raise exc
+        DASHBOARD_CACHE_TOTAL.inc(result="stale")
+        logger.warning(
+            "Model unavailable (%s); returning stale dashboard for customer_id=%s viewer_type=%s",
+            exc,
+            customer_id,
+            viewer_type,
+        )
+        return fallback
+
+    # Skip feature extraction entirely while upstream is known to be down.
+    if model_breaker.state == "open":
+        return _stale_or_raise(CircuitOpenError("Model circuit breaker is open"))
+
+    with _stage("feature_extraction"):
+        usage_metrics = fetch_usage_metrics(db, customer_id)
+        financial_metrics = fetch_financial_metrics(db, customer_id)
 
     segment = kyc.get("segment")
     lender_profile = _build_lender_profile(lender_id, segment)
@@ -350,65 +773,40 @@ def generate_dashboard_for_customer(
     if financial_metrics.get("revenue_period"):
         features["input_data_date_range"] = financial_metrics["revenue_period"]
 
-    prompt = f"""{SYSTEM_PROMPT}
-
-You are generating a CreditDashboard for customer_id={customer_id}.
-
-INPUT DATA from Silky Systems:
-```json
-{json.dumps(features, default=str)}
-```
-
-TASK:
-1. Generate a complete CreditDashboard JSON object that matches ALL the required structures defined above.
-2. Map input data into the correct nested structure:
-   - behaviour_profile: Derive from usage_metrics (active_days_last_90, logins, feature_adoption).
-   - financial_health: Derive from financial_metrics (revenue, trend, liquidity, concentration, seasonality).
-   - cashflow_forecast: Generate base/conservative/optimistic scenarios based on revenue volatility.
-   - credit_analysis: Score (0–100), band (A+ | A | B | C | D), recommended_credit_limit, max_safe_tenor_months, offers.
-   - safety_and_compliance & audit_metadata: Fill with appropriate metadata and disclaimers.
-3. Ensure ALL root-level required fields present: customer_id, usage_mode, subscription_tier, kyc_profile, behaviour_profile, financial_health, cashflow_forecast, credit_analysis, safety_and_compliance, audit_metadata.
-4. Ensure credit_analysis.max_safe_tenor_months is always present (typically 6–24 months).
-5. Tailor recommendations, flags, and insights to the merchant's segment and viewer_type.
-6. For missing data, set to null/empty and document in data_quality_comment and regulatory_flags.
-
-Return ONLY valid JSON. No markdown, code blocks, explanations, or extra text.
-"""
-
-    logger.debug("Calling OpenAI Responses API for customer_id=%s", customer_id)
-
-    # The OpenAI Python SDK Responses.create does not accept a `response_format`
-    # keyword in this installation. Send the prompt as `input` and parse the
-    # JSON returned in the text output. If you want stricter enforcement, use
-    # any available SDK parameter for JSON schema in your SDK version or
-    # validate the parsed JSON against the Pydantic model (done below).
-    response = client.responses.create(
-        model=settings.openai_model,
-        input=prompt,
-    )
-
-    # The structured JSON is returned as text in the first output item.
-    raw_json = response.output[0].content[0].text
-    data = json.loads(raw_json)
+    prompt = _dashboard_input(customer_id, features)
 
-    # Coerce model output to match CreditDashboard schema, fixing common mismatches
-    _coerce_model_output(data)
+    provider = get_model_provider()
+    logger.debug("Calling model provider %s for customer_id=%s", provider.name, customer_id)
 
+    # With MODEL_STRICT_SCHEMA the schema is sent as a strict response format and the
+    # output already has the right shape; otherwise the free-text JSON is coerced.
+    # Either way it is validated against the Pydantic model below.
+    strict = settings.model_strict_schema
     try:
-        dashboard = CreditDashboard.model_validate(data)
-    except ValidationError as e:
-        # Log detailed validation errors and the raw model output to help
-        # debugging. Raise a ValueError so the API layer can return a clear
-        # error to the caller instead of a generic 500/422.
-        logger.error(
-            "CreditDashboard validation failed for customer_id=%s: %s",
-            customer_id,
-            e.errors(),
-        )
-        logger.debug("Raw model output: %s", raw_json)
-        raise ValueError(
-            f"Model output did not match CreditDashboard schema: {e.errors()}. Raw output: {raw_json}"
-        )
+        with _stage("model_call"):
+            result = _call_model(
+                provider,
+                prompt,
+                features,
+                response_schema=CREDIT_DASHBOARD_SCHEMA if strict else None,
+                instructions=DASHBOARD_INSTRUCTIONS,
+                cache_key=DASHBOARD_PROMPT_CACHE_KEY,
+            )
+    except ModelUnavailableError as exc:
+        return _stale_or_raise(exc)
+
+    raw_json = result.text
+    with _stage("json_parse"):
+        data = json.loads(raw_json)
+
+    with _stage("coerce"):
+        if strict:
+            restore_free_form_objects(data)
+        else:
+            # Coerce model output to match CreditDashboard schema, fixing common mismatches
+            _coerce_model_output(data)
+
+    dashboard, result = _validate_with_repairs(provider, data, raw_json, result, customer_id)
 
     logger.info(
         "Generated dashboard for customer_id=%s: score=%s band=%s",
@@ -418,26 +816,20 @@ Return ONLY valid JSON. No markdown, code blocks, explanations, or extra text.
     )
 
     # Persist snapshot for monitoring and audit.
-    snapshot = SilkyCreditProfileSnapshot(
-        customer_id=int(dashboard.customer_id),
-        snapshot_at=datetime.utcnow(),
-        viewer_type=viewer_type,
-        usage_mode=dashboard.usage_mode,
-        subscription_tier=dashboard.subscription_tier,
-        lender_id=lender_id,
-        dashboard_json=dashboard.model_dump_json(),
-        credit_score=dashboard.credit_analysis.credit_score,
-        credit_band=dashboard.credit_analysis.credit_band,
-        recommended_credit_limit_amount=dashboard.credit_analysis.recommended_credit_limit.amount,
-        recommended_credit_limit_currency=dashboard.credit_analysis.recommended_credit_limit.currency,
-        max_safe_tenor_months=dashboard.credit_analysis.max_safe_tenor_months,
-        data_quality_comment=dashboard.credit_analysis.data_quality_comment,
-        model_version=settings.openai_model,
-        model_provider="openai-chatgpt-5.1",
-        input_data_date_range=features.get("input_data_date_range"),
-    )
-    db.add(snapshot)
-    db.commit()
-    db.refresh(snapshot)
+    with _stage("snapshot_commit"):
+        _save_snapshot(
+            db,
+            dashboard,
+            customer_id=customer_id,
+            viewer_type=viewer_type,
+            usage_mode=resolved_usage_mode,
+            subscription_tier=resolved_subscription_tier,
+            lender_id=lender_id,
+            provider=provider,
+            features=features,
+            result=result,
+            data_version=data_version,
+        )
 
     return dashboard
+
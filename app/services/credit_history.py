@@ -0,0 +1,121 @@
+"""Credit score history per customer, downsampled in SQL.
+
+Only the summary columns of `silky_credit_profile_snapshots` are read (never the payload
+table), through the `(customer_id, snapshot_at)` index, for one viewer type at a time so
+a period never mixes scores generated for different audiences. For daily, weekly (ISO weeks
+starting Monday) and monthly resolutions each period reports its closing snapshot, the
+last one taken in it, plus the min/max/average score and the snapshot count.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import SilkyCreditProfileSnapshot
+
+Snapshot = SilkyCreditProfileSnapshot
+
+RESOLUTIONS = ("raw", "daily", "weekly", "monthly")
+_POSTGRES_UNITS = {"daily": "day", "weekly": "week", "monthly": "month"}
+
+_SUMMARY_COLUMNS = (
+    Snapshot.snapshot_at,
+    Snapshot.credit_score,
+    Snapshot.credit_band,
+    Snapshot.recommended_credit_limit_amount,
+    Snapshot.recommended_credit_limit_currency,
+    Snapshot.max_safe_tenor_months,
+)
+
+
+def _period_start(column, resolution: str, dialect: str):
+    if dialect == "postgresql":
+        return func.date_trunc(_POSTGRES_UNITS[resolution], column)
+    if dialect == "sqlite":
+        if resolution == "daily":
+            return func.date(column)
+        if resolution == "weekly":
+            # Forward to the week's Sunday, then back to its Monday.
+            return func.date(column, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", column)
+    if dialect in ("mysql", "mariadb"):
+        if resolution == "daily":
+            return func.date(column)
+        if resolution == "weekly":
+            # WEEKDAY() counts days since Monday.
+            return func.subdate(func.date(column), func.weekday(column))
+        return func.date_format(column, "%Y-%m-01")
+    raise NotImplementedError(f"Downsampled history is not supported on {dialect}")
+
+
+def _as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def credit_history(
+    db: Session,
+    customer_id: int,
+    resolution: str = "daily",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    viewer_type: str = "silky_internal",
+    lender_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Score history for one customer in `[start, end)`, oldest period first."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    if start is not None and end is not None and end <= start:
+        raise ValueError("end must be after start")
+
+    filters = [Snapshot.customer_id == customer_id, Snapshot.viewer_type == viewer_type]
+    if start is not None:
+        filters.append(Snapshot.snapshot_at >= start)
+    if end is not None:
+        filters.append(Snapshot.snapshot_at < end)
+    if lender_id is not None:
+        filters.append(Snapshot.lender_id == lender_id)
+
+    if resolution == "raw":
+        rows = db.execute(select(*_SUMMARY_COLUMNS).where(*filters).order_by(Snapshot.snapshot_at, Snapshot.id))
+        return [
+            {
+                "period_start": _as_date(row.snapshot_at),
+                "snapshots": 1,
+                **row._asdict(),
+                "min_credit_score": row.credit_score,
+                "max_credit_score": row.credit_score,
+                "avg_credit_score": float(row.credit_score),
+            }
+            for row in rows
+        ]
+
+    period = _period_start(Snapshot.snapshot_at, resolution, db.get_bind().dialect.name)
+    ranked = (
+        select(
+            period.label("period_start"),
+            *_SUMMARY_COLUMNS,
+            func.count().over(partition_by=period).label("snapshots"),
+            func.min(Snapshot.credit_score).over(partition_by=period).label("min_credit_score"),
+            func.max(Snapshot.credit_score).over(partition_by=period).label("max_credit_score"),
+            func.avg(Snapshot.credit_score).over(partition_by=period).label("avg_credit_score"),
+            func.row_number()
+            .over(partition_by=period, order_by=(Snapshot.snapshot_at.desc(), Snapshot.id.desc()))
+            .label("rank"),
+        )
+        .where(*filters)
+        .subquery()
+    )
+    rows = db.execute(select(ranked).where(ranked.c.rank == 1).order_by(ranked.c.period_start))
+    points = []
+    for row in rows:
+        point = row._asdict()
+        point.pop("rank")
+        point["period_start"] = _as_date(point["period_start"])
+        point["avg_credit_score"] = round(float(point["avg_credit_score"]), 2)
+        points.append(point)
+    return points
@@ -3,10 +3,14 @@ from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Tuple
 
 from dateutil.relativedelta import relativedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, func, select
+from sqlalchemy.orm import Session, joinedload
 
 from ..models import (
     Customer,
+    CustomerDataVersion,
+    CustomerSetting,
+    LatestCreditSnapshot,
     PosTransaction,
     Invoice,
     UsageEvent,
@@ -15,15 +19,30 @@ from ..models import (
 )
 
 
-def _get_customer_or_raise(db: Session, customer_id: int) -> Customer:
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+# Statement builders and row shaping are shared with `async_data_service`; only the
+# `db.execute` calls differ between the sync and async entry points.
+
+
+def customer_statement(customer_id: int) -> Select:
+    # Settings are loaded eagerly so the result is usable without lazy loads (AsyncSession).
+    return select(Customer).options(joinedload(Customer.settings)).where(Customer.id == customer_id)
+
+
+def customer_or_raise(customer: Customer | None, customer_id: int) -> Customer:
     if not customer:
         raise ValueError(f"Customer {customer_id} not found")
     return customer
 
 
+def _get_customer_or_raise(db: Session, customer_id: int) -> Customer:
+    return customer_or_raise(db.execute(customer_statement(customer_id)).scalars().first(), customer_id)
+
+
 def fetch_customer_kyc(db: Session, customer_id: int) -> Dict[str, Any]:
-    customer = _get_customer_or_raise(db, customer_id)
+    return build_kyc(_get_customer_or_raise(db, customer_id))
+
+
+def build_kyc(customer: Customer) -> Dict[str, Any]:
     settings = customer.settings
 
     today = date.today()
@@ -66,28 +85,30 @@ def fetch_customer_kyc(db: Session, customer_id: int) -> Dict[str, Any]:
     return kyc
 
 
+def usage_statements(customer_id: int) -> Tuple[Select, Select]:
+    cutoff = datetime.utcnow() - timedelta(days=90)
+    events = select(UsageEvent).where(
+        UsageEvent.customer_id == customer_id,
+        UsageEvent.timestamp >= cutoff,
+    )
+    total_users = select(func.count(User.id)).where(User.customer_id == customer_id)
+    return events, total_users
+
+
 def fetch_usage_metrics(db: Session, customer_id: int) -> Dict[str, Any]:
     _ = _get_customer_or_raise(db, customer_id)
 
-    cutoff = datetime.utcnow() - timedelta(days=90)
+    events_statement, total_users_statement = usage_statements(customer_id)
+    events: List[UsageEvent] = list(db.execute(events_statement).scalars())
+    total_users = db.execute(total_users_statement).scalar_one()
+    return build_usage(events, total_users)
 
-    events: List[UsageEvent] = (
-        db.query(UsageEvent)
-        .filter(
-            UsageEvent.customer_id == customer_id,
-            UsageEvent.timestamp >= cutoff,
-        )
-        .all()
-    )
 
+def build_usage(events: List[UsageEvent], total_users: int) -> Dict[str, Any]:
     active_days = len({evt.timestamp.date() for evt in events})
     total_events = len(events)
     active_users_ids = {evt.user_id for evt in events if evt.user_id is not None}
 
-    total_users = (
-        db.query(User).filter(User.customer_id == customer_id).count()
-    )
-
     if active_days > 20:
         status = "active"
     elif active_days > 5:
@@ -128,29 +149,29 @@ def fetch_usage_metrics(db: Session, customer_id: int) -> Dict[str, Any]:
     return usage
 
 
+def financial_statements(customer_id: int) -> Tuple[Select, Select]:
+    since = date.today() - relativedelta(months=24)
+    txs = select(PosTransaction).where(
+        PosTransaction.customer_id == customer_id,
+        PosTransaction.date >= since,
+    )
+    invoices = select(Invoice).where(
+        Invoice.customer_id == customer_id,
+        Invoice.issue_date >= since,
+    )
+    return txs, invoices
+
+
 def fetch_financial_metrics(db: Session, customer_id: int) -> Dict[str, Any]:
     _ = _get_customer_or_raise(db, customer_id)
 
-    today = date.today()
-    since = today - relativedelta(months=24)
+    txs_statement, invoices_statement = financial_statements(customer_id)
+    txs: List[PosTransaction] = list(db.execute(txs_statement).scalars())
+    invoices: List[Invoice] = list(db.execute(invoices_statement).scalars())
+    return build_financial(txs, invoices)
 
-    txs: List[PosTransaction] = (
-        db.query(PosTransaction)
-        .filter(
-            PosTransaction.customer_id == customer_id,
-            PosTransaction.date >= since,
-        )
-        .all()
-    )
 
-    invoices: List[Invoice] = (
-        db.query(Invoice)
-        .filter(
-            Invoice.customer_id == customer_id,
-            Invoice.issue_date >= since,
-        )
-        .all()
-    )
+def build_financial(txs: List[PosTransaction], invoices: List[Invoice]) -> Dict[str, Any]:
 
     # Group revenue by month (YYYY-MM-01)
     monthly_revenue: Dict[str, float] = {}
@@ -211,38 +232,89 @@ def fetch_financial_metrics(db: Session, customer_id: int) -> Dict[str, Any]:
 
 
 def list_customers_with_latest_credit(db: Session) -> List[Dict[str, Any]]:
-    customers = db.query(Customer).all()
-
-    results: List[Dict[str, Any]] = []
-    for customer in customers:
-        latest_snapshot: SilkyCreditProfileSnapshot | None = (
-            db.query(SilkyCreditProfileSnapshot)
-            .filter(SilkyCreditProfileSnapshot.customer_id == customer.id)
-            .order_by(SilkyCreditProfileSnapshot.snapshot_at.desc())
-            .first()
+    return [customer_summary(row) for row in db.execute(customers_with_latest_credit_statement())]
+
+
+def customers_with_latest_credit_statement() -> Select:
+    # Latest pointer per customer across all of its cache keys, then one join for everything.
+    ranked = (
+        select(
+            LatestCreditSnapshot.customer_id,
+            LatestCreditSnapshot.snapshot_id,
+            func.row_number()
+            .over(
+                partition_by=LatestCreditSnapshot.customer_id,
+                order_by=(LatestCreditSnapshot.snapshot_at.desc(), LatestCreditSnapshot.snapshot_id.desc()),
+            )
+            .label("rank"),
         )
+        .subquery()
+    )
+    latest = select(ranked.c.customer_id, ranked.c.snapshot_id).where(ranked.c.rank == 1).subquery()
+
+    return (
+        select(
+            Customer.id,
+            Customer.legal_name,
+            Customer.trade_name,
+            Customer.industry,
+            Customer.city,
+            CustomerSetting.subscription_plan,
+            SilkyCreditProfileSnapshot.credit_score,
+            SilkyCreditProfileSnapshot.credit_band,
+            SilkyCreditProfileSnapshot.recommended_credit_limit_amount,
+            SilkyCreditProfileSnapshot.recommended_credit_limit_currency,
+            SilkyCreditProfileSnapshot.max_safe_tenor_months,
+            SilkyCreditProfileSnapshot.snapshot_at,
+        )
+        .outerjoin(CustomerSetting, CustomerSetting.customer_id == Customer.id)
+        .outerjoin(latest, latest.c.customer_id == Customer.id)
+        .outerjoin(SilkyCreditProfileSnapshot, SilkyCreditProfileSnapshot.id == latest.c.snapshot_id)
+        .order_by(Customer.id)
+    )
 
-        snapshot_summary: Dict[str, Any] | None = None
-        if latest_snapshot:
-            snapshot_summary = {
-                "credit_score": latest_snapshot.credit_score,
-                "credit_band": latest_snapshot.credit_band,
-                "recommended_credit_limit_amount": latest_snapshot.recommended_credit_limit_amount,
-                "recommended_credit_limit_currency": latest_snapshot.recommended_credit_limit_currency,
-                "max_safe_tenor_months": latest_snapshot.max_safe_tenor_months,
-                "snapshot_at": latest_snapshot.snapshot_at.isoformat(),
-            }
 
-        results.append(
-            {
-                "id": customer.id,
-                "legal_name": customer.legal_name,
-                "trade_name": customer.trade_name,
-                "industry": customer.industry,
-                "city": customer.city,
-                "subscription_plan": customer.settings.subscription_plan if customer.settings else None,
-                "latest_credit": snapshot_summary,
-            }
-        )
+def portfolio_version_statement() -> Select:
+    """One row that changes whenever anything shown by the customer list changes.
+
+    Customer and settings edits bump data versions, new customers move the count and max
+    id, and every new snapshot gets a higher id than the pointers already reference.
+    """
+    return select(
+        select(func.count(Customer.id)).scalar_subquery(),
+        select(func.coalesce(func.max(Customer.id), 0)).scalar_subquery(),
+        select(func.coalesce(func.sum(CustomerDataVersion.version), 0)).scalar_subquery(),
+        select(func.count()).select_from(LatestCreditSnapshot).scalar_subquery(),
+        select(func.coalesce(func.max(LatestCreditSnapshot.snapshot_id), 0)).scalar_subquery(),
+    )
+
+
+def fetch_portfolio_etag(db: Session) -> str:
+    return portfolio_etag(db.execute(portfolio_version_statement()).one())
 
-    return results
+
+def portfolio_etag(row: Row) -> str:
+    return '"p' + ".".join(str(value) for value in row) + '"'
+
+
+def customer_summary(row: Row) -> Dict[str, Any]:
+    snapshot_summary: Dict[str, Any] | None = None
+    if row.snapshot_at is not None:
+        snapshot_summary = {
+            "credit_score": row.credit_score,
+            "credit_band": row.credit_band,
+            "recommended_credit_limit_amount": row.recommended_credit_limit_amount,
+            "recommended_credit_limit_currency": row.recommended_credit_limit_currency,
+            "max_safe_tenor_months": row.max_safe_tenor_months,
+            "snapshot_at": row.snapshot_at.isoformat(),
+        }
+
+    return {
+        "id": row.id,
+        "legal_name": row.legal_name,
+        "trade_name": row.trade_name,
+        "industry": row.industry,
+        "city": row.city,
+        "subscription_plan": row.subscription_plan,
+        "latest_credit": snapshot_summary,
+    }
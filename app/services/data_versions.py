@@ -0,0 +1,84 @@
+"""Per-customer data version counters for cache invalidation.
+
+Any ORM flush that inserts, changes or deletes `Customer`, `CustomerSetting`,
+`PosTransaction`, `Invoice` or `UsageEvent` rows bumps `customer_data_versions.version`
+for the affected customers in the same transaction, once `register()` has installed the
+listener (`create_app` and `seed_database` do). Core statements are not seen; the only
+Core writer, `app.synthetic_data`, inserts new customers, which have no snapshots yet.
+
+Snapshots record the version their features were extracted at, so a cached dashboard is
+current exactly when `snapshot.data_version == current_data_version(customer_id)`.
+"""
+from datetime import datetime
+from itertools import chain
+from typing import Iterable, Set
+
+from sqlalchemy import Select, event, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models import Customer, CustomerDataVersion, CustomerSetting, Invoice, PosTransaction, UsageEvent
+
+TRACKED_MODELS = (Customer, CustomerSetting, PosTransaction, Invoice, UsageEvent)
+
+
+def _bump(connection: Connection, customer_ids: Iterable[int]) -> None:
+    # Sorted so concurrent writers lock version rows in the same order.
+    ids = sorted({customer_id for customer_id in customer_ids if customer_id is not None})
+    if not ids:
+        return
+    now = datetime.utcnow()
+    table = CustomerDataVersion.__table__
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        module = sqlite if dialect == "sqlite" else postgresql
+        statement = module.insert(table).values([{"customer_id": i, "version": 1, "updated_at": now} for i in ids])
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[table.c.customer_id],
+                set_={"version": table.c.version + 1, "updated_at": statement.excluded.updated_at},
+            )
+        )
+        return
+
+    for customer_id in ids:
+        updated = connection.execute(
+            update(table).where(table.c.customer_id == customer_id).values(version=table.c.version + 1, updated_at=now)
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(table).values(customer_id=customer_id, version=1, updated_at=now))
+
+
+def data_version_statement(customer_id: int) -> Select:
+    return select(CustomerDataVersion.version).where(CustomerDataVersion.customer_id == customer_id)
+
+
+def current_data_version(db: Session, customer_id: int) -> int:
+    return db.execute(data_version_statement(customer_id)).scalar() or 0
+
+
+def _changed_customer_ids(session: Session) -> Set[int]:
+    changed: Set[int] = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, TRACKED_MODELS):
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Customer) and obj in session.deleted:
+            continue
+        changed.add(obj.id if isinstance(obj, Customer) else obj.customer_id)
+    return changed
+
+
+def _bump_after_flush(session: Session, _flush_context) -> None:
+    # new/dirty/deleted still describe the flush here, and new rows have their ids.
+    customer_ids = _changed_customer_ids(session)
+    if customer_ids:
+        _bump(session.connection(), customer_ids)
+
+
+def register() -> None:
+    """Install the `after_flush` listener on all sessions; calling it again is a no-op."""
+    if not event.contains(Session, "after_flush", _bump_after_flush):
+        event.listen(Session, "after_flush", _bump_after_flush)
@@ -0,0 +1,422 @@
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelRequest:
+    # Per-call input; static instructions belong in `instructions` so the prefix caches.
+    prompt: str
+    features: Dict[str, Any] = field(default_factory=dict)
+    timeout: Optional[float] = None
+    instructions: Optional[str] = None
+    # Routes calls sharing `instructions` to the same upstream prompt cache.
+    cache_key: Optional[str] = None
+    # Strict JSON schema the output must follow; providers without support ignore it.
+    response_schema: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class ModelResult:
+    text: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    # Wall time of the whole call including retries; filled in by the caller.
+    latency_ms: Optional[float] = None
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON, good enough for offline capacity planning.
+    return max(1, len(text) // 4)
+
+
+class ModelProvider:
+    """Interface for anything that turns a prompt into CreditDashboard JSON text."""
+
+    # Stored on snapshots as `model_provider` / `model_version`.
+    name: str = "unknown"
+    model_version: str = "unknown"
+
+    def generate(self, request: ModelRequest) -> ModelResult:
+        raise NotImplementedError
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        return isinstance(exc, TimeoutError)
+
+
+class OpenAIProvider(ModelProvider):
+    name = "openai-chatgpt-5.1"
+
+    _RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+    def __init__(self, api_key: str, model: str):
+        self.model_version = model
+        self._api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+
+                    # Retries are handled by `call_with_retries`, so the SDK must not retry.
+                    self._client = OpenAI(api_key=self._api_key, max_retries=0)
+        return self._client
+
+    def generate(self, request: ModelRequest) -> ModelResult:
+        kwargs: Dict[str, Any] = {"model": self.model_version, "input": request.prompt}
+        if request.instructions is not None:
+            kwargs["instructions"] = request.instructions
+        if request.cache_key is not None:
+            kwargs["prompt_cache_key"] = request.cache_key
+        if request.timeout is not None:
+            kwargs["timeout"] = request.timeout
+        if request.response_schema is not None:
+            kwargs["text"] = {
+                "format": {
+                    "type": "json_schema",
+                    "name": "CreditDashboard",
+                    "schema": request.response_schema,
+                    "strict": True,
+                }
+            }
+        response = self.client.responses.create(**kwargs)
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "input_tokens_details", None)
+        # The structured JSON is returned as text in the first output item.
+        return ModelResult(
+            text=response.output[0].content[0].text,
+            input_tokens=getattr(usage, "input_tokens", None),
+            output_tokens=getattr(usage, "output_tokens", None),
+            cached_tokens=getattr(details, "cached_tokens", None),
+        )
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        import openai
+
+        if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in self._RETRYABLE_STATUS_CODES
+        return super().is_retryable(exc)
+
+
+class LocalStubProvider(ModelProvider):
+    """Deterministic offline provider that synthesises schema-valid dashboards.
+
+    Output depends only on the request features and `seed`, so the same input always
+    yields the same dashboard. Latency is drawn from a log-normal distribution with
+    the configured median and sigma (seeded per prompt) to mimic a real model, and
+    repeated `instructions` are reported as cached input tokens like a prefix cache.
+    """
+
+    name = "local-stub"
+    model_version = "local-stub-v1"
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        latency_sigma: float = 0.0,
+        seed: int = 0,
+        sleep=time.sleep,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.seed = seed
+        self._sleep = sleep
+        self._seen_instructions: set = set()
+        self._lock = threading.Lock()
+
+    def _cached_tokens(self, instructions: Optional[str]) -> int:
+        if not instructions:
+            return 0
+        digest = hashlib.sha256(instructions.encode("utf-8")).digest()
+        with self._lock:
+            if digest not in self._seen_instructions:
+                self._seen_instructions.add(digest)
+                return 0
+        return _estimate_tokens(instructions)
+
+    def _rng(self, request: ModelRequest) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{request.prompt}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _simulate_latency(self, rng: random.Random, timeout: Optional[float]) -> None:
+        if self.latency_ms <= 0:
+            return
+        delay = self.latency_ms / 1000.0
+        if self.latency_sigma > 0:
+            delay *= math.exp(rng.gauss(0.0, self.latency_sigma))
+        if timeout is not None and delay > timeout:
+            self._sleep(timeout)
+            raise TimeoutError(f"local stub exceeded timeout of {timeout:.2f}s")
+        self._sleep(delay)
+
+    def generate(self, request: ModelRequest) -> ModelResult:
+        rng = self._rng(request)
+        self._simulate_latency(rng, request.timeout)
+        dashboard = synthesize_dashboard(request.features, rng, self.model_version, self.name)
+        if request.response_schema is not None:
+            # Strict schemas carry free-form objects as name/value pairs.
+            for item in dashboard["behaviour_profile"]["feature_adoption"]:
+                item["key_metrics"] = [{"name": name, "value": value} for name, value in item["key_metrics"].items()]
+        text = json.dumps(dashboard)
+        return ModelResult(
+            text=text,
+            input_tokens=_estimate_tokens((request.instructions or "") + request.prompt),
+            output_tokens=_estimate_tokens(text),
+            cached_tokens=self._cached_tokens(request.instructions),
+        )
+
+
+class RecordReplayProvider(ModelProvider):
+    """Records responses of an inner provider to disk, or replays them offline.
+
+    Recordings are keyed by a SHA-256 of the instructions, prompt and response schema,
+    one JSON file per key.
+    """
+
+    def __init__(self, directory: str, mode: str, inner: Optional[ModelProvider] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Recording requires an inner provider")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.inner = inner
+        self.name = inner.name if inner else "replay"
+        self.model_version = inner.model_version if inner else "replay"
+
+    def _path_for(self, request: ModelRequest) -> Path:
+        digest = hashlib.sha256(request.prompt.encode("utf-8"))
+        if request.instructions is not None:
+            digest.update(request.instructions.encode("utf-8"))
+        if request.response_schema is not None:
+            digest.update(json.dumps(request.response_schema, sort_keys=True).encode("utf-8"))
+        key = digest.hexdigest()
+        return self.directory / f"{key}.json"
+
+    def generate(self, request: ModelRequest) -> ModelResult:
+        path = self._path_for(request)
+        if self.mode == "replay":
+            if not path.exists():
+                raise LookupError(f"No recorded model response for prompt ({path.name})")
+            recorded = json.loads(path.read_text())
+            return ModelResult(
+                text=recorded["text"],
+                input_tokens=recorded.get("input_tokens"),
+                output_tokens=recorded.get("output_tokens"),
+                cached_tokens=recorded.get("cached_tokens"),
+            )
+
+        result = self.inner.generate(request)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({**asdict(result), "recorded_at": time.time()}))
+        tmp_path.replace(path)
+        return result
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        return self.inner.is_retryable(exc) if self.inner else super().is_retryable(exc)
+
+
+def _score_to_band(score: int) -> str:
+    if score >= 90:
+        return "A+"
+    if score >= 80:
+        return "A"
+    if score >= 70:
+        return "B"
+    if score >= 60:
+        return "C"
+    return "D"
+
+
+def synthesize_dashboard(
+    features: Dict[str, Any],
+    rng: random.Random,
+    model_version: str,
+    model_provider: str,
+) -> Dict[str, Any]:
+    """Build a CreditDashboard-shaped dict from the features sent to the model."""
+    kyc = features.get("kyc") or {}
+    usage = features.get("usage_metrics") or {}
+    financial = features.get("financial_metrics") or {}
+    activity = usage.get("activity") or {}
+
+    avg_revenue = float(financial.get("avg_monthly_revenue") or 0.0)
+    mom_growth = float(financial.get("mom_growth") or 0.0)
+    overdue_ratio = float(financial.get("overdue_invoices_ratio") or 0.0)
+    active_days = int(activity.get("active_days_last_90") or 0)
+
+    score = 55 + min(active_days, 60) // 3 + (5 if mom_growth > 0 else 0) - int(overdue_ratio * 30)
+    score = max(0, min(100, score + rng.randint(-3, 3)))
+    band = _score_to_band(score)
+    limit = round(avg_revenue * (0.2 + 0.2 * score / 100), 2)
+    tenor = 6 + (score * 18) // 100
+
+    if mom_growth > 0.05:
+        trend = "growing"
+    elif mom_growth < -0.05:
+        trend = "declining"
+    else:
+        trend = "stable"
+
+    def _scenario(factor: float) -> Dict[str, Any]:
+        monthly = avg_revenue * 0.15 * factor
+        return {
+            "currency": "SAR",
+            "net_cash_flow_next_3_months": round(monthly * 3, 2),
+            "net_cash_flow_next_12_months": round(monthly * 12, 2),
+        }
+
+    feature_adoption: List[Dict[str, Any]] = [
+        {
+            "module": item.get("module", "unknown"),
+            "usage_level": item.get("usage_level", "low"),
+            "key_metrics": item.get("key_metrics") or {},
+        }
+        for item in usage.get("feature_adoption") or []
+    ]
+
+    return {
+        "customer_id": features.get("customer_id"),
+        "usage_mode": features.get("usage_mode") or "internal_analytics",
+        "subscription_tier": features.get("subscription_tier") or "standard",
+        "kyc_profile": {
+            "legal_name": kyc.get("legal_name"),
+            "trade_name": kyc.get("trade_name"),
+            "registration": kyc.get("registration") or {},
+            "segment": kyc.get("segment"),
+            "branches_count": kyc.get("branches_count"),
+            "acquisition_channel": kyc.get("acquisition_channel"),
+            "referral_partner_id": kyc.get("referral_partner_id"),
+            "relationship_with_silky": kyc.get("relationship_with_silky") or {},
+        },
+        "behaviour_profile": {
+            "activity": {
+                "status": activity.get("status", "inactive"),
+                "active_days_last_90": active_days,
+                "logins_last_90": int(activity.get("logins_last_90") or 0),
+                "active_users": int(activity.get("active_users") or 0),
+                "total_users": int(activity.get("total_users") or 0),
+            },
+            "feature_adoption": feature_adoption,
+            "discipline": {
+                "invoice_matching_rate": round(1.0 - overdue_ratio, 2),
+                "stock_update_frequency": "weekly",
+                "data_completeness_score": 0.8,
+            },
+            "behaviour_risks": [] if active_days > 20 else ["Low platform activity"],
+        },
+        "financial_health": {
+            "revenue": {
+                "avg_monthly_revenue": round(avg_revenue, 2),
+                "revenue_trend": trend,
+                "growth_rate_mom": round(mom_growth, 4),
+            },
+            "profitability_proxy": {"comment": "Not derivable from POS data alone"},
+            "liquidity": {"overdue_invoices_ratio": round(overdue_ratio, 4)},
+            "concentration": {},
+            "seasonality": {"has_strong_seasonality": False},
+        },
+        "cashflow_forecast": {
+            "base_case": _scenario(1.0),
+            "conservative_case": _scenario(0.6),
+            "optimistic_case": _scenario(1.3),
+            "confidence_level": "medium",
+            "key_drivers": ["POS revenue run-rate"],
+        },
+        "credit_analysis": {
+            "credit_score": score,
+            "credit_band": band,
+            "recommended_credit_limit": {
+                "amount": limit,
+                "currency": "SAR",
+                "logic_comment": "Share of average monthly revenue scaled by score",
+            },
+            "max_safe_tenor_months": tenor,
+            "score_explanation": {
+                "positive_drivers": ["Consistent POS activity"],
+                "risk_factors": ["Overdue invoices"] if overdue_ratio > 0.2 else [],
+            },
+            "data_quality_comment": "Synthesised by the local stub provider",
+        },
+        "safety_and_compliance": {
+            "used_sensitive_attributes": False,
+            "notes": "Offline stub output",
+            "regulatory_flags": [],
+        },
+        "available_offers": [
+            {
+                "offer_id": f"stub-{features.get('customer_id')}-1",
+                "product_type": "working_capital_loan",
+                "amount": limit,
+                "currency": "SAR",
+                "tenor_months": tenor,
+                "risk_tier": "A" if band in ("A+", "A") else "B" if band == "B" else "C",
+            }
+        ],
+        "audit_metadata": {
+            "model_version": model_version,
+            "model_provider": model_provider,
+            "input_data_date_range": features.get("input_data_date_range"),
+        },
+        "lender_profile": features.get("lender_profile"),
+    }
+
+
+def build_model_provider(config: Settings) -> ModelProvider:
+    config.require_openai_api_key()
+    kind = config.model_provider.lower()
+    if kind == "openai":
+        return OpenAIProvider(api_key=config.openai_api_key, model=config.openai_model)
+    if kind == "local":
+        return LocalStubProvider(
+            latency_ms=config.local_model_latency_ms,
+            latency_sigma=config.local_model_latency_sigma,
+            seed=config.local_model_seed,
+        )
+    if kind in ("record", "replay"):
+        inner = None
+        if kind == "record":
+            inner = build_model_provider(replace(config, model_provider=config.model_record_inner))
+        return RecordReplayProvider(directory=config.model_recordings_dir, mode=kind, inner=inner)
+    raise ValueError(f"Unknown MODEL_PROVIDER: {config.model_provider}")
+
+
+_provider: Optional[ModelProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_model_provider() -> ModelProvider:
+    """Return the process-wide provider selected by `MODEL_PROVIDER`."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = build_model_provider(settings)
+                logger.info("Using model provider %s (%s)", _provider.name, _provider.model_version)
+    return _provider
+
+
+def set_model_provider(provider: Optional[ModelProvider]) -> None:
+    """Override the process-wide provider (tests, load tests); `None` resets to settings."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,209 @@
+"""Portfolio aggregates: score bands, recommended exposure and tenor by segment, city and lender.
+
+A position is a customer's newest snapshot per lender (`lender_key`, "" when the
+dashboard was not lender-scoped), whatever view it was generated for.
+`portfolio_rollups` keeps running totals of the positions per dimension value, credit
+band and currency:
+
+- `apply_snapshot` runs with every snapshot insert, in the same transaction. It
+  subtracts the position being replaced and adds the new one, so reads never scan
+  snapshots.
+- `rebuild_portfolio` recomputes both tables from snapshot history with a few set-based
+  statements. Use it for databases that predate the tables, or to pick up segment or
+  city edits made since the snapshots were taken.
+"""
+import logging
+from typing import Any, Dict, List
+
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models import Customer, PortfolioPosition, PortfolioRollup, SilkyCreditProfileSnapshot
+from .snapshot_store import lender_key
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("all", "segment", "city", "lender")
+_TOTALS = ("positions", "exposure", "tenor_months_sum", "credit_score_sum")
+
+
+def _rollup_rows(position: Dict[str, Any], sign: int) -> List[Dict[str, Any]]:
+    values = {"all": "", "segment": position["segment"], "city": position["city"], "lender": position["lender_key"]}
+    return [
+        {
+            "dimension": dimension,
+            "dimension_value": values[dimension],
+            "credit_band": position["credit_band"],
+            "currency": position["currency"],
+            "positions": sign,
+            "exposure": sign * position["exposure"],
+            "tenor_months_sum": sign * position["tenor_months"],
+            "credit_score_sum": sign * position["credit_score"],
+        }
+        for dimension in DIMENSIONS
+    ]
+
+
+def _adjust(db: Session, position: Dict[str, Any], sign: int) -> None:
+    rows = _rollup_rows(position, sign)
+    table = PortfolioRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        module = sqlite if dialect == "sqlite" else postgresql
+        statement = module.insert(table).values(rows)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[column.name for column in table.primary_key],
+                set_={name: table.c[name] + statement.excluded[name] for name in _TOTALS},
+            )
+        )
+        return
+
+    for row in rows:
+        key = [table.c[column.name] == row[column.name] for column in table.primary_key]
+        updated = db.execute(update(table).where(*key).values({name: table.c[name] + row[name] for name in _TOTALS}))
+        if updated.rowcount == 0:
+            db.execute(insert(table).values(row))
+
+
+def _position_values(position: PortfolioPosition) -> Dict[str, Any]:
+    return {column.name: getattr(position, column.name) for column in PortfolioPosition.__table__.columns}
+
+
+def apply_snapshot(db: Session, snapshot: SilkyCreditProfileSnapshot) -> bool:
+    """Fold a newly written snapshot into the rollup, in the caller's transaction.
+
+    Returns False when a newer snapshot already holds the position.
+    """
+    key = (snapshot.customer_id, lender_key(snapshot.lender_id))
+    position = db.get(PortfolioPosition, key, with_for_update=True)
+    if position is not None and position.snapshot_at > snapshot.snapshot_at:
+        return False
+    segment, city = db.execute(
+        select(Customer.industry, Customer.city).where(Customer.id == snapshot.customer_id)
+    ).one_or_none() or (None, None)
+    values = {
+        "snapshot_id": snapshot.id,
+        "snapshot_at": snapshot.snapshot_at,
+        "segment": segment or "",
+        "city": city or "",
+        "credit_score": snapshot.credit_score,
+        "credit_band": snapshot.credit_band,
+        "exposure": snapshot.recommended_credit_limit_amount,
+        "currency": snapshot.recommended_credit_limit_currency,
+        "tenor_months": snapshot.max_safe_tenor_months,
+    }
+    if position is None:
+        position = PortfolioPosition(customer_id=key[0], lender_key=key[1], **values)
+        db.add(position)
+    else:
+        _adjust(db, _position_values(position), -1)
+        for name, value in values.items():
+            setattr(position, name, value)
+    _adjust(db, {"customer_id": key[0], "lender_key": key[1], **values}, 1)
+    return True
+
+
+def rebuild_portfolio(db: Session) -> int:
+    """Recompute positions and rollups from snapshot history; returns the position count."""
+    Snapshot = SilkyCreditProfileSnapshot
+    lender = func.coalesce(Snapshot.lender_id, "")
+    ranked = (
+        select(
+            Snapshot.customer_id,
+            lender.label("lender_key"),
+            Snapshot.id.label("snapshot_id"),
+            Snapshot.snapshot_at,
+            func.coalesce(Customer.industry, "").label("segment"),
+            func.coalesce(Customer.city, "").label("city"),
+            Snapshot.credit_score,
+            Snapshot.credit_band,
+            Snapshot.recommended_credit_limit_amount.label("exposure"),
+            Snapshot.recommended_credit_limit_currency.label("currency"),
+            Snapshot.max_safe_tenor_months.label("tenor_months"),
+            func.row_number()
+            .over(partition_by=(Snapshot.customer_id, lender), order_by=(Snapshot.snapshot_at.desc(), Snapshot.id.desc()))
+            .label("rank"),
+        )
+        .join(Customer, Customer.id == Snapshot.customer_id)
+        .subquery()
+    )
+    columns = [column.name for column in PortfolioPosition.__table__.columns]
+    db.query(PortfolioPosition).delete(synchronize_session=False)
+    count = db.execute(
+        insert(PortfolioPosition).from_select(
+            columns, select(*(ranked.c[name] for name in columns)).where(ranked.c.rank == 1)
+        )
+    ).rowcount
+
+    P = PortfolioPosition
+    db.query(PortfolioRollup).delete(synchronize_session=False)
+    dimension_columns = {"all": literal(""), "segment": P.segment, "city": P.city, "lender": P.lender_key}
+    for dimension, column in dimension_columns.items():
+        group_by = [P.credit_band, P.currency] + ([] if dimension == "all" else [column])
+        db.execute(
+            insert(PortfolioRollup).from_select(
+                ["dimension", "dimension_value", "credit_band", "currency", *_TOTALS],
+                select(
+                    literal(dimension),
+                    column,
+                    P.credit_band,
+                    P.currency,
+                    func.count(),
+                    func.sum(P.exposure),
+                    func.sum(P.tenor_months),
+                    func.sum(P.credit_score),
+                ).group_by(*group_by),
+            )
+        )
+    return count
+
+
+def ensure_portfolio_rollup(db: Session) -> int:
+    """Rebuild once if snapshots exist but no positions have been recorded yet."""
+    if db.query(PortfolioPosition.customer_id).first() is not None:
+        return 0
+    if db.query(SilkyCreditProfileSnapshot.id).first() is None:
+        return 0
+    count = rebuild_portfolio(db)
+    db.commit()
+    logger.info("Rebuilt portfolio rollup from %s positions", count)
+    return count
+
+
+def portfolio_summary(db: Session, group_by: str = "all") -> List[Dict[str, Any]]:
+    """Aggregates per value of `group_by` (and currency), with a per-band breakdown."""
+    if group_by not in DIMENSIONS:
+        raise ValueError(f"Unknown group_by dimension: {group_by}")
+    R = PortfolioRollup
+    rows = db.execute(
+        select(R.dimension_value, R.currency, R.credit_band, *(R.__table__.c[name] for name in _TOTALS))
+        .where(R.dimension == group_by, R.positions > 0)
+        .order_by(R.dimension_value, R.currency, R.credit_band)
+    )
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for value, currency, band, positions, exposure, tenor_sum, score_sum in rows:
+        group = groups.setdefault(
+            (value, currency),
+            {"positions": 0, "exposure": 0.0, "tenor_sum": 0, "score_sum": 0, "bands": {}},
+        )
+        group["positions"] += positions
+        group["exposure"] += exposure
+        group["tenor_sum"] += tenor_sum
+        group["score_sum"] += score_sum
+        group["bands"][band] = {"positions": positions, "exposure": round(exposure, 2)}
+
+    return [
+        {
+            "dimension": group_by,
+            "value": value or None,
+            "currency": currency,
+            "positions": group["positions"],
+            "total_exposure": round(group["exposure"], 2),
+            "avg_tenor_months": round(group["tenor_sum"] / group["positions"], 2),
+            "avg_credit_score": round(group["score_sum"] / group["positions"], 2),
+            "bands": group["bands"],
+        }
+        for (value, currency), group in groups.items()
+    ]
@@ -0,0 +1,89 @@
+"""Sparse fieldsets for dashboard responses (`?fields=credit_analysis,financial_health.revenue`).
+
+Paths are checked against the `CreditDashboard` schema once per request, then applied
+to plain JSON data, so a cached dashboard can be projected straight from its stored
+payload without building the model. Lists are projected element-wise, e.g.
+`available_offers.product_type`. `customer_id` is always included.
+"""
+import json
+import typing
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from ..schemas import CreditDashboard
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+Path = Tuple[str, ...]
+ALWAYS_INCLUDED = ("customer_id",)
+
+
+def nested_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    """The Pydantic model inside `annotation` (`Optional[X]`, `List[X]`, ...), if any."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for argument in typing.get_args(annotation):
+        model = nested_model(argument)
+        if model is not None:
+            return model
+    return None
+
+
+def parse_fields(spec: Optional[str], model: Type[BaseModel] = CreditDashboard) -> List[Path]:
+    """Split and validate a `fields` parameter; raises ValueError for unknown paths."""
+    if not spec:
+        return []
+    paths: List[Path] = []
+    for raw in sorted({part.strip() for part in spec.split(",") if part.strip()}):
+        path = tuple(raw.split("."))
+        current: Optional[Type[BaseModel]] = model
+        for depth, name in enumerate(path):
+            if current is None or name not in current.model_fields:
+                raise ValueError(f"Unknown field '{raw}'")
+            current = nested_model(current.model_fields[name].annotation) if depth + 1 < len(path) else None
+        paths.append(path)
+    return paths
+
+
+def fields_key(paths: List[Path]) -> str:
+    return ",".join(".".join(path) for path in paths)
+
+
+def _build_tree(paths: List[Path]) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        for name in path[:-1]:
+            child = node.setdefault(name, {})
+            if child is True:
+                break
+            node = child
+        else:
+            # A whole-section path wins over any of its sub-paths.
+            node[path[-1]] = True
+    return tree
+
+
+def _apply(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_apply(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        name: value[name] if subtree is True else _apply(value[name], subtree)
+        for name, subtree in tree.items()
+        if name in value
+    }
+
+
+def loads(data: str) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def project(document: Dict[str, Any], paths: List[Path]) -> Dict[str, Any]:
+    tree = _build_tree([(name,) for name in ALWAYS_INCLUDED] + paths)
+    return _apply(document, tree)
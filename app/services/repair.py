@@ -0,0 +1,157 @@
+"""Section-targeted repair of model output that failed CreditDashboard validation.
+
+Instead of regenerating the whole dashboard, the failing locations from
+`ValidationError.errors()` are narrowed to the smallest enclosing objects (e.g. one
+offer in `available_offers`). The model is re-asked for just those fragments with a short
+prompt, the answers are merged back, and the caller revalidates.
+"""
+import json
+import typing
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+from ..schemas import CreditDashboard
+from .projection import nested_model
+
+Path = Tuple[Any, ...]
+
+_MISSING = object()
+
+# Sent as `instructions`; the prompt itself carries only the failing fragments.
+REPAIR_PROMPT = """
+Some parts of a CreditDashboard JSON document you produced for a Silky merchant failed schema
+validation. For each PATH below, return a corrected value that satisfies its SCHEMA and keeps
+the CURRENT content wherever it is valid.
+
+Return ONLY a JSON object whose keys are exactly the given paths and whose values are the
+corrected JSON values. No markdown, code blocks or explanations.
+"""
+
+
+def path_key(path: Path) -> str:
+    return ".".join(str(part) for part in path) or "$"
+
+
+def _data_path(data: Any, error: Dict[str, Any]) -> Path:
+    """Trim an error `loc` to the part that exists in `data` (drops union/type tags)."""
+    loc = tuple(error.get("loc") or ())
+    path: List[Any] = []
+    current = data
+    for index, part in enumerate(loc):
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        elif isinstance(current, list) and isinstance(part, int) and 0 <= part < len(current):
+            current = current[part]
+        elif isinstance(current, dict) and error.get("type") == "missing" and index == len(loc) - 1:
+            pass
+        else:
+            break
+        path.append(part)
+    return tuple(path)
+
+
+def repair_targets(data: Dict[str, Any], errors: Sequence[Dict[str, Any]]) -> Dict[Path, List[Dict[str, Any]]]:
+    """Group errors by the object that should be regenerated, outermost targets winning."""
+    grouped: Dict[Path, List[Dict[str, Any]]] = {}
+    for error in errors:
+        path = _data_path(data, error)
+        # Re-ask for the enclosing object so the model sees the field's siblings.
+        target = path[:-1] if len(path) > 1 else path
+        error = {**error, "loc": path[len(target):]}
+        grouped.setdefault(target, []).append(error)
+    targets = sorted(grouped, key=len)
+    kept: Dict[Path, List[Dict[str, Any]]] = {}
+    for target in targets:
+        parent = next((other for other in kept if target[: len(other)] == other), None)
+        if parent is None:
+            kept[target] = grouped[target]
+        else:
+            kept[parent].extend(
+                {**error, "loc": target[len(parent):] + tuple(error["loc"])} for error in grouped[target]
+            )
+    return kept
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if typing.get_origin(annotation) is typing.Union:
+        arguments = [argument for argument in typing.get_args(annotation) if argument is not type(None)]
+        if len(arguments) == 1:
+            return arguments[0]
+    return annotation
+
+
+def _annotation_at(path: Path, model: Type[BaseModel] = CreditDashboard) -> Any:
+    annotation: Any = model
+    for part in path:
+        if isinstance(part, int):
+            annotation = _unwrap_optional(annotation)
+            arguments = typing.get_args(annotation)
+            if typing.get_origin(annotation) is not list or not arguments:
+                return None
+            annotation = arguments[0]
+            continue
+        nested = nested_model(annotation)
+        if nested is None or part not in nested.model_fields:
+            return None
+        annotation = nested.model_fields[part].annotation
+    return annotation
+
+
+def _schema_for(path: Path) -> Optional[Dict[str, Any]]:
+    annotation = _annotation_at(path)
+    if annotation is None:
+        return None
+    try:
+        return TypeAdapter(annotation).json_schema()
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def get_value(data: Any, path: Path) -> Any:
+    current = data
+    for part in path:
+        try:
+            current = current[part]
+        except (KeyError, IndexError, TypeError):
+            return _MISSING
+    return current
+
+
+def set_value(data: Dict[str, Any], path: Path, value: Any) -> None:
+    current: Any = data
+    for part in path[:-1]:
+        current = current[part]
+    current[path[-1]] = value
+
+
+def build_repair_prompt(data: Dict[str, Any], targets: Dict[Path, List[Dict[str, Any]]]) -> str:
+    sections = []
+    for target, errors in targets.items():
+        current = get_value(data, target)
+        lines = [f"PATH: {path_key(target)}", "ERRORS:"]
+        lines += [
+            f"- {path_key(tuple(error['loc'])) if error['loc'] else 'value'}: {error.get('msg')}" for error in errors
+        ]
+        schema = _schema_for(target)
+        if schema is not None:
+            lines.append(f"SCHEMA: {json.dumps(schema, separators=(',', ':'))}")
+        lines.append(
+            "CURRENT: (missing)" if current is _MISSING else f"CURRENT: {json.dumps(current, default=str)}"
+        )
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+def apply_repairs(data: Dict[str, Any], targets: Sequence[Path], repaired: Dict[str, Any]) -> int:
+    """Merge the model's answers into `data`; returns how many targets were answered."""
+    applied = 0
+    for target in targets:
+        key = path_key(target)
+        if key not in repaired or not target:
+            continue
+        if get_value(data, target[:-1]) is _MISSING:
+            continue
+        set_value(data, target, repaired[key])
+        applied += 1
+    return applied
@@ -0,0 +1,121 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ModelUnavailableError(RuntimeError):
+    """The upstream model could not produce a response (timeouts, outages, open breaker)."""
+
+
+class CircuitOpenError(ModelUnavailableError):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure circuit breaker.
+
+    - closed: calls flow; `failure_threshold` consecutive failures open the breaker.
+    - open: calls are rejected until `reset_timeout_seconds` have passed.
+    - half_open: a single probe call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout_seconds:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or self._failures >= self.failure_threshold:
+                if self._opened_at is None or was_probe:
+                    logger.warning("Circuit breaker opened after %s consecutive failures", self._failures)
+                self._opened_at = self._clock()
+
+
+def call_with_retries(
+    fn: Callable[[float], T],
+    *,
+    is_retryable: Callable[[BaseException], bool],
+    max_attempts: int,
+    timeout_seconds: float,
+    deadline_seconds: float,
+    base_delay_seconds: float,
+    max_delay_seconds: float,
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+) -> T:
+    """Call `fn(timeout)` with per-attempt timeouts, an overall deadline and jittered retries.
+
+    Backoff uses "full jitter": each wait is uniform in [0, min(max_delay, base * 2**attempt)].
+    Non-retryable errors propagate immediately; once attempts or the deadline run out the
+    last retryable error is wrapped in `ModelUnavailableError`.
+    """
+    started = clock()
+    last_exc: Optional[BaseException] = None
+
+    for attempt in range(max(1, max_attempts)):
+        remaining = deadline_seconds - (clock() - started)
+        if remaining <= 0:
+            break
+        try:
+            return fn(min(timeout_seconds, remaining))
+        except Exception as exc:  # noqa: BLE001
+            if not is_retryable(exc):
+                raise
+            last_exc = exc
+            logger.warning("Retryable model error on attempt %s/%s: %s", attempt + 1, max_attempts, exc)
+
+        if attempt + 1 >= max_attempts:
+            break
+        delay = random.uniform(0, min(max_delay_seconds, base_delay_seconds * (2**attempt)))
+        if clock() - started + delay >= deadline_seconds:
+            break
+        sleep(delay)
+
+    raise ModelUnavailableError(f"Model call failed after retries: {last_exc}") from last_exc
@@ -0,0 +1,388 @@
+"""Compressed storage for snapshot dashboard payloads.
+
+The hot `silky_credit_profile_snapshots` table only carries the summary columns that
+listings and cache lookups read; the full dashboard JSON lives in
+`silky_credit_snapshot_payloads`, compressed with zstd when the optional `zstandard`
+package is installed and gzip otherwise (`SNAPSHOT_COMPRESSION`).
+
+With `SNAPSHOT_DELTA_MAX_CHAIN > 0`, a payload may instead be stored as a delta of the
+changed top-level dashboard keys against the previous snapshot for the same view, as
+long as the base chain stays within that length and the delta is actually smaller.
+
+`latest_credit_snapshots` points at the current snapshot of every cache key, so
+current-state reads are primary-key lookups rather than `ORDER BY snapshot_at DESC`; it
+also carries the snapshot's data version for freshness checks.
+"""
+import gzip
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, Update, func, insert, inspect, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import LatestCreditSnapshot, SilkyCreditProfileSnapshot, SilkyCreditSnapshotPayload
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODECS = ("zstd", "gzip")
+_ZSTD_LEVEL = 9
+_GZIP_LEVEL = 6
+_LEGACY_PAYLOAD_COLUMN = "dashboard_json"
+_LEGACY_BATCH_SIZE = 500
+
+
+def resolve_codec(name: Optional[str] = None) -> str:
+    name = (name or settings.snapshot_compression).lower()
+    if name == "auto":
+        return "zstd" if zstandard is not None else "gzip"
+    if name not in CODECS:
+        raise RuntimeError(f"Unknown SNAPSHOT_COMPRESSION '{name}'; expected auto, zstd or gzip")
+    if name == "zstd" and zstandard is None:
+        raise RuntimeError("SNAPSHOT_COMPRESSION=zstd requires the 'zstandard' package")
+    return name
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=_GZIP_LEVEL)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Snapshot payload is zstd-compressed but 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def compute_delta(base: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level-key delta turning `base` into `new`."""
+    return {
+        "set": {key: value for key, value in new.items() if key not in base or base[key] != value},
+        "unset": [key for key in base if key not in new],
+    }
+
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    document = {key: value for key, value in base.items() if key not in delta["unset"]}
+    document.update(delta["set"])
+    return document
+
+
+def _previous_snapshot(db: Session, snapshot: SilkyCreditProfileSnapshot) -> Optional[SilkyCreditProfileSnapshot]:
+    lender_clause = (
+        SilkyCreditProfileSnapshot.lender_id.is_(None)
+        if snapshot.lender_id is None
+        else SilkyCreditProfileSnapshot.lender_id == snapshot.lender_id
+    )
+    return (
+        db.query(SilkyCreditProfileSnapshot)
+        .filter(
+            SilkyCreditProfileSnapshot.customer_id == snapshot.customer_id,
+            SilkyCreditProfileSnapshot.viewer_type == snapshot.viewer_type,
+            SilkyCreditProfileSnapshot.usage_mode == snapshot.usage_mode,
+            SilkyCreditProfileSnapshot.subscription_tier == snapshot.subscription_tier,
+            lender_clause,
+            SilkyCreditProfileSnapshot.id != snapshot.id,
+        )
+        .order_by(SilkyCreditProfileSnapshot.snapshot_at.desc())
+        .first()
+    )
+
+
+def save_payload(db: Session, snapshot: SilkyCreditProfileSnapshot, dashboard_json: str) -> SilkyCreditSnapshotPayload:
+    """Store `dashboard_json` for a flushed snapshot; the caller commits."""
+    codec = resolve_codec()
+    raw = dashboard_json.encode("utf-8")
+    body, base_snapshot_id, chain_depth = raw, None, 0
+
+    if settings.snapshot_delta_max_chain > 0:
+        previous = _previous_snapshot(db, snapshot)
+        base_payload = db.get(SilkyCreditSnapshotPayload, previous.id) if previous is not None else None
+        if base_payload is not None and base_payload.chain_depth < settings.snapshot_delta_max_chain:
+            base_json = load_payload_json(db, previous.id)
+            if base_json is not None:
+                delta = json.dumps(
+                    compute_delta(json.loads(base_json), json.loads(dashboard_json)), separators=(",", ":")
+                ).encode("utf-8")
+                if len(delta) < len(raw):
+                    body, base_snapshot_id, chain_depth = delta, previous.id, base_payload.chain_depth + 1
+
+    payload = SilkyCreditSnapshotPayload(
+        snapshot_id=snapshot.id,
+        codec=codec,
+        base_snapshot_id=base_snapshot_id,
+        chain_depth=chain_depth,
+        raw_bytes=len(raw),
+        data=compress(body, codec),
+    )
+    db.add(payload)
+    return payload
+
+
+def _payload_chain(db: Session, snapshot_id: int) -> List[SilkyCreditSnapshotPayload]:
+    """The payload for `snapshot_id` followed by its delta bases, full payload last."""
+    chain: List[SilkyCreditSnapshotPayload] = []
+    current = db.get(SilkyCreditSnapshotPayload, snapshot_id)
+    while current is not None:
+        chain.append(current)
+        if current.base_snapshot_id is None:
+            return chain
+        current = db.get(SilkyCreditSnapshotPayload, current.base_snapshot_id)
+    if chain:
+        logger.warning("Snapshot %s payload chain is broken", snapshot_id)
+    return []
+
+
+def load_payload_json(db: Session, snapshot_id: int) -> Optional[str]:
+    """Return the dashboard JSON stored for `snapshot_id`, or None if there is none."""
+    chain = _payload_chain(db, snapshot_id)
+    return decode_chain(chain) if chain else None
+
+
+def decode_chain(chain: List[SilkyCreditSnapshotPayload]) -> str:
+    """Rebuild dashboard JSON from a payload and its delta bases (full payload last)."""
+    full = chain[-1]
+    if len(chain) == 1:
+        return decompress(full.data, full.codec).decode("utf-8")
+
+    document = json.loads(decompress(full.data, full.codec))
+    for payload in reversed(chain[:-1]):
+        document = apply_delta(document, json.loads(decompress(payload.data, payload.codec)))
+    return json.dumps(document)
+
+
+def rematerialize_payload(db: Session, snapshot_id: int) -> bool:
+    """Rewrite a delta payload as a full one so its base snapshot can be deleted."""
+    payload = db.get(SilkyCreditSnapshotPayload, snapshot_id)
+    if payload is None or payload.base_snapshot_id is None:
+        return False
+    dashboard_json = load_payload_json(db, snapshot_id)
+    if dashboard_json is None:
+        return False
+    codec = resolve_codec()
+    payload.codec = codec
+    payload.data = compress(dashboard_json.encode("utf-8"), codec)
+    payload.base_snapshot_id = None
+    payload.chain_depth = 0
+    return True
+
+
+def lender_key(lender_id: Optional[str]) -> str:
+    return lender_id or ""
+
+
+def upsert_latest_pointer(db: Session, snapshot: SilkyCreditProfileSnapshot) -> None:
+    """Point the snapshot's cache key at it, in the caller's transaction.
+
+    An older snapshot (by `snapshot_at`) never replaces a newer pointer.
+    """
+    values = {
+        "customer_id": snapshot.customer_id,
+        "viewer_type": snapshot.viewer_type,
+        "usage_mode": snapshot.usage_mode,
+        "subscription_tier": snapshot.subscription_tier,
+        "lender_key": lender_key(snapshot.lender_id),
+        "snapshot_id": snapshot.id,
+        "snapshot_at": snapshot.snapshot_at,
+        "data_version": snapshot.data_version,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        module = sqlite if dialect == "sqlite" else postgresql
+        table = LatestCreditSnapshot.__table__
+        statement = module.insert(table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={
+                "snapshot_id": statement.excluded.snapshot_id,
+                "snapshot_at": statement.excluded.snapshot_at,
+                "data_version": statement.excluded.data_version,
+            },
+            where=table.c.snapshot_at <= statement.excluded.snapshot_at,
+        )
+        db.execute(statement)
+        return
+
+    pointer = db.get(
+        LatestCreditSnapshot,
+        (values["customer_id"], values["viewer_type"], values["usage_mode"], values["subscription_tier"], values["lender_key"]),
+    )
+    if pointer is None:
+        db.add(LatestCreditSnapshot(**values))
+    elif pointer.snapshot_at <= snapshot.snapshot_at:
+        pointer.snapshot_id = snapshot.id
+        pointer.snapshot_at = snapshot.snapshot_at
+        pointer.data_version = snapshot.data_version
+
+
+def _pointer_key(customer_id, viewer_type, usage_mode, subscription_tier, lender_id) -> tuple:
+    return (
+        LatestCreditSnapshot.customer_id == customer_id,
+        LatestCreditSnapshot.viewer_type == viewer_type,
+        LatestCreditSnapshot.usage_mode == usage_mode,
+        LatestCreditSnapshot.subscription_tier == subscription_tier,
+        LatestCreditSnapshot.lender_key == lender_key(lender_id),
+    )
+
+
+def latest_snapshot_id(
+    db: Session,
+    customer_id: int,
+    viewer_type: str,
+    usage_mode: str,
+    subscription_tier: str,
+    lender_id: Optional[str],
+) -> Optional[int]:
+    return db.execute(
+        select(LatestCreditSnapshot.snapshot_id).where(
+            *_pointer_key(customer_id, viewer_type, usage_mode, subscription_tier, lender_id)
+        )
+    ).scalar()
+
+
+def latest_pointer_statement(
+    customer_id: int, viewer_type: str, usage_mode: str, subscription_tier: str, lender_id: Optional[str]
+) -> Select:
+    return select(LatestCreditSnapshot.snapshot_id, LatestCreditSnapshot.data_version).where(
+        *_pointer_key(customer_id, viewer_type, usage_mode, subscription_tier, lender_id)
+    )
+
+
+def latest_pointer(
+    db: Session,
+    customer_id: int,
+    viewer_type: str,
+    usage_mode: str,
+    subscription_tier: str,
+    lender_id: Optional[str],
+) -> Optional[Tuple[int, Optional[int]]]:
+    """(snapshot_id, data_version) of the view's current snapshot, or None."""
+    row = db.execute(
+        latest_pointer_statement(customer_id, viewer_type, usage_mode, subscription_tier, lender_id)
+    ).first()
+    return tuple(row) if row is not None else None
+
+
+def pointer_hit_statement(
+    customer_id: int, viewer_type: str, usage_mode: str, subscription_tier: str, lender_id: Optional[str]
+) -> Update:
+    return (
+        update(LatestCreditSnapshot)
+        .where(*_pointer_key(customer_id, viewer_type, usage_mode, subscription_tier, lender_id))
+        .values(hits=LatestCreditSnapshot.hits + 1, last_hit_at=datetime.utcnow())
+    )
+
+
+def record_pointer_hit(
+    db: Session,
+    customer_id: int,
+    viewer_type: str,
+    usage_mode: str,
+    subscription_tier: str,
+    lender_id: Optional[str],
+) -> None:
+    """Count a cache hit against the view's pointer; the caller commits."""
+    db.execute(pointer_hit_statement(customer_id, viewer_type, usage_mode, subscription_tier, lender_id))
+
+
+def backfill_latest_pointers(db: Session) -> int:
+    """Rebuild every pointer from snapshot history (for databases predating the table)."""
+    Snapshot = SilkyCreditProfileSnapshot
+    key = (
+        Snapshot.customer_id,
+        Snapshot.viewer_type,
+        Snapshot.usage_mode,
+        Snapshot.subscription_tier,
+        func.coalesce(Snapshot.lender_id, ""),
+    )
+    ranked = (
+        select(
+            *key[:4],
+            key[4].label("lender_key"),
+            Snapshot.id.label("snapshot_id"),
+            Snapshot.snapshot_at,
+            Snapshot.data_version,
+            func.row_number()
+            .over(partition_by=key, order_by=(Snapshot.snapshot_at.desc(), Snapshot.id.desc()))
+            .label("rank"),
+        )
+        .where(Snapshot.usage_mode.isnot(None), Snapshot.subscription_tier.isnot(None))
+        .subquery()
+    )
+    columns = [
+        "customer_id",
+        "viewer_type",
+        "usage_mode",
+        "subscription_tier",
+        "lender_key",
+        "snapshot_id",
+        "snapshot_at",
+        "data_version",
+    ]
+    db.query(LatestCreditSnapshot).delete(synchronize_session=False)
+    result = db.execute(
+        insert(LatestCreditSnapshot).from_select(
+            columns, select(*(ranked.c[name] for name in columns)).where(ranked.c.rank == 1)
+        )
+    )
+    return result.rowcount
+
+
+def ensure_latest_pointers(db: Session) -> int:
+    """Backfill pointers once if snapshots exist but the pointer table is still empty."""
+    if db.query(LatestCreditSnapshot.snapshot_id).first() is not None:
+        return 0
+    if db.query(SilkyCreditProfileSnapshot.id).first() is None:
+        return 0
+    count = backfill_latest_pointers(db)
+    db.commit()
+    logger.info("Backfilled %s latest-snapshot pointers", count)
+    return count
+
+
+def migrate_inline_payloads(db: Session) -> int:
+    """Move payloads out of the snapshot table of databases created before the payload table.
+
+    Those databases still have a `dashboard_json` column on `silky_credit_profile_snapshots`.
+    Every snapshot without a payload row gets one from it (in batches, committed as it
+    goes, so an interrupted run resumes), then the column is dropped. Returns the number
+    of payloads written.
+    """
+    table = SilkyCreditProfileSnapshot.__tablename__
+    columns = {column["name"] for column in inspect(db.connection()).get_columns(table)}
+    if _LEGACY_PAYLOAD_COLUMN not in columns:
+        return 0
+
+    pending = text(
+        f"SELECT s.id, s.{_LEGACY_PAYLOAD_COLUMN} FROM {table} s "
+        f"LEFT JOIN {SilkyCreditSnapshotPayload.__tablename__} p ON p.snapshot_id = s.id "
+        "WHERE p.snapshot_id IS NULL AND s.id > :after ORDER BY s.id LIMIT :limit"
+    )
+    count, after = 0, 0
+    while True:
+        rows = db.execute(pending, {"after": after, "limit": _LEGACY_BATCH_SIZE}).all()
+        if not rows:
+            break
+        for snapshot_id, dashboard_json in rows:
+            if dashboard_json:
+                save_payload(db, db.get(SilkyCreditProfileSnapshot, snapshot_id), dashboard_json)
+                count += 1
+        db.commit()
+        db.expunge_all()
+        after = rows[-1][0]
+
+    db.execute(text(f"ALTER TABLE {table} DROP COLUMN {_LEGACY_PAYLOAD_COLUMN}"))
+    db.commit()
+    logger.info("Moved %s inline snapshot payloads to %s", count, SilkyCreditSnapshotPayload.__tablename__)
+    return count
@@ -0,0 +1,98 @@
+"""Strict JSON-schema response format for dashboard generation (`MODEL_STRICT_SCHEMA`).
+
+Strict structured outputs require every object to list all of its properties as
+`required` and to set `additionalProperties: false`, so free-form objects such as
+`FeatureAdoptionItem.key_metrics` cannot be expressed directly. They are sent as arrays of
+`{"name", "value"}` pairs instead and folded back into dicts by
+`restore_free_form_objects` before validation. `stale` is set by the service, never by
+the model, so it is left out.
+"""
+import copy
+import typing
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+from ..schemas import CreditDashboard
+from .projection import nested_model
+
+SCHEMA_NAME = "CreditDashboard"
+SERVICE_FIELDS = ("stale",)
+# Keywords that strict mode rejects or that only cost prompt tokens.
+_DROPPED_KEYWORDS = ("default", "title")
+
+_PAIRS_SCHEMA: Dict[str, Any] = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "value": {"anyOf": [{"type": "string"}, {"type": "number"}, {"type": "boolean"}, {"type": "null"}]},
+        },
+        "required": ["name", "value"],
+        "additionalProperties": False,
+    },
+}
+
+
+def _strict(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_strict(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    node = {
+        key: {name: _strict(child) for name, child in value.items()} if key in ("properties", "$defs") else _strict(value)
+        for key, value in node.items()
+        if key not in _DROPPED_KEYWORDS
+    }
+    if node.get("type") == "object":
+        if "properties" not in node:
+            return copy.deepcopy(_PAIRS_SCHEMA)
+        node["required"] = list(node["properties"])
+        node["additionalProperties"] = False
+    return node
+
+
+def strict_json_schema(model: Type[BaseModel], exclude: typing.Iterable[str] = ()) -> Dict[str, Any]:
+    """`model.model_json_schema()` rewritten for strict structured outputs."""
+    schema = copy.deepcopy(model.model_json_schema())
+    for name in exclude:
+        schema["properties"].pop(name, None)
+    return _strict(schema)
+
+
+# Built once; the same dict is sent on every strict-mode call.
+CREDIT_DASHBOARD_SCHEMA = strict_json_schema(CreditDashboard, exclude=SERVICE_FIELDS)
+
+
+def _is_free_form(annotation: Any) -> bool:
+    if annotation is dict or typing.get_origin(annotation) is dict:
+        return True
+    return typing.get_origin(annotation) is typing.Union and any(
+        _is_free_form(argument) for argument in typing.get_args(annotation)
+    )
+
+
+def restore_free_form_objects(data: Any, model: Type[BaseModel] = CreditDashboard) -> None:
+    """Fold name/value pair lists back into dicts, in place."""
+    if isinstance(data, list):
+        for item in data:
+            restore_free_form_objects(item, model)
+        return
+    if not isinstance(data, dict):
+        return
+    for name, info in model.model_fields.items():
+        value = data.get(name)
+        if value is None:
+            continue
+        if _is_free_form(info.annotation):
+            if isinstance(value, list):
+                data[name] = {
+                    pair["name"]: pair.get("value")
+                    for pair in value
+                    if isinstance(pair, dict) and "name" in pair
+                }
+            continue
+        nested = nested_model(info.annotation)
+        if nested is not None:
+            restore_free_form_objects(value, nested)
@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import SilkyCreditProfileSnapshot
+
+Snapshot = SilkyCreditProfileSnapshot
+
+# group_by key -> column expression
+USAGE_DIMENSIONS = {
+    "day": func.date(Snapshot.snapshot_at),
+    "usage_mode": Snapshot.usage_mode,
+    "lender": Snapshot.lender_id,
+    "model": Snapshot.model_version,
+    "viewer_type": Snapshot.viewer_type,
+}
+
+
+def summarize_model_usage(
+    db: Session,
+    group_by: Sequence[str] = ("day", "usage_mode", "lender", "model"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """Roll token usage, model latency and estimated cost up over snapshots.
+
+    Only snapshots produced by a model call (with recorded usage) are counted.
+    """
+    unknown = [name for name in group_by if name not in USAGE_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown group_by dimension(s): {', '.join(unknown)}")
+
+    keys = [USAGE_DIMENSIONS[name].label(name) for name in group_by]
+    query = db.query(
+        *keys,
+        func.count(Snapshot.id).label("snapshots"),
+        func.coalesce(func.sum(Snapshot.input_tokens), 0).label("input_tokens"),
+        func.coalesce(func.sum(Snapshot.cached_tokens), 0).label("cached_tokens"),
+        func.coalesce(func.sum(Snapshot.output_tokens), 0).label("output_tokens"),
+        func.avg(Snapshot.input_tokens).label("avg_input_tokens"),
+        func.avg(Snapshot.model_latency_ms).label("avg_model_latency_ms"),
+        func.max(Snapshot.model_latency_ms).label("max_model_latency_ms"),
+        func.coalesce(func.sum(Snapshot.estimated_cost_usd), 0.0).label("estimated_cost_usd"),
+    ).filter(Snapshot.input_tokens.isnot(None))
+    if start is not None:
+        query = query.filter(Snapshot.snapshot_at >= start)
+    if end is not None:
+        query = query.filter(Snapshot.snapshot_at < end)
+    if keys:
+        query = query.group_by(*keys).order_by(*keys)
+
+    rows: List[Dict[str, Any]] = []
+    for row in query.all():
+        data = row._asdict()
+        rows.append(
+            {
+                "group": {name: _group_value(data[name]) for name in group_by},
+                "snapshots": data["snapshots"],
+                "input_tokens": int(data["input_tokens"]),
+                "cached_tokens": int(data["cached_tokens"]),
+                "output_tokens": int(data["output_tokens"]),
+                "cached_input_ratio": (
+                    round(int(data["cached_tokens"]) / int(data["input_tokens"]), 4) if data["input_tokens"] else None
+                ),
+                "avg_input_tokens": _rounded(data["avg_input_tokens"], 1),
+                "avg_model_latency_ms": _rounded(data["avg_model_latency_ms"], 1),
+                "max_model_latency_ms": _rounded(data["max_model_latency_ms"], 1),
+                "estimated_cost_usd": round(float(data["estimated_cost_usd"]), 6),
+            }
+        )
+    return rows
+
+
+def _group_value(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _rounded(value: Optional[float], digits: int) -> Optional[float]:
+    return round(float(value), digits) if value is not None else None
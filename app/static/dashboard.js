@@ -108,12 +108,32 @@ function showLoadingDashboard(isLoading) {
     els.generate.disabled = isLoading || !state.selectedId;
 }
 
-function buildDashboardUrl() {
+function buildDashboardUrl(suffix = '') {
     const params = new URLSearchParams();
     params.set('viewer_type', els.viewer.value || 'silky_internal');
     if (els.tier.value.trim()) params.set('subscription_tier', els.tier.value.trim());
     if (els.lender.value.trim()) params.set('lender_id', els.lender.value.trim());
-    return `/api/credit-dashboard/${state.selectedId}?${params.toString()}`;
+    return `/api/credit-dashboard/${state.selectedId}${suffix}?${params.toString()}`;
+}
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Queue the generation, then poll the job (1s, backing off to 5s) instead of holding
+// one request open for the whole model call.
+async function runDashboardJob(customerId) {
+    const res = await fetch(buildDashboardUrl('/jobs'), { method: 'POST' });
+    if (!res.ok) throw new Error('Failed to queue dashboard');
+    let job = await res.json();
+    let delay = 1000;
+    while (job.status === 'queued' || job.status === 'running') {
+        await sleep(delay);
+        delay = Math.min(delay * 1.5, 5000);
+        const poll = await fetch(`/api/credit-dashboard/${customerId}/jobs/${job.job_id}`);
+        if (!poll.ok) throw new Error('Failed to poll dashboard job');
+        job = await poll.json();
+    }
+    if (job.status !== 'succeeded') throw new Error(job.error || 'Dashboard generation failed');
+    return job.result;
 }
 
 function renderListItems(items, emptyLabel) {
@@ -386,11 +406,11 @@ function renderDashboard(data) {
 
 async function loadDashboard() {
     if (!state.selectedId) return;
+    const customerId = state.selectedId;
     showLoadingDashboard(true);
     try {
-        const res = await fetch(buildDashboardUrl());
-        if (!res.ok) throw new Error('Failed to load dashboard');
-        const data = await res.json();
+        const data = await runDashboardJob(customerId);
+        if (customerId !== state.selectedId) return;
         renderDashboard(data);
         setStatus(`Dashboard ready for customer ${state.selectedId}`, 'good');
         showLoadingDashboard(false);
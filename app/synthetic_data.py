@@ -0,0 +1,341 @@
+"""Deterministic synthetic dataset generator for load and performance testing.
+
+Example (10k merchants, ~50M POS transactions):
+
+    python -m app.synthetic_data --db-url sqlite:///./load.db \\
+        --merchants 10000 --days 365 --transactions-per-day 14 --events-per-day 20 --seed 42
+
+Every merchant draws from its own `random.Random` seeded with `(seed, merchant index)`, so
+the same arguments always produce the same rows regardless of chunk size. Rows are written
+with chunked Core `INSERT ... executemany` calls instead of ORM unit-of-work flushes.
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from .models import (
+    Customer,
+    CustomerSetting,
+    Invoice,
+    PosTransaction,
+    UsageEvent,
+    User,
+)
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+_CITIES = ["Riyadh", "Jeddah", "Dammam", "Makkah", "Madinah", "Al Khobar", "Tabuk", "Abha"]
+_INDUSTRIES = ["F&B_QSR", "F&B_Cafe", "FMCG", "Retail", "Pharma", "Services", "Logistics"]
+_PLANS = ["free", "standard", "standard", "pro", "pro", "enterprise"]
+_MODULES = ["POS", "Inventory", "Invoices", "Logistics"]
+_ROLES = ["manager", "cashier", "ops"]
+_PAYMENT_METHODS = ["card", "card", "card", "cash", "wallet"]
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """A named random distribution parsed from `name:p1,p2` (uniform, beta, lognormal, const)."""
+
+    name: str
+    params: Tuple[float, ...]
+
+    @classmethod
+    def parse(cls, spec: str) -> "Distribution":
+        name, _, raw = spec.partition(":")
+        params = tuple(float(p) for p in raw.split(",") if p.strip())
+        expected = {"uniform": 2, "beta": 2, "lognormal": 2, "const": 1}
+        if name not in expected or len(params) != expected[name]:
+            raise ValueError(f"Invalid distribution '{spec}'; expected one of {sorted(expected)} with params")
+        return cls(name, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.name == "uniform":
+            return rng.uniform(*self.params)
+        if self.name == "beta":
+            return rng.betavariate(*self.params)
+        if self.name == "lognormal":
+            return rng.lognormvariate(*self.params)
+        return self.params[0]
+
+
+@dataclass
+class GeneratorConfig:
+    merchants: int = 100
+    days: int = 365
+    transactions_per_day: float = 14.0
+    events_per_day: float = 20.0
+    invoices_per_month: float = 4.0
+    users_per_merchant: int = 3
+    seed: int = 42
+    volatility: Distribution = Distribution("beta", (2.0, 8.0))
+    ticket_size: Distribution = Distribution("lognormal", (4.5, 0.6))
+    activity: Distribution = Distribution("beta", (5.0, 2.0))
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+
+
+def chunked(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_insert(conn: Connection, model, rows: Iterable[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Insert `rows` into `model`'s table in executemany chunks; returns the row count."""
+    total = 0
+    statement = insert(model.__table__)
+    for chunk in chunked(rows, chunk_size):
+        conn.execute(statement, chunk)
+        total += len(chunk)
+    return total
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    """Small-mean Poisson via Knuth, normal approximation for large means."""
+    if mean <= 0:
+        return 0
+    if mean > 30:
+        return max(0, int(round(rng.gauss(mean, math.sqrt(mean)))))
+    limit = math.exp(-mean)
+    k, p = 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+@dataclass
+class _MerchantProfile:
+    customer_id: int
+    first_user_id: int
+    rng: random.Random
+    volatility: float
+    ticket_size: float
+    activity: float
+    growth_per_day: float
+    branches: int
+
+
+class SyntheticDataGenerator:
+    def __init__(self, config: GeneratorConfig, today: Optional[date] = None):
+        self.config = config
+        self.today = today or date.today()
+
+    def _merchant_rng(self, index: int) -> random.Random:
+        return random.Random(self.config.seed * 1_000_003 + index)
+
+    def _profiles(self, first_customer_id: int, first_user_id: int) -> List[_MerchantProfile]:
+        cfg = self.config
+        profiles = []
+        for index in range(cfg.merchants):
+            rng = self._merchant_rng(index)
+            profiles.append(
+                _MerchantProfile(
+                    customer_id=first_customer_id + index,
+                    first_user_id=first_user_id + index * cfg.users_per_merchant,
+                    rng=rng,
+                    volatility=cfg.volatility.sample(rng),
+                    ticket_size=cfg.ticket_size.sample(rng),
+                    activity=min(1.0, max(0.0, cfg.activity.sample(rng))),
+                    growth_per_day=rng.gauss(0.0003, 0.0006),
+                    branches=rng.randint(1, 5),
+                )
+            )
+        return profiles
+
+    def _customer_rows(self, profiles: List[_MerchantProfile]) -> Iterator[Dict[str, Any]]:
+        for p in profiles:
+            rng = p.rng
+            yield {
+                "id": p.customer_id,
+                "legal_name": f"Synthetic Merchant {p.customer_id} LLC",
+                "trade_name": f"Merchant {p.customer_id}",
+                "cr_number": f"1010{p.customer_id:08d}",
+                "vat_number": f"3{p.customer_id:012d}3",
+                "country": "Saudi Arabia",
+                "city": rng.choice(_CITIES),
+                "industry": rng.choice(_INDUSTRIES),
+                "founded_date": self.today - timedelta(days=rng.randint(365, 365 * 15)),
+                "branches_count": p.branches,
+                "acquisition_channel": rng.choice(["silky_direct", "partner_referral"]),
+                "referral_partner_id": None,
+            }
+
+    def _setting_rows(self, profiles: List[_MerchantProfile]) -> Iterator[Dict[str, Any]]:
+        for p in profiles:
+            rng = p.rng
+            yield {
+                "customer_id": p.customer_id,
+                "subscription_plan": rng.choice(_PLANS),
+                "modules_enabled": ",".join(_MODULES[: rng.randint(1, len(_MODULES))]),
+                "go_live_date": self.today - timedelta(days=rng.randint(30, 365 * 4)),
+                "status": "active",
+            }
+
+    def _user_rows(self, profiles: List[_MerchantProfile]) -> Iterator[Dict[str, Any]]:
+        now = datetime.combine(self.today, datetime.min.time())
+        for p in profiles:
+            for offset in range(self.config.users_per_merchant):
+                role = _ROLES[offset % len(_ROLES)]
+                yield {
+                    "id": p.first_user_id + offset,
+                    "customer_id": p.customer_id,
+                    "name": f"{role.title()} {offset + 1}",
+                    "role": role,
+                    "created_at": now,
+                }
+
+    def _transaction_rows(self, p: _MerchantProfile) -> Iterator[Dict[str, Any]]:
+        cfg, rng = self.config, p.rng
+        for day_offset in range(cfg.days):
+            day = self.today - timedelta(days=day_offset)
+            # Weekly and annual seasonality plus a per-merchant trend.
+            seasonal = 1.0 + 0.15 * math.sin(2 * math.pi * day.weekday() / 7) + 0.1 * math.sin(
+                2 * math.pi * day.timetuple().tm_yday / 365
+            )
+            trend = math.exp(-p.growth_per_day * day_offset)
+            for _ in range(_poisson(rng, cfg.transactions_per_day * seasonal)):
+                yield {
+                    "customer_id": p.customer_id,
+                    "date": day,
+                    "net_sales": round(p.ticket_size * trend * rng.lognormvariate(0.0, p.volatility), 2),
+                    "branch_id": rng.randint(1, p.branches),
+                    "payment_method": rng.choice(_PAYMENT_METHODS),
+                }
+
+    def _usage_rows(self, p: _MerchantProfile) -> Iterator[Dict[str, Any]]:
+        cfg, rng = self.config, p.rng
+        midnight = datetime.combine(self.today, datetime.min.time())
+        for day_offset in range(cfg.days):
+            if rng.random() > p.activity:
+                continue
+            day = midnight - timedelta(days=day_offset)
+            for _ in range(_poisson(rng, cfg.events_per_day)):
+                module = rng.choice(_MODULES)
+                yield {
+                    "customer_id": p.customer_id,
+                    "user_id": p.first_user_id + rng.randrange(cfg.users_per_merchant),
+                    "module": module,
+                    "event_type": "login" if module == "POS" else "update",
+                    "timestamp": day + timedelta(seconds=rng.randint(8 * 3600, 23 * 3600)),
+                }
+
+    def _invoice_rows(self, p: _MerchantProfile) -> Iterator[Dict[str, Any]]:
+        cfg, rng = self.config, p.rng
+        months = max(1, cfg.days // 30)
+        late_bias = p.volatility
+        for month in range(months):
+            for _ in range(_poisson(rng, cfg.invoices_per_month)):
+                issue = self.today - timedelta(days=month * 30 + rng.randint(0, 29))
+                due = issue + timedelta(days=30)
+                roll = rng.random()
+                if due > self.today:
+                    status, paid = "open", None
+                elif roll < late_bias * 0.5:
+                    status, paid = "overdue", None
+                else:
+                    status, paid = "paid", due + timedelta(days=rng.randint(-10, int(30 * late_bias)))
+                yield {
+                    "customer_id": p.customer_id,
+                    "issue_date": issue,
+                    "due_date": due,
+                    "amount": round(p.ticket_size * rng.uniform(20, 200), 2),
+                    "status": status,
+                    "paid_date": paid,
+                }
+
+    def _fact_rows(self, profiles: List[_MerchantProfile], kind: str) -> Iterator[Dict[str, Any]]:
+        producer = {
+            "transactions": self._transaction_rows,
+            "usage": self._usage_rows,
+            "invoices": self._invoice_rows,
+        }[kind]
+        for p in profiles:
+            yield from producer(p)
+
+    def write(self, engine: Engine, progress: bool = False) -> Dict[str, int]:
+        """Append the configured dataset to `engine`'s database; returns row counts per table."""
+        cfg = self.config
+        counts: Dict[str, int] = {}
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                # Bulk load: the database is disposable until the transaction commits.
+                conn.execute(text("PRAGMA synchronous=OFF"))
+            first_customer_id = (conn.execute(select(func.max(Customer.id))).scalar() or 0) + 1
+            first_user_id = (conn.execute(select(func.max(User.id))).scalar() or 0) + 1
+            profiles = self._profiles(first_customer_id, first_user_id)
+
+            steps = [
+                ("customers", Customer, self._customer_rows(profiles)),
+                ("customer_settings", CustomerSetting, self._setting_rows(profiles)),
+                ("users", User, self._user_rows(profiles)),
+                ("pos_transactions", PosTransaction, self._fact_rows(profiles, "transactions")),
+                ("usage_events", UsageEvent, self._fact_rows(profiles, "usage")),
+                ("invoices", Invoice, self._fact_rows(profiles, "invoices")),
+            ]
+            for table_name, model, rows in steps:
+                started = time.perf_counter()
+                counts[table_name] = bulk_insert(conn, model, rows, cfg.chunk_size)
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    print(f"{table_name:<20} {counts[table_name]:>12,} rows in {elapsed:7.1f}s", file=sys.stderr)
+        return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=None, help="Target database (defaults to DB_URL)")
+    parser.add_argument("--merchants", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365, help="History length in days")
+    parser.add_argument("--transactions-per-day", type=float, default=14.0)
+    parser.add_argument("--events-per-day", type=float, default=20.0)
+    parser.add_argument("--invoices-per-month", type=float, default=4.0)
+    parser.add_argument("--users-per-merchant", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--volatility", default="beta:2,8", help="Per-merchant sales volatility distribution")
+    parser.add_argument("--ticket-size", default="lognormal:4.5,0.6", help="Per-merchant average ticket distribution")
+    parser.add_argument("--activity", default="beta:5,2", help="Per-merchant daily activity probability")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    config = GeneratorConfig(
+        merchants=args.merchants,
+        days=args.days,
+        transactions_per_day=args.transactions_per_day,
+        events_per_day=args.events_per_day,
+        invoices_per_month=args.invoices_per_month,
+        users_per_merchant=args.users_per_merchant,
+        seed=args.seed,
+        volatility=Distribution.parse(args.volatility),
+        ticket_size=Distribution.parse(args.ticket_size),
+        activity=Distribution.parse(args.activity),
+        chunk_size=args.chunk_size,
+    )
+
+    if args.db_url:
+        engine = create_engine(args.db_url, future=True)
+    else:
+        from .db import engine
+
+    from .db import Base
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    counts = SyntheticDataGenerator(config).write(engine, progress=True)
+    print(f"Generated {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
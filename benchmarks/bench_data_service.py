@@ -0,0 +1,185 @@
+"""Benchmark data_service feature extraction over scaled synthetic datasets.
+
+Usage:
+    python -m benchmarks.bench_data_service --sizes 1e3,1e4,1e5 --output bench.json
+    python -m benchmarks.bench_data_service --compare old.json new.json
+
+Each size gets a fresh SQLite database (see `benchmarks.datasets`). Every function is
+timed over `--repeat` runs (median and min wall time), then run once more under
+tracemalloc for peak Python memory; SQL statements are counted on the engine.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Never touch the developer database or require an API key when importing the app.
+os.environ.setdefault("DB_URL", f"sqlite:///{Path(tempfile.gettempdir()) / 'silky_bench_import.db'}")
+os.environ.setdefault("MODEL_PROVIDER", "local")
+
+import sqlalchemy  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db import Base  # noqa: E402
+from app.services import data_service  # noqa: E402
+from app.services.credit_agent_service import _coerce_model_output  # noqa: E402
+
+from .datasets import build_dataset  # noqa: E402
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args: Any) -> None:
+        self.count += 1
+
+
+def _model_output_payload(items: int) -> Dict[str, Any]:
+    """A model-shaped payload with `items` offers/flags that all need coercion."""
+    return {
+        "customer_id": 1,
+        "usage_mode": "internal_analytics",
+        "subscription_tier": "gold",
+        "unexpected_root_key": {"ignored": True},
+        "available_offers": [
+            {"type": "invoice_financing", "max_amount": 1000.0, "suggested_tenor_months": 6, "purpose": "stock"}
+            for _ in range(items)
+        ],
+        "early_warning_flags": [{"description": f"flag {i}"} for i in range(items)],
+        "recommendations_for_lender": [{"recommendation": f"rec {i}"} for i in range(items)],
+    }
+
+
+def _measure(fn: Callable[[], Any], counter: QueryCounter, repeat: int) -> Dict[str, Any]:
+    timings: List[float] = []
+    queries = 0
+    for _ in range(repeat):
+        before = counter.count
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+        queries = counter.count - before
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "peak_mem_bytes": peak,
+        "queries": queries,
+    }
+
+
+def run_size(rows: int, repeat: int, workdir: Path) -> List[Dict[str, Any]]:
+    db_path = workdir / f"bench_{rows}.db"
+    if db_path.exists():
+        db_path.unlink()
+    engine = create_engine(f"sqlite:///{db_path}", future=True)
+    Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    customer_id = build_dataset(engine, rows)
+    print(f"[{rows:>10,} rows] dataset built in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    counter = QueryCounter(engine)
+    payload = _model_output_payload(max(1, rows // 1000))
+    results: List[Dict[str, Any]] = []
+
+    with Session(engine) as db:
+        cases: Dict[str, Callable[[], Any]] = {
+            "fetch_customer_kyc": lambda: data_service.fetch_customer_kyc(db, customer_id),
+            "fetch_usage_metrics": lambda: data_service.fetch_usage_metrics(db, customer_id),
+            "fetch_financial_metrics": lambda: data_service.fetch_financial_metrics(db, customer_id),
+            "list_customers_with_latest_credit": lambda: data_service.list_customers_with_latest_credit(db),
+            "_coerce_model_output": lambda: _coerce_model_output(copy.deepcopy(payload)),
+        }
+        for name, fn in cases.items():
+            # Expire the identity map so every run pays for loading rows, as a request would.
+            measured = _measure(lambda: (db.expire_all(), fn()), counter, repeat)
+            results.append({"function": name, "rows": rows, **measured})
+            print(
+                f"[{rows:>10,} rows] {name:<36} median={measured['median_s'] * 1000:9.2f}ms "
+                f"peak={measured['peak_mem_bytes'] / 1024 / 1024:8.2f}MiB queries={measured['queries']}",
+                file=sys.stderr,
+            )
+
+    engine.dispose()
+    db_path.unlink(missing_ok=True)
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:  # noqa: BLE001
+        return "unknown"
+
+
+def compare(old_path: str, new_path: str) -> None:
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    baseline = {(r["function"], r["rows"]): r for r in old["results"]}
+
+    print(f"{'function':<36} {'rows':>10} {'time x':>8} {'mem x':>8} {'queries':>12}")
+    for result in new["results"]:
+        before = baseline.get((result["function"], result["rows"]))
+        if not before:
+            continue
+        time_ratio = result["median_s"] / before["median_s"] if before["median_s"] else float("inf")
+        mem_ratio = result["peak_mem_bytes"] / before["peak_mem_bytes"] if before["peak_mem_bytes"] else float("inf")
+        print(
+            f"{result['function']:<36} {result['rows']:>10,} {time_ratio:>8.2f} {mem_ratio:>8.2f} "
+            f"{before['queries']:>5} -> {result['queries']:<5}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1e3,1e4,1e5", help="Comma-separated row counts, up to 1e7")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write JSON results to this path")
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s.strip()]
+    results: List[Dict[str, Any]] = []
+    for rows in sizes:
+        results.extend(run_size(rows, args.repeat, Path(args.workdir)))
+
+    report = {
+        "revision": _git_revision(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "results": results,
+    }
+    output = args.output or f"bench_data_service_{report['revision']}.json"
+    Path(output).write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Compare response serialisation paths and bytes on the wire.
+
+Usage:
+    python -m benchmarks.bench_serialization --dashboards 200 --customers 5000
+
+"default" mirrors FastAPI's `response_model` pipeline (re-validate the model, dump it to
+JSON-compatible Python, then `json.dumps`); "fast" is `FastJSONResponse` rendering the
+already-validated model with pydantic-core, or the customer rows with orjson. Sizes are
+reported raw, gzipped and (when the `brotli` package is installed) brotli-compressed at
+the middleware's settings.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+os.environ.setdefault("DB_URL", f"sqlite:///{Path(tempfile.gettempdir()) / 'silky_bench_import.db'}")
+os.environ.setdefault("MODEL_PROVIDER", "local")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app import responses  # noqa: E402
+from app.responses import FastJSONResponse, compress_body  # noqa: E402
+from app.schemas import CreditDashboard, CustomerSummary  # noqa: E402
+from app.services.model_providers import synthesize_dashboard  # noqa: E402
+
+
+def _customer_rows(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": index,
+            "legal_name": f"Merchant {index} Trading Co.",
+            "trade_name": f"Merchant {index}",
+            "industry": rng.choice(["F&B_QSR", "Retail", "Pharma", "Logistics"]),
+            "city": rng.choice(["Riyadh", "Jeddah", "Dammam"]),
+            "subscription_plan": rng.choice(["standard", "pro", "enterprise"]),
+            "latest_credit": {
+                "credit_score": rng.randint(40, 95),
+                "credit_band": rng.choice(["A", "B", "C"]),
+                "recommended_credit_limit_amount": round(rng.uniform(1e4, 1e6), 2),
+                "recommended_credit_limit_currency": "SAR",
+                "max_safe_tenor_months": rng.choice([6, 12, 18]),
+                "snapshot_at": "2025-06-15T12:00:00",
+            },
+        }
+        for index in range(1, count + 1)
+    ]
+
+
+def _time_ms(render: Callable[[], bytes], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _sizes(body: bytes) -> Dict[str, int]:
+    sizes = {"raw": len(body), "gzip": len(compress_body(body, "gzip"))}
+    if responses.brotli is not None:
+        sizes["br"] = len(compress_body(body, "br"))
+    return sizes
+
+
+def run(dashboards: int, customers: int, repeat: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    models = [
+        CreditDashboard.model_validate(synthesize_dashboard({"customer_id": index}, rng, "bench", "local"))
+        for index in range(dashboards)
+    ]
+    rows = _customer_rows(customers, rng)
+
+    def default_dashboard(model: CreditDashboard) -> bytes:
+        validated = CreditDashboard.model_validate(model.model_dump())
+        return JSONResponse(jsonable_encoder(validated)).body
+
+    def default_customers() -> bytes:
+        validated = [CustomerSummary.model_validate(row) for row in rows]
+        return JSONResponse(jsonable_encoder(validated)).body
+
+    dashboard_default = [_time_ms(lambda m=m: default_dashboard(m), repeat) for m in models]
+    dashboard_fast = [_time_ms(lambda m=m: FastJSONResponse(m).body, repeat) for m in models]
+    sample_body = FastJSONResponse(models[0]).body
+    customer_body = FastJSONResponse(rows).body
+
+    return {
+        "orjson": responses.orjson is not None,
+        "brotli": responses.brotli is not None,
+        "dashboard": {
+            "default_ms": statistics.median(dashboard_default),
+            "fast_ms": statistics.median(dashboard_fast),
+            "bytes": _sizes(sample_body),
+        },
+        "customers": {
+            "rows": customers,
+            "default_ms": _time_ms(default_customers, repeat),
+            "fast_ms": _time_ms(lambda: FastJSONResponse(rows).body, repeat),
+            "bytes": _sizes(customer_body),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dashboards", type=int, default=100)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.dashboards, args.customers, args.repeat, args.seed)
+    print(f"orjson={report['orjson']} brotli={report['brotli']}")
+    print(f"{'payload':<10} {'default ms':>11} {'fast ms':>8} {'raw KiB':>8} {'gzip KiB':>9} {'br KiB':>7}")
+    for name in ("dashboard", "customers"):
+        stats = report[name]
+        sizes = stats["bytes"]
+        br = f"{sizes['br'] / 1024:>7.1f}" if "br" in sizes else f"{'-':>7}"
+        print(
+            f"{name:<10} {stats['default_ms']:>11.3f} {stats['fast_ms']:>8.3f} "
+            f"{sizes['raw'] / 1024:>8.1f} {sizes['gzip'] / 1024:>9.1f} {br}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Compare snapshot payload storage settings (codec and delta chain length).
+
+Usage:
+    python -m benchmarks.bench_snapshot_storage --customers 50 --regenerations 10
+
+Dashboards come from the local stub model. Each regeneration re-rolls a few sections of
+the previous dashboard for the same view, like a refresh after new data, so delta
+encoding has something to share. Reports raw vs stored bytes and write/read time.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+os.environ.setdefault("DB_URL", f"sqlite:///{Path(tempfile.gettempdir()) / 'silky_bench_import.db'}")
+os.environ.setdefault("MODEL_PROVIDER", "local")
+
+from sqlalchemy import create_engine, func  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.db import Base  # noqa: E402
+from app.models import SilkyCreditProfileSnapshot, SilkyCreditSnapshotPayload  # noqa: E402
+from app.services import snapshot_store  # noqa: E402
+from app.services.model_providers import synthesize_dashboard  # noqa: E402
+
+_REROLLED_SECTIONS = ("credit_analysis", "early_warning_flags", "recommendations_for_lender")
+
+
+def _dashboards(customers: int, regenerations: int, seed: int) -> List[Tuple[int, str]]:
+    rng = random.Random(seed)
+    documents: List[Tuple[int, str]] = []
+    for customer_id in range(1, customers + 1):
+        current = synthesize_dashboard({"customer_id": customer_id}, rng, "bench", "local")
+        for _ in range(regenerations):
+            fresh = synthesize_dashboard({"customer_id": customer_id}, rng, "bench", "local")
+            for section in rng.sample(_REROLLED_SECTIONS, 2):
+                current[section] = fresh.get(section)
+            documents.append((customer_id, json.dumps(current)))
+    return documents
+
+
+def run_case(codec: str, max_chain: int, documents: List[Tuple[int, str]]) -> Dict[str, Any]:
+    settings.snapshot_compression = codec
+    settings.snapshot_delta_max_chain = max_chain
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine)
+    started_at = datetime(2025, 1, 1)
+
+    with Session(engine) as db:
+        started = time.perf_counter()
+        for index, (customer_id, document) in enumerate(documents):
+            snapshot = SilkyCreditProfileSnapshot(
+                customer_id=customer_id,
+                snapshot_at=started_at + timedelta(seconds=index),
+                viewer_type="silky_internal",
+                usage_mode="internal_analytics",
+                subscription_tier="pro",
+                credit_score=70,
+                credit_band="B",
+                recommended_credit_limit_amount=1000.0,
+                max_safe_tenor_months=6,
+            )
+            db.add(snapshot)
+            db.flush()
+            snapshot_store.save_payload(db, snapshot, document)
+            db.commit()
+        write_s = time.perf_counter() - started
+
+        raw, stored = db.query(
+            func.sum(SilkyCreditSnapshotPayload.raw_bytes), func.sum(func.length(SilkyCreditSnapshotPayload.data))
+        ).one()
+        ids = [row.id for row in db.query(SilkyCreditProfileSnapshot.id)]
+        db.expire_all()
+        started = time.perf_counter()
+        for snapshot_id in ids:
+            snapshot_store.load_payload_json(db, snapshot_id)
+        read_s = time.perf_counter() - started
+
+    engine.dispose()
+    return {
+        "codec": codec,
+        "max_chain": max_chain,
+        "snapshots": len(documents),
+        "raw_bytes": int(raw),
+        "stored_bytes": int(stored),
+        "ratio": raw / stored if stored else 0.0,
+        "write_ms_per_snapshot": 1000 * write_s / len(documents),
+        "read_ms_per_snapshot": 1000 * read_s / len(documents),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--regenerations", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    documents = _dashboards(args.customers, args.regenerations, args.seed)
+    codecs = ["gzip"] + (["zstd"] if snapshot_store.zstandard is not None else [])
+    results = [run_case(codec, max_chain, documents) for codec in codecs for max_chain in (0, 4)]
+
+    print(f"{'codec':<6} {'chain':>5} {'raw MiB':>9} {'stored MiB':>11} {'ratio':>7} {'write ms':>9} {'read ms':>8}")
+    for r in results:
+        print(
+            f"{r['codec']:<6} {r['max_chain']:>5} {r['raw_bytes'] / 2**20:>9.2f} {r['stored_bytes'] / 2**20:>11.2f} "
+            f"{r['ratio']:>7.1f} {r['write_ms_per_snapshot']:>9.3f} {r['read_ms_per_snapshot']:>8.3f}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
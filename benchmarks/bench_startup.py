@@ -0,0 +1,94 @@
+"""Measure cold-start time of the app in fresh interpreter processes.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10
+
+For each profile a new Python process imports `main` (import time), runs the startup
+hooks and serves its first `/api/customers` request. The "dev" profile creates the
+schema and seeds demo data on startup; "prod" has both switched off and expects an
+existing database. The model provider is the local stub, so no API key is needed.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    status = client.get("/api/customers").status_code
+    first = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "startup_s": ready - imported,
+    "first_request_s": first - ready,
+    "total_s": first - started,
+    "status": status,
+}))
+"""
+
+PROFILES = {
+    "dev": {"ENV": "dev", "AUTO_CREATE_SCHEMA": "true", "SEED_DEMO_DATA": "true"},
+    "prod": {"ENV": "prod", "AUTO_CREATE_SCHEMA": "false", "SEED_DEMO_DATA": "false"},
+}
+
+
+def _probe(env: Dict[str, str]) -> Dict[str, Any]:
+    output = subprocess.check_output([sys.executable, "-c", _PROBE], cwd=ROOT, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs: int, db_path: Path) -> Dict[str, Any]:
+    base_env = {
+        **os.environ,
+        "DB_URL": f"sqlite:///{db_path}",
+        "MODEL_PROVIDER": "local",
+        "LOG_LEVEL": "WARNING",
+    }
+    # Build the database once so "prod" starts against an existing schema.
+    _probe({**base_env, **PROFILES["dev"]})
+
+    report: Dict[str, Any] = {}
+    for name, overrides in PROFILES.items():
+        samples = [_probe({**base_env, **overrides}) for _ in range(runs)]
+        report[name] = {
+            key: statistics.median(sample[key] for sample in samples)
+            for key in ("import_s", "startup_s", "first_request_s", "total_s")
+        }
+        report[name]["statuses"] = sorted({sample["status"] for sample in samples})
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report = run(args.runs, Path(workdir) / "startup.db")
+
+    print(f"{'profile':<8} {'import ms':>10} {'startup ms':>11} {'first req ms':>13} {'total ms':>9}")
+    for name, stats in report.items():
+        print(
+            f"{name:<8} {stats['import_s'] * 1000:>10.1f} {stats['startup_s'] * 1000:>11.1f} "
+            f"{stats['first_request_s'] * 1000:>13.1f} {stats['total_s'] * 1000:>9.1f}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
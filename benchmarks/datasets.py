@@ -0,0 +1,172 @@
+"""Scaled synthetic datasets for benchmarks.
+
+`build_dataset(engine, rows)` fills an empty database so that the benchmarked customer
+(id 1) owns `rows` POS transactions and `rows` usage events, with `rows // 10` invoices,
+while the portfolio holds `max(10, rows // 1000)` customers and `rows // 100` snapshots
+(capped at `MAX_SNAPSHOTS` so the largest sizes stay within laptop disk budgets).
+"""
+import json
+import random
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Customer,
+    CustomerSetting,
+    Invoice,
+    PosTransaction,
+    SilkyCreditProfileSnapshot,
+    SilkyCreditSnapshotPayload,
+    UsageEvent,
+    User,
+)
+from app.services.snapshot_store import backfill_latest_pointers, compress
+from app.synthetic_data import bulk_insert
+
+TARGET_CUSTOMER_ID = 1
+MAX_SNAPSHOTS = 20_000
+
+# Roughly the size of a real dashboard so payload rows have a realistic width.
+_DASHBOARD_FILLER = json.dumps({"padding": "x" * 12_000}).encode("utf-8")
+
+
+def _bulk_insert(engine: Engine, model, rows: Iterator[Dict[str, Any]]) -> None:
+    with engine.begin() as conn:
+        bulk_insert(conn, model, rows)
+
+
+def _invoice_row(rng: random.Random, today: date) -> Dict[str, Any]:
+    issue = today - timedelta(days=rng.randint(0, 730))
+    return {
+        "customer_id": TARGET_CUSTOMER_ID,
+        "issue_date": issue,
+        "due_date": issue + timedelta(days=30),
+        "amount": round(rng.uniform(1000, 25000), 2),
+        "status": rng.choice(["paid", "paid", "open", "overdue"]),
+        "paid_date": None,
+    }
+
+
+def build_dataset(engine: Engine, rows: int, seed: int = 0) -> int:
+    """Populate an empty schema and return the id of the benchmarked customer."""
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+    customer_count = max(10, rows // 1000)
+
+    _bulk_insert(
+        engine,
+        Customer,
+        (
+            {
+                "id": cid,
+                "legal_name": f"Bench Merchant {cid}",
+                "trade_name": f"Bench {cid}",
+                "country": "Saudi Arabia",
+                "city": rng.choice(["Riyadh", "Jeddah", "Dammam"]),
+                "industry": rng.choice(["F&B_QSR", "Retail", "FMCG"]),
+                "founded_date": today - timedelta(days=365 * 5),
+                "branches_count": 3,
+                "acquisition_channel": "silky_direct",
+            }
+            for cid in range(1, customer_count + 1)
+        ),
+    )
+    _bulk_insert(
+        engine,
+        CustomerSetting,
+        (
+            {
+                "customer_id": cid,
+                "subscription_plan": "pro",
+                "modules_enabled": "POS,Inventory,Invoices",
+                "go_live_date": today - timedelta(days=700),
+                "status": "active",
+            }
+            for cid in range(1, customer_count + 1)
+        ),
+    )
+    _bulk_insert(
+        engine,
+        User,
+        (
+            {"id": (cid - 1) * 3 + i + 1, "customer_id": cid, "name": f"user-{i}", "role": "cashier", "created_at": now}
+            for cid in range(1, customer_count + 1)
+            for i in range(3)
+        ),
+    )
+
+    _bulk_insert(
+        engine,
+        PosTransaction,
+        (
+            {
+                "customer_id": TARGET_CUSTOMER_ID,
+                "date": today - timedelta(days=rng.randint(0, 730)),
+                "net_sales": round(rng.uniform(50, 900), 2),
+                "branch_id": rng.randint(1, 3),
+                "payment_method": "card",
+            }
+            for _ in range(rows)
+        ),
+    )
+    _bulk_insert(
+        engine,
+        UsageEvent,
+        (
+            {
+                "customer_id": TARGET_CUSTOMER_ID,
+                "user_id": rng.randint(1, 3),
+                "module": rng.choice(["POS", "Inventory", "Invoices"]),
+                "event_type": "login",
+                "timestamp": now - timedelta(minutes=rng.randint(0, 180 * 24 * 60)),
+            }
+            for _ in range(rows)
+        ),
+    )
+    _bulk_insert(engine, Invoice, (_invoice_row(rng, today) for _ in range(max(1, rows // 10))))
+    snapshot_count = max(customer_count, min(rows // 100, MAX_SNAPSHOTS))
+    _bulk_insert(
+        engine,
+        SilkyCreditProfileSnapshot,
+        (
+            {
+                "id": i + 1,
+                "customer_id": (i % customer_count) + 1,
+                "snapshot_at": now - timedelta(minutes=i),
+                "viewer_type": "silky_internal",
+                "usage_mode": "internal_analytics",
+                "subscription_tier": "pro",
+                "lender_id": None,
+                "credit_score": rng.randint(40, 95),
+                "credit_band": "B",
+                "recommended_credit_limit_amount": 10_000.0,
+                "recommended_credit_limit_currency": "SAR",
+                "max_safe_tenor_months": 12,
+            }
+            for i in range(snapshot_count)
+        ),
+    )
+    compressed = compress(_DASHBOARD_FILLER, "gzip")
+    _bulk_insert(
+        engine,
+        SilkyCreditSnapshotPayload,
+        (
+            {
+                "snapshot_id": i + 1,
+                "codec": "gzip",
+                "base_snapshot_id": None,
+                "chain_depth": 0,
+                "raw_bytes": len(_DASHBOARD_FILLER),
+                "data": compressed,
+            }
+            for i in range(snapshot_count)
+        ),
+    )
+    with Session(engine) as db:
+        backfill_latest_pointers(db)
+        db.commit()
+    return TARGET_CUSTOMER_ID
@@ -0,0 +1,246 @@
+"""HTTP load generator for the Silky Credit API.
+
+Start the app with the model stubbed, then drive it:
+
+    MODEL_PROVIDER=local LOCAL_MODEL_LATENCY_MS=800 LOCAL_MODEL_LATENCY_SIGMA=0.4 \\
+        uvicorn main:app --workers 1
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 --concurrency 32 \\
+        --duration 60 --mix dashboard=70,customers=25,page=5 --cache-hit-ratio 0.9
+
+Or let the harness start a stubbed single-worker server itself with `--spawn`.
+
+Dashboard cache hits reuse one pre-warmed view per customer; misses send a unique
+`lender_id`, which forces a full generation. Throughput and p50/p95/p99 latency are
+reported per endpoint and can be saved as JSON with `--output`.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+ENDPOINTS = ("dashboard", "customers", "page")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' in mix; expected {ENDPOINTS}")
+        mix[name] = float(weight)
+    return mix
+
+
+class LoadTest:
+    def __init__(
+        self,
+        base_url: str,
+        concurrency: int,
+        duration: float,
+        mix: Dict[str, float],
+        cache_hit_ratio: float,
+        customer_ids: List[int],
+        seed: int = 0,
+        timeout: float = 120.0,
+    ):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.concurrency = concurrency
+        self.duration = duration
+        self.mix = mix
+        self.cache_hit_ratio = cache_hit_ratio
+        self.customer_ids = customer_ids
+        self.seed = seed
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        self._errors: Dict[str, int] = defaultdict(int)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _pick_request(self, rng: random.Random) -> Tuple[str, str]:
+        endpoint = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        if endpoint == "customers":
+            return endpoint, "/api/customers"
+        if endpoint == "page":
+            return endpoint, "/dashboard"
+        customer_id = rng.choice(self.customer_ids)
+        if rng.random() < self.cache_hit_ratio:
+            return "dashboard_hit", f"/api/credit-dashboard/{customer_id}"
+        return "dashboard_miss", f"/api/credit-dashboard/{customer_id}?lender_id=LT-{uuid.uuid4().hex[:12]}"
+
+    def _request(self, conn: http.client.HTTPConnection, path: str) -> Tuple[int, float]:
+        started = time.perf_counter()
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+
+    def warm_up(self) -> None:
+        """Generate the cache-hit view for every customer before measuring."""
+        conn = self._connection()
+        for customer_id in self.customer_ids:
+            self._request(conn, f"/api/credit-dashboard/{customer_id}")
+        conn.close()
+
+    def _worker(self, index: int, deadline: float) -> None:
+        rng = random.Random(self.seed * 7919 + index)
+        conn = self._connection()
+        while time.perf_counter() < deadline:
+            name, path = self._pick_request(rng)
+            try:
+                status, elapsed = self._request(conn, path)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = self._connection()
+                with self._lock:
+                    self._errors[name] += 1
+                continue
+            with self._lock:
+                self._latencies[name].append(elapsed)
+                if status >= 400:
+                    self._errors[name] += 1
+        conn.close()
+
+    def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        deadline = started + self.duration
+        threads = [
+            threading.Thread(target=self._worker, args=(i, deadline), daemon=True) for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints: Dict[str, Any] = {}
+        total = 0
+        for name in sorted(set(self._latencies) | set(self._errors)):
+            latencies = sorted(self._latencies.get(name, []))
+            total += len(latencies)
+            endpoints[name] = {
+                "requests": len(latencies),
+                "errors": self._errors.get(name, 0),
+                "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+                "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50_ms": 1000 * percentile(latencies, 50),
+                "p95_ms": 1000 * percentile(latencies, 95),
+                "p99_ms": 1000 * percentile(latencies, 99),
+                "max_ms": 1000 * latencies[-1] if latencies else 0.0,
+            }
+        return {
+            "concurrency": self.concurrency,
+            "duration_s": elapsed,
+            "mix": self.mix,
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "total_requests": total,
+            "throughput_rps": total / elapsed if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def _fetch_customer_ids(base_url: str, limit: int) -> List[int]:
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=60)
+    conn.request("GET", "/api/customers")
+    customers = json.loads(conn.getresponse().read())
+    conn.close()
+    return [c["id"] for c in customers[:limit]]
+
+
+def _spawn_server(base_url: str) -> subprocess.Popen:
+    parts = urlsplit(base_url)
+    env = {**os.environ, "MODEL_PROVIDER": os.environ.get("MODEL_PROVIDER", "local")}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", parts.hostname or "127.0.0.1",
+         "--port", str(parts.port or 8000), "--workers", "1", "--log-level", "warning"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            _fetch_customer_ids(base_url, 1)
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become ready")
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['total_requests']} requests in {report['duration_s']:.1f}s "
+        f"({report['throughput_rps']:.1f} req/s, concurrency={report['concurrency']})"
+    )
+    print(f"{'endpoint':<16} {'reqs':>7} {'err':>5} {'rps':>8} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'maxms':>9}")
+    for name, stats in report["endpoints"].items():
+        print(
+            f"{name:<16} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--mix", default="dashboard=70,customers=25,page=5")
+    parser.add_argument("--cache-hit-ratio", type=float, default=0.9)
+    parser.add_argument("--customers", type=int, default=50, help="Number of customers to spread dashboards over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-warm-up", action="store_true")
+    parser.add_argument("--spawn", action="store_true", help="Start a stubbed single-worker uvicorn first")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    server = _spawn_server(args.base_url) if args.spawn else None
+    try:
+        test = LoadTest(
+            base_url=args.base_url,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            mix=parse_mix(args.mix),
+            cache_hit_ratio=args.cache_hit_ratio,
+            customer_ids=_fetch_customer_ids(args.base_url, args.customers),
+            seed=args.seed,
+        )
+        if not args.no_warm_up:
+            test.warm_up()
+        report = test.run()
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,15 @@ from fastapi.staticfiles import StaticFiles
 
 from app.api import router as credit_router
 from app.config import settings
-from app.db import Base, engine
+from app.db import Base, dispose_async_engines, get_engine, register_engine_hook
+from app import metrics, profiling
+from app.responses import CompressionMiddleware, FastJSONResponse
+from app.jobs import DashboardJobWorker
+from app.migrate import upgrade_database
+from app.prewarm import PrewarmScheduler, parse_windows
+from app.retention import RetentionWorker
 from app.seed_db import seed_database
+from app.services import data_versions
 
 
 def create_app() -> FastAPI:
@@ -15,12 +22,20 @@ def create_app() -> FastAPI:
         format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
     )
     logger = logging.getLogger(__name__)
+    data_versions.register()
 
     app = FastAPI(
         title=settings.project_name,
         version="2.0.0",
+        default_response_class=FastJSONResponse,
     )
 
+    register_engine_hook(metrics.instrument_engine)
+    register_engine_hook(profiling.instrument_engine)
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(profiling.ProfilingMiddleware)
+    app.add_middleware(metrics.MetricsMiddleware)
+
     app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
     app.include_router(credit_router)
@@ -28,12 +43,35 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     async def startup_event():
         logger.info("🚀 Starting Silky Credit & Behaviour Engine (ChatGPT 5.1)...")
-        logger.info("📦 Creating tables (if not exist)...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("🌱 Seeding demo data (if DB empty)...")
-        seed_database()
+        settings.require_openai_api_key()
+        if settings.auto_create_schema:
+            logger.info("📦 Creating tables (if not exist)...")
+            Base.metadata.create_all(bind=get_engine())
+        upgrade_database(get_engine())
+        if settings.seed_demo_data:
+            logger.info("🌱 Seeding demo data (if DB empty)...")
+            seed_database(create_schema=False)
+        if settings.snapshot_retention_interval_seconds > 0:
+            app.state.retention_worker = RetentionWorker(get_engine(), settings.snapshot_retention_interval_seconds)
+            app.state.retention_worker.start()
+        if settings.dashboard_job_workers > 0:
+            app.state.job_worker = DashboardJobWorker(settings.dashboard_job_workers)
+            app.state.job_worker.start()
+        if settings.prewarm_windows:
+            app.state.prewarm_scheduler = PrewarmScheduler(
+                parse_windows(settings.prewarm_windows), settings.prewarm_interval_seconds
+            )
+            app.state.prewarm_scheduler.start()
         logger.info("✅ Startup complete.")
 
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        for name in ("retention_worker", "job_worker", "prewarm_scheduler"):
+            worker = getattr(app.state, name, None)
+            if worker is not None:
+                worker.stop()
+        await dispose_async_engines()
+
     return app
 
 
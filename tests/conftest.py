@@ -0,0 +1,214 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _stub_dashboard_payload(customer_id: int) -> dict[str, Any]:
+    return {
+        "customer_id": customer_id,
+        "usage_mode": "internal_analytics",
+        "subscription_tier": "standard",
+        "kyc_profile": {
+            "legal_name": "Test Co",
+            "trade_name": "Test Co",
+            "registration": {
+                "cr_number": "123",
+                "vat_number": "456",
+                "country": "SA",
+                "city": "Riyadh",
+                "years_in_business": 5,
+            },
+            "segment": "F&B_QSR",
+            "branches_count": 2,
+            "acquisition_channel": "silky_direct",
+            "referral_partner_id": None,
+            "relationship_with_silky": {
+                "go_live_date": "2022-01-01",
+                "subscription_plan": "pro",
+                "modules_enabled": ["POS", "Inventory"],
+                "tenure_months": 24,
+                "silky_payment_behaviour": "on_time",
+            },
+        },
+        "behaviour_profile": {
+            "activity": {
+                "status": "active",
+                "active_days_last_90": 30,
+                "logins_last_90": 120,
+                "active_users": 3,
+                "total_users": 3,
+            },
+            "feature_adoption": [
+                {"module": "POS", "usage_level": "high", "key_metrics": {"events_last_90": 120}},
+            ],
+            "discipline": {
+                "invoice_matching_rate": 0.92,
+                "stock_update_frequency": "weekly",
+                "data_completeness_score": 0.9,
+            },
+            "behaviour_risks": ["Late-night logins"],
+        },
+        "financial_health": {
+            "revenue": {
+                "avg_monthly_revenue": 12000.0,
+                "revenue_trend": "growing",
+                "growth_rate_yoy": 0.15,
+                "growth_rate_mom": 0.04,
+                "revenue_volatility_score": 0.2,
+            },
+            "profitability_proxy": {"gross_margin_percent": 42.0, "comment": "Healthy"},
+            "liquidity": {
+                "avg_dso_days": 28.0,
+                "avg_dpo_days": 35.0,
+                "cash_conversion_cycle_days": -7.0,
+                "overdue_invoices_ratio": 0.1,
+            },
+            "concentration": {"revenue_concentration_comment": "Diversified", "top_customer_share": 0.3},
+            "seasonality": {"has_strong_seasonality": False, "seasonality_comment": "Stable"},
+        },
+        "cashflow_forecast": {
+            "base_case": {
+                "currency": "SAR",
+                "net_cash_flow_next_3_months": 50000.0,
+                "net_cash_flow_next_12_months": 200000.0,
+            },
+            "conservative_case": {
+                "currency": "SAR",
+                "net_cash_flow_next_3_months": 30000.0,
+                "net_cash_flow_next_12_months": 120000.0,
+            },
+            "optimistic_case": {
+                "currency": "SAR",
+                "net_cash_flow_next_3_months": 70000.0,
+                "net_cash_flow_next_12_months": 260000.0,
+            },
+            "confidence_level": "medium",
+            "key_drivers": ["Stable POS throughput"],
+        },
+        "credit_analysis": {
+            "credit_score": 85,
+            "credit_band": "A",
+            "recommended_credit_limit": {
+                "amount": 4000.0,
+                "currency": "SAR",
+                "logic_comment": "~33% of average monthly revenue",
+            },
+            "max_safe_tenor_months": 12,
+            "score_explanation": {
+                "positive_drivers": ["Growing revenue", "Healthy margins"],
+                "risk_factors": ["Moderate volatility"],
+            },
+            "data_quality_comment": "Synthetic data for test",
+        },
+        "safety_and_compliance": {
+            "used_sensitive_attributes": False,
+            "notes": "",
+            "regulatory_flags": [],
+        },
+        "available_offers": [
+            {
+                "offer_id": "offer-1",
+                "product_type": "working_capital_loan",
+                "amount": 20000,
+                "currency": "SAR",
+                "tenor_months": 9,
+                "apr_percent": 8.0,
+            }
+        ],
+        "early_warning_flags": ["Higher refund ratio"],
+        "recommendations_for_lender": ["Consider stepped limit"],
+        "improvement_actions_for_merchant": ["Tighten stock reconciliation"],
+        "segment_specific_strengths": [],
+        "segment_specific_risks": [],
+        "audit_metadata": {
+            "model_version": "gpt-test",
+            "model_provider": "openai-chatgpt-5.1",
+            "input_data_date_range": "2023-01 to 2023-12",
+            "generated_at": "2024-01-01T00:00:00",
+        },
+        "economics": {
+            "estimated_annual_revenue_to_silky": 10000.0,
+            "estimated_annual_revenue_to_lender": 45000.0,
+            "economics_comment": "Healthy LTV",
+        },
+        "lender_profile": None,
+    }
+
+
+def _create_test_app(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> TestClient:
+    db_url = f"sqlite:///{tmp_path / 'unit.db'}"
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-test")
+    monkeypatch.setenv("DB_URL", db_url)
+    monkeypatch.setenv("PROFILING_TOKEN", "test-profile-token")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "profiles"))
+    # Tests drive the job queue themselves instead of racing in-process workers.
+    monkeypatch.setenv("DASHBOARD_JOB_WORKERS", "0")
+
+    for module_name in [
+        "main",
+        "app.api",
+        "app.config",
+        "app.db",
+        "app.models",
+        "app.seed_db",
+        "app.retention",
+        "app.jobs",
+        "app.migrate",
+        "app.prewarm",
+        "app.profiling",
+        "app.services.model_providers",
+        "app.services.credit_agent_service",
+        "app.services.data_versions",
+        "app.services.portfolio",
+        "app.services.snapshot_store",
+        "app.services.usage_service",
+    ]:
+        sys.modules.pop(module_name, None)
+
+    import app.config as config
+    importlib.reload(config)
+    import app.db as db
+    importlib.reload(db)
+    db.Base.metadata.clear()
+    import app.models as models
+    import app.seed_db as seed_db
+    importlib.reload(seed_db)
+    import app.services.model_providers as model_providers
+    import app.services.credit_agent_service as credit_agent_service
+    importlib.reload(credit_agent_service)
+
+    class _StubProvider(model_providers.ModelProvider):
+        name = "test-stub"
+        model_version = "gpt-test"
+
+        def generate(self, request: model_providers.ModelRequest) -> model_providers.ModelResult:
+            payload = _stub_dashboard_payload(customer_id=1)
+            return model_providers.ModelResult(
+                text=json.dumps(payload), input_tokens=1200, output_tokens=800, cached_tokens=1000
+            )
+
+    model_providers.set_model_provider(_StubProvider())
+
+    import main as main_module
+    importlib.reload(main_module)
+
+    seed_db.seed_database()
+    client = TestClient(main_module.create_app())
+    client.credit_agent_service = credit_agent_service
+    return client
+
+
+@pytest.fixture()
+def client(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    with _create_test_app(monkeypatch, tmp_path) as client:
+        yield client
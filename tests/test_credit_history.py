@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+
+def _add_snapshots(customer_id: int, viewer_type: str = "silky_internal", base_score: int = 60) -> None:
+    from app import db as app_db, models
+
+    # Mon 2025-06-02 .. Sat 2025-07-05, two snapshots a day with the score drifting up.
+    first_day = datetime(2025, 6, 2)
+    with app_db.SessionLocal() as session:
+        for day in range(34):
+            for hour, bump in ((9, 0), (17, 1)):
+                score = base_score + day // 2 + bump
+                session.add(
+                    models.SilkyCreditProfileSnapshot(
+                        customer_id=customer_id,
+                        snapshot_at=first_day + timedelta(days=day, hours=hour),
+                        viewer_type=viewer_type,
+                        usage_mode="internal_analytics",
+                        subscription_tier="standard",
+                        credit_score=score,
+                        credit_band="B" if score >= 70 else "C",
+                        recommended_credit_limit_amount=1000.0 * score,
+                        recommended_credit_limit_currency="SAR",
+                        max_safe_tenor_months=12,
+                    )
+                )
+        session.commit()
+
+
+def test_history_is_downsampled_per_period(client: TestClient):
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    _add_snapshots(customer_id)
+    # Merchant-view snapshots never leak into the default internal history.
+    _add_snapshots(customer_id, viewer_type="merchant", base_score=20)
+    url = f"/api/credit-dashboard/{customer_id}/history"
+
+    raw = client.get(url, params={"resolution": "raw"}).json()
+    assert len(raw) == 68
+    assert raw[0]["snapshot_at"] == "2025-06-02T09:00:00"
+
+    daily = client.get(url, params={"resolution": "daily", "start": "2025-06-10", "end": "2025-06-12"}).json()
+    assert [point["period_start"] for point in daily] == ["2025-06-10", "2025-06-11"]
+    assert daily[0]["snapshots"] == 2
+    assert daily[0]["snapshot_at"] == "2025-06-10T17:00:00"
+    assert (daily[0]["min_credit_score"], daily[0]["credit_score"]) == (64, 65)
+
+    weekly = client.get(url, params={"resolution": "weekly"}).json()
+    assert [point["period_start"] for point in weekly][:2] == ["2025-06-02", "2025-06-09"]
+    assert weekly[0]["snapshots"] == 14
+    # The closing point is the Sunday evening snapshot.
+    assert weekly[0]["snapshot_at"] == "2025-06-08T17:00:00"
+
+    monthly = client.get(url, params={"resolution": "monthly"}).json()
+    assert [(point["period_start"], point["snapshots"]) for point in monthly] == [("2025-06-01", 58), ("2025-07-01", 10)]
+    assert monthly[-1]["credit_band"] == "B"
+
+    merchant = client.get(url, params={"resolution": "monthly", "viewer_type": "merchant"}).json()
+    assert [point["min_credit_score"] for point in merchant] == [20, 34]
+
+    assert client.get(url, params={"resolution": "hourly"}).status_code == 422
+    assert client.get(url, params={"start": "2025-07-01", "end": "2025-06-01"}).status_code == 400
+
+
+def test_history_periods_compile_for_mysql():
+    from sqlalchemy import column
+    from sqlalchemy.dialects import mysql
+
+    from app.services.credit_history import _period_start
+
+    def _sql(resolution: str) -> str:
+        expression = _period_start(column("snapshot_at"), resolution, "mysql")
+        return str(expression.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    assert _sql("daily") == "date(snapshot_at)"
+    assert _sql("weekly") == "subdate(date(snapshot_at), weekday(snapshot_at))"
+    assert _sql("monthly").startswith("date_format(snapshot_at, '%")
@@ -1,210 +1,9 @@
-import importlib
 import json
-import sys
 from pathlib import Path
-from typing import Any
 
 import pytest
 from fastapi.testclient import TestClient
 
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
-
-
-class _FakeContent:
-    def __init__(self, text: str):
-        self.text = text
-
-
-class _FakeOutput:
-    def __init__(self, text: str):
-        self.content = [_FakeContent(text)]
-
-
-class _FakeResponse:
-    def __init__(self, text: str):
-        self.output = [_FakeOutput(text)]
-
-
-def _stub_dashboard_payload(customer_id: int) -> dict[str, Any]:
-    return {
-        "customer_id": customer_id,
-        "usage_mode": "internal_analytics",
-        "subscription_tier": "standard",
-        "kyc_profile": {
-            "legal_name": "Test Co",
-            "trade_name": "Test Co",
-            "registration": {
-                "cr_number": "123",
-                "vat_number": "456",
-                "country": "SA",
-                "city": "Riyadh",
-                "years_in_business": 5,
-            },
-            "segment": "F&B_QSR",
-            "branches_count": 2,
-            "acquisition_channel": "silky_direct",
-            "referral_partner_id": None,
-            "relationship_with_silky": {
-                "go_live_date": "2022-01-01",
-                "subscription_plan": "pro",
-                "modules_enabled": ["POS", "Inventory"],
-                "tenure_months": 24,
-                "silky_payment_behaviour": "on_time",
-            },
-        },
-        "behaviour_profile": {
-            "activity": {
-                "status": "active",
-                "active_days_last_90": 30,
-                "logins_last_90": 120,
-                "active_users": 3,
-                "total_users": 3,
-            },
-            "feature_adoption": [
-                {"module": "POS", "usage_level": "high", "key_metrics": {"events_last_90": 120}},
-            ],
-            "discipline": {
-                "invoice_matching_rate": 0.92,
-                "stock_update_frequency": "weekly",
-                "data_completeness_score": 0.9,
-            },
-            "behaviour_risks": ["Late-night logins"],
-        },
-        "financial_health": {
-            "revenue": {
-                "avg_monthly_revenue": 12000.0,
-                "revenue_trend": "growing",
-                "growth_rate_yoy": 0.15,
-                "growth_rate_mom": 0.04,
-                "revenue_volatility_score": 0.2,
-            },
-            "profitability_proxy": {"gross_margin_percent": 42.0, "comment": "Healthy"},
-            "liquidity": {
-                "avg_dso_days": 28.0,
-                "avg_dpo_days": 35.0,
-                "cash_conversion_cycle_days": -7.0,
-                "overdue_invoices_ratio": 0.1,
-            },
-            "concentration": {"revenue_concentration_comment": "Diversified", "top_customer_share": 0.3},
-            "seasonality": {"has_strong_seasonality": False, "seasonality_comment": "Stable"},
-        },
-        "cashflow_forecast": {
-            "base_case": {
-                "currency": "SAR",
-                "net_cash_flow_next_3_months": 50000.0,
-                "net_cash_flow_next_12_months": 200000.0,
-            },
-            "conservative_case": {
-                "currency": "SAR",
-                "net_cash_flow_next_3_months": 30000.0,
-                "net_cash_flow_next_12_months": 120000.0,
-            },
-            "optimistic_case": {
-                "currency": "SAR",
-                "net_cash_flow_next_3_months": 70000.0,
-                "net_cash_flow_next_12_months": 260000.0,
-            },
-            "confidence_level": "medium",
-            "key_drivers": ["Stable POS throughput"],
-        },
-        "credit_analysis": {
-            "credit_score": 85,
-            "credit_band": "A",
-            "recommended_credit_limit": {
-                "amount": 4000.0,
-                "currency": "SAR",
-                "logic_comment": "~33% of average monthly revenue",
-            },
-            "max_safe_tenor_months": 12,
-            "score_explanation": {
-                "positive_drivers": ["Growing revenue", "Healthy margins"],
-                "risk_factors": ["Moderate volatility"],
-            },
-            "data_quality_comment": "Synthetic data for test",
-        },
-        "safety_and_compliance": {
-            "used_sensitive_attributes": False,
-            "notes": "",
-            "regulatory_flags": [],
-        },
-        "available_offers": [
-            {
-                "offer_id": "offer-1",
-                "product_type": "working_capital_loan",
-                "amount": 20000,
-                "currency": "SAR",
-                "tenor_months": 9,
-                "apr_percent": 8.0,
-            }
-        ],
-        "early_warning_flags": ["Higher refund ratio"],
-        "recommendations_for_lender": ["Consider stepped limit"],
-        "improvement_actions_for_merchant": ["Tighten stock reconciliation"],
-        "segment_specific_strengths": [],
-        "segment_specific_risks": [],
-        "audit_metadata": {
-            "model_version": "gpt-test",
-            "model_provider": "openai-chatgpt-5.1",
-            "input_data_date_range": "2023-01 to 2023-12",
-            "generated_at": "2024-01-01T00:00:00",
-        },
-        "economics": {
-            "estimated_annual_revenue_to_silky": 10000.0,
-            "estimated_annual_revenue_to_lender": 45000.0,
-            "economics_comment": "Healthy LTV",
-        },
-        "lender_profile": None,
-    }
-
-
-def _create_test_app(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> TestClient:
-    db_url = f"sqlite:///{tmp_path / 'unit.db'}"
-    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
-    monkeypatch.setenv("OPENAI_MODEL", "gpt-test")
-    monkeypatch.setenv("DB_URL", db_url)
-
-    for module_name in [
-        "main",
-        "app.api",
-        "app.config",
-        "app.db",
-        "app.models",
-        "app.seed_db",
-        "app.services.credit_agent_service",
-    ]:
-        sys.modules.pop(module_name, None)
-
-    import app.config as config
-    importlib.reload(config)
-    import app.db as db
-    importlib.reload(db)
-    db.Base.metadata.clear()
-    import app.models as models
-    import app.seed_db as seed_db
-    importlib.reload(seed_db)
-    import app.services.credit_agent_service as credit_agent_service
-    importlib.reload(credit_agent_service)
-
-    def _fake_create(model: str, input: str):
-        payload = _stub_dashboard_payload(customer_id=1)
-        return _FakeResponse(json.dumps(payload))
-
-    monkeypatch.setattr(credit_agent_service.client.responses, "create", _fake_create)
-
-    import main as main_module
-    importlib.reload(main_module)
-
-    seed_db.seed_database()
-    return TestClient(main_module.create_app())
-
-
-@pytest.fixture()
-def client(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
-    with _create_test_app(monkeypatch, tmp_path) as client:
-        yield client
-
 
 def test_customers_endpoint_returns_list(client: TestClient):
     resp = client.get("/api/customers")
@@ -244,3 +43,310 @@ def test_dashboard_page_served(client: TestClient):
     resp = client.get("/dashboard")
     assert resp.status_code == 200
     assert "Silky Credit & Behaviour Engine" in resp.text
+
+
+def test_open_breaker_serves_stale_snapshot_of_the_same_view_only(client: TestClient):
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    assert client.get(f"/api/credit-dashboard/{customer_id}").status_code == 200
+    lender_view = f"/api/credit-dashboard/{customer_id}?viewer_type=bank_partner&lender_id=SAB"
+    assert client.get(lender_view).status_code == 200
+
+    breaker = client.credit_agent_service.model_breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    # Outdate the cached views so requests need the model and fall back.
+    from app import db as app_db, models
+
+    with app_db.SessionLocal() as db:
+        db.get(models.Customer, customer_id).city = "Dammam"
+        db.commit()
+
+    resp = client.get(lender_view)
+    assert resp.status_code == 200
+    assert resp.json()["stale"] is True
+
+    # Another lender, a higher tier or another audience never sees this view's content.
+    for params in (
+        "viewer_type=bank_partner&lender_id=ANB",
+        "subscription_tier=enterprise",
+        "viewer_type=merchant",
+    ):
+        resp = client.get(f"/api/credit-dashboard/{customer_id}?{params}")
+        assert resp.status_code == 503, params
+
+
+def test_local_stub_provider_is_deterministic_and_schema_valid(client: TestClient):
+    from app.schemas import CreditDashboard
+    from app.services import model_providers
+
+    provider = model_providers.LocalStubProvider(seed=7)
+    features = {
+        "customer_id": 3,
+        "usage_mode": "merchant_portal",
+        "subscription_tier": "pro",
+        "kyc": {"legal_name": "Stub Co", "registration": {}, "relationship_with_silky": {}},
+        "usage_metrics": {"activity": {"status": "active", "active_days_last_90": 40}},
+        "financial_metrics": {"avg_monthly_revenue": 10000.0, "mom_growth": 0.1},
+    }
+    request = model_providers.ModelRequest(prompt="prompt", features=features)
+
+    first = provider.generate(request).text
+    assert first == provider.generate(request).text
+    dashboard = CreditDashboard.model_validate_json(first)
+    assert dashboard.usage_mode == "merchant_portal"
+
+
+def test_record_replay_provider_round_trip(client: TestClient, tmp_path: Path):
+    from app.services import model_providers
+
+    recorder = model_providers.RecordReplayProvider(
+        directory=str(tmp_path), mode="record", inner=model_providers.LocalStubProvider()
+    )
+    request = model_providers.ModelRequest(prompt="same prompt", features={"customer_id": 1})
+    recorded = recorder.generate(request).text
+
+    replayer = model_providers.RecordReplayProvider(directory=str(tmp_path), mode="replay")
+    assert replayer.generate(request).text == recorded
+    with pytest.raises(LookupError):
+        replayer.generate(model_providers.ModelRequest(prompt="unseen"))
+
+
+def test_metrics_endpoint_exposes_stage_and_query_metrics(client: TestClient):
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    client.get(f"/api/credit-dashboard/{customer_id}")
+    client.get(f"/api/credit-dashboard/{customer_id}")
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert 'silky_dashboard_stage_seconds_count{stage="model_call"}' in body
+    assert 'silky_dashboard_cache_total{result="hit"}' in body
+    assert 'silky_db_queries_per_request_count{route="/api/credit-dashboard/{customer_id}"}' in body
+    assert "silky_model_calls_in_flight 0" in body
+
+
+def test_usage_summary_rolls_up_tokens_and_cost(client: TestClient, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "model_input_cost_per_mtok", 2.0)
+    monkeypatch.setattr(settings, "model_cached_input_cost_per_mtok", 0.5)
+    monkeypatch.setattr(settings, "model_output_cost_per_mtok", 10.0)
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    client.get(f"/api/credit-dashboard/{customer_id}?lender_id=SAB")
+    client.get(f"/api/credit-dashboard/{customer_id}?lender_id=ANB")
+
+    resp = client.get("/api/usage/summary?group_by=lender,model")
+    assert resp.status_code == 200
+    rows = {row["group"]["lender"]: row for row in resp.json()}
+    assert set(rows) == {"SAB", "ANB"}
+    sab = rows["SAB"]
+    assert sab["group"]["model"] == "gpt-test"
+    assert (sab["snapshots"], sab["input_tokens"], sab["cached_tokens"], sab["output_tokens"]) == (1, 1200, 1000, 800)
+    # 200 uncached * $2 + 1000 cached * $0.5 + 800 output * $10, per 1M tokens
+    assert sab["estimated_cost_usd"] == pytest.approx(0.0089)
+    assert sab["cached_input_ratio"] == pytest.approx(1000 / 1200, abs=1e-4)
+    assert sab["avg_model_latency_ms"] is not None
+
+    assert client.get("/api/usage/summary?group_by=merchant").status_code == 400
+
+
+def test_profiling_requires_token_and_writes_report(client: TestClient, tmp_path: Path):
+    customer_id = client.get("/api/customers").json()[0]["id"]
+
+    resp = client.get(f"/api/credit-dashboard/{customer_id}", headers={"X-Silky-Profile": "wrong"})
+    assert "x-silky-profile-id" not in resp.headers
+    for resp in (
+        client.get(f"/api/credit-dashboard/{customer_id}", headers={"X-Silky-Profile": "tökén".encode("latin-1")}),
+        client.get(f"/api/credit-dashboard/{customer_id}", params={"silky_profile": "€"}),
+    ):
+        assert resp.status_code == 200
+        assert "x-silky-profile-id" not in resp.headers
+
+    resp = client.get(
+        f"/api/credit-dashboard/{customer_id}?lender_id=PROFILED",
+        headers={"X-Silky-Profile": "test-profile-token"},
+    )
+    assert resp.status_code == 200
+    profile_id = resp.headers["x-silky-profile-id"]
+
+    report = json.loads((tmp_path / "profiles" / f"{profile_id}.json").read_text())
+    assert (tmp_path / "profiles" / f"{profile_id}.prof").exists()
+    assert report["sql_count"] == len(report["sql"]) > 0
+    assert "model_call" in report["stages_ms"]
+    assert "generate_dashboard_for_customer" in report["top_functions"]
+
+
+def test_conditional_get_returns_304_until_data_changes(client: TestClient):
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    url = f"/api/credit-dashboard/{customer_id}?viewer_type=bank_partner"
+
+    first = client.get(url)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, max-age=60, must-revalidate"
+
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+
+    customers = client.get("/api/customers")
+    list_etag = customers.headers["etag"]
+    assert client.get("/api/customers", headers={"If-None-Match": list_etag}).status_code == 304
+
+    from app import db as app_db, models
+
+    with app_db.SessionLocal() as session:
+        session.get(models.Customer, customer_id).city = "Dammam"
+        session.commit()
+
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert client.get("/api/customers", headers={"If-None-Match": list_etag}).status_code == 200
+
+
+def test_large_responses_are_compressed_when_accepted(client: TestClient):
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    url = f"/api/credit-dashboard/{customer_id}"
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert compressed.json()["customer_id"] == customer_id
+
+    identity = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert "Accept-Encoding" in identity.headers["vary"]
+    assert identity.json() == compressed.json()
+
+    # Each representation revalidates only against its own ETag.
+    compressed_etag = compressed.headers["etag"]
+    assert compressed_etag == identity.headers["etag"][:-1] + '-gzip"'
+    headers = {"Accept-Encoding": "identity", "If-None-Match": compressed_etag}
+    assert client.get(url, headers=headers).status_code == 200
+    revalidated = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": compressed_etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == compressed_etag
+    headers = {"Accept-Encoding": "identity", "If-None-Match": identity.headers["etag"]}
+    assert client.get(url, headers=headers).status_code == 304
+
+
+def test_fields_parameter_projects_sections(client: TestClient):
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    url = f"/api/credit-dashboard/{customer_id}"
+    full = client.get(url).json()
+
+    fields = "credit_analysis,available_offers.product_type,financial_health.revenue"
+    sparse = client.get(url, params={"fields": fields})
+    assert sparse.status_code == 200
+    body = sparse.json()
+    assert set(body) == {"customer_id", "credit_analysis", "available_offers", "financial_health"}
+    assert body["credit_analysis"] == full["credit_analysis"]
+    assert body["financial_health"] == {"revenue": full["financial_health"]["revenue"]}
+    assert body["available_offers"] == [{"product_type": o["product_type"]} for o in full["available_offers"]]
+    assert sparse.headers["etag"] != client.get(url).headers["etag"]
+
+    assert client.get(url, params={"fields": "credit_analysis.nope"}).status_code == 400
+
+
+def test_strict_schema_mode_sends_schema_and_restores_key_metrics(client: TestClient, monkeypatch):
+    from app.config import settings
+    from app.services import model_providers
+    from app.services.structured_output import CREDIT_DASHBOARD_SCHEMA
+
+    feature_adoption = CREDIT_DASHBOARD_SCHEMA["$defs"]["FeatureAdoptionItem"]
+    assert feature_adoption["additionalProperties"] is False
+    assert feature_adoption["properties"]["key_metrics"]["type"] == "array"
+    assert "stale" not in CREDIT_DASHBOARD_SCHEMA["properties"]
+
+    schemas = []
+
+    class _CapturingStub(model_providers.LocalStubProvider):
+        def generate(self, request):
+            schemas.append(request.response_schema)
+            request.features["usage_metrics"] = {
+                "feature_adoption": [{"module": "POS", "usage_level": "high", "key_metrics": {"orders": 12}}]
+            }
+            return super().generate(request)
+
+    monkeypatch.setattr(settings, "model_strict_schema", True)
+    model_providers.set_model_provider(_CapturingStub())
+
+    resp = client.get("/api/credit-dashboard/2")
+    assert resp.status_code == 200
+    assert schemas == [CREDIT_DASHBOARD_SCHEMA]
+    assert resp.json()["behaviour_profile"]["feature_adoption"][0]["key_metrics"] == {"orders": 12}
+
+
+def test_validation_failure_repairs_only_the_failing_section(client: TestClient, monkeypatch):
+    from app.config import settings
+    from app.models import SilkyCreditProfileSnapshot
+    from app.services import model_providers
+    from tests.conftest import _stub_dashboard_payload
+
+    prompts = []
+
+    class _NearMissProvider(model_providers.ModelProvider):
+        name = "near-miss"
+        model_version = "near-miss-v1"
+
+        def generate(self, request):
+            prompts.append((request.instructions or "") + request.prompt)
+            if len(prompts) == 1:
+                payload = _stub_dashboard_payload(customer_id=3)
+                payload["available_offers"][0]["tenor_months"] = "about a year"
+                return model_providers.ModelResult(text=json.dumps(payload), input_tokens=1000, output_tokens=900)
+            fixed = {**_stub_dashboard_payload(customer_id=3)["available_offers"][0], "tenor_months": 12}
+            return model_providers.ModelResult(
+                text=json.dumps({"available_offers.0": fixed}), input_tokens=200, output_tokens=60
+            )
+
+    model_providers.set_model_provider(_NearMissProvider())
+    resp = client.get("/api/credit-dashboard/3")
+    assert resp.status_code == 200
+    assert resp.json()["available_offers"][0]["tenor_months"] == 12
+    assert len(prompts) == 2
+    assert "PATH: available_offers.0" in prompts[1] and "tenor_months" in prompts[1]
+    assert len(prompts[1]) < len(prompts[0]) / 4
+
+    from app.db import SessionLocal
+
+    with SessionLocal() as db:
+        snapshot = db.query(SilkyCreditProfileSnapshot).filter_by(customer_id=3).one()
+        assert (snapshot.input_tokens, snapshot.output_tokens) == (1200, 960)
+
+    # With repair disabled the same near-miss is a 502.
+    monkeypatch.setattr(settings, "model_repair_max_attempts", 0)
+    prompts.clear()
+    resp = client.get("/api/credit-dashboard/4")
+    assert resp.status_code == 502
+    assert len(prompts) == 1
+
+
+def test_requests_share_a_static_instructions_prefix(client: TestClient):
+    from app.metrics import MODEL_CACHED_INPUT_RATIO
+    from app.services import model_providers
+
+    requests = []
+
+    class _CapturingStub(model_providers.LocalStubProvider):
+        def generate(self, request):
+            requests.append(request)
+            return super().generate(request)
+
+    model_providers.set_model_provider(_CapturingStub())
+    observed = MODEL_CACHED_INPUT_RATIO.count()
+    results = [client.get(f"/api/credit-dashboard/{customer_id}") for customer_id in (5, 6)]
+    assert all(resp.status_code == 200 for resp in results)
+
+    first, second = requests
+    assert first.instructions == second.instructions
+    assert first.cache_key == second.cache_key
+    assert "customer_id=" not in first.instructions
+    # Per-customer features come last, serialised with sorted keys.
+    features = json.loads(first.prompt.split("```json\n")[1].split("\n```")[0])
+    assert list(features) == sorted(features)
+    assert first.prompt.index("customer_id=5") < first.prompt.index("```json")
+    assert MODEL_CACHED_INPUT_RATIO.count() == observed + 2
@@ -0,0 +1,128 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def test_sqlite_connections_use_wal_and_pragmas(client: TestClient):
+    from app import db as app_db
+    from app.config import settings
+
+    with app_db.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.sqlite_busy_timeout_ms
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -settings.sqlite_cache_size_kib
+    assert app_db.engine.pool.size() == settings.db_pool_size
+
+
+def test_read_engine_is_query_only(client: TestClient, tmp_path):
+    from app import db as app_db
+
+    read_engine = app_db.build_engine(f"sqlite:///{tmp_path / 'unit.db'}", read_only=True)
+    with read_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM customers")).scalar() > 0
+        with pytest.raises(OperationalError):
+            conn.execute(text("DELETE FROM customers"))
+    read_engine.dispose()
+
+
+# The snapshot table as created before the token, data-version and payload changes.
+LEGACY_SNAPSHOTS_DDL = """
+CREATE TABLE silky_credit_profile_snapshots (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    snapshot_at DATETIME NOT NULL,
+    viewer_type VARCHAR(32) NOT NULL,
+    usage_mode VARCHAR(32),
+    subscription_tier VARCHAR(32),
+    lender_id VARCHAR(64),
+    dashboard_json TEXT NOT NULL,
+    credit_score INTEGER NOT NULL,
+    credit_band VARCHAR(4) NOT NULL,
+    recommended_credit_limit_amount FLOAT NOT NULL,
+    recommended_credit_limit_currency VARCHAR(8) NOT NULL,
+    max_safe_tenor_months INTEGER NOT NULL,
+    data_quality_comment TEXT,
+    model_version VARCHAR(50),
+    model_provider VARCHAR(50),
+    input_data_date_range VARCHAR(100)
+)
+"""
+
+
+def test_add_missing_columns_upgrades_existing_tables(client: TestClient, tmp_path):
+    from sqlalchemy import create_engine, inspect
+
+    from app import db as app_db
+
+    legacy_engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}", future=True)
+    with legacy_engine.begin() as conn:
+        conn.execute(text(LEGACY_SNAPSHOTS_DDL))
+    app_db.Base.metadata.create_all(bind=legacy_engine)
+
+    added = app_db.add_missing_columns(legacy_engine)
+    assert {"input_tokens", "cached_tokens", "estimated_cost_usd", "data_version"} <= {
+        name.split(".", 1)[1] for name in added if name.startswith("silky_credit_profile_snapshots.")
+    }
+    columns = {column["name"] for column in inspect(legacy_engine).get_columns("silky_credit_profile_snapshots")}
+    assert "model_latency_ms" in columns
+    assert app_db.add_missing_columns(legacy_engine) == []
+    legacy_engine.dispose()
+
+
+def test_legacy_inline_payloads_are_moved_to_the_payload_table(client: TestClient, tmp_path):
+    from sqlalchemy import create_engine, inspect
+    from sqlalchemy.orm import Session
+
+    from app import db as app_db
+    from app.services.snapshot_store import load_payload_json, migrate_inline_payloads
+
+    legacy_engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}", future=True)
+    documents = [json.dumps({"summary": "x" * 500, "score": score}) for score in (60, 61, 62)]
+    with legacy_engine.begin() as conn:
+        conn.execute(text(LEGACY_SNAPSHOTS_DDL))
+        conn.execute(text("CREATE TABLE customers (id INTEGER PRIMARY KEY, legal_name VARCHAR(255) NOT NULL)"))
+        conn.execute(text("INSERT INTO customers (id, legal_name) VALUES (1, 'Legacy Trading')"))
+        for index, document in enumerate(documents):
+            conn.execute(
+                text(
+                    "INSERT INTO silky_credit_profile_snapshots (customer_id, snapshot_at, viewer_type, usage_mode,"
+                    " subscription_tier, dashboard_json, credit_score, credit_band, recommended_credit_limit_amount,"
+                    " recommended_credit_limit_currency, max_safe_tenor_months)"
+                    " VALUES (1, :at, 'silky_internal', 'internal_analytics', 'pro', :json, 60, 'C', 1000, 'SAR', 6)"
+                ),
+                {"at": f"2025-01-0{index + 1} 00:00:00", "json": document},
+            )
+    app_db.Base.metadata.create_all(bind=legacy_engine)
+    app_db.add_missing_columns(legacy_engine)
+
+    with Session(legacy_engine) as session:
+        assert migrate_inline_payloads(session) == 3
+        assert [load_payload_json(session, snapshot_id) for snapshot_id in (1, 2, 3)] == documents
+        assert migrate_inline_payloads(session) == 0
+    columns = {column["name"] for column in inspect(legacy_engine).get_columns("silky_credit_profile_snapshots")}
+    assert "dashboard_json" not in columns
+    legacy_engine.dispose()
+
+
+def test_upgrade_database_waits_for_the_schema_then_runs_every_step(client: TestClient, tmp_path):
+    from sqlalchemy import create_engine, inspect
+
+    from app import db as app_db
+    from app.migrate import upgrade_database
+
+    legacy_engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}", future=True)
+    with legacy_engine.begin() as conn:
+        conn.execute(text(LEGACY_SNAPSHOTS_DDL))
+    assert upgrade_database(legacy_engine) is False
+    assert "input_tokens" not in {c["name"] for c in inspect(legacy_engine).get_columns("silky_credit_profile_snapshots")}
+
+    app_db.Base.metadata.create_all(bind=legacy_engine)
+    assert upgrade_database(legacy_engine) is True
+    columns = {column["name"] for column in inspect(legacy_engine).get_columns("silky_credit_profile_snapshots")}
+    assert "input_tokens" in columns and "dashboard_json" not in columns
+    assert upgrade_database(legacy_engine) is True
+    legacy_engine.dispose()
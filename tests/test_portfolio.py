@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+
+def test_portfolio_rollup_tracks_latest_positions_and_matches_rebuild(client: TestClient):
+    from app import db as app_db
+    from app.services import model_providers
+    from app.services.portfolio import portfolio_summary, rebuild_portfolio
+
+    customers = client.get("/api/customers").json()
+    first, second = customers[0]["id"], customers[1]["id"]
+    assert client.get(f"/api/credit-dashboard/{first}").status_code == 200
+    assert client.get(f"/api/credit-dashboard/{first}?viewer_type=merchant").status_code == 200
+    assert client.get(f"/api/credit-dashboard/{first}?lender_id=SAB").status_code == 200
+    assert client.get(f"/api/credit-dashboard/{second}").status_code == 200
+
+    # Two views of the same customer without a lender are one position.
+    summary = client.get("/api/portfolio/summary").json()
+    assert len(summary) == 1
+    assert summary[0]["positions"] == 3
+    assert summary[0]["total_exposure"] == 12000.0
+    assert summary[0]["avg_tenor_months"] == 12
+    assert summary[0]["bands"] == {"A": {"positions": 3, "exposure": 12000.0}}
+
+    # A newer snapshot replaces the customer's position rather than adding to it.
+    provider = model_providers.get_model_provider()
+    original = provider.generate
+
+    def _downgraded(request):
+        result = original(request)
+        result.text = result.text.replace('"credit_band": "A"', '"credit_band": "C"')
+        return result
+
+    provider.generate = _downgraded
+    with app_db.SessionLocal() as db:
+        client.credit_agent_service.generate_dashboard_for_customer(db, second, force_refresh=True)
+
+    by_lender = {row["value"]: row for row in client.get("/api/portfolio/summary?group_by=lender").json()}
+    assert by_lender["SAB"]["positions"] == 1
+    assert by_lender[None]["positions"] == 2
+    assert by_lender[None]["bands"] == {
+        "A": {"positions": 1, "exposure": 4000.0},
+        "C": {"positions": 1, "exposure": 4000.0},
+    }
+    assert client.get("/api/portfolio/summary?group_by=region").status_code == 422
+
+    with app_db.SessionLocal() as db:
+        incremental = {dimension: portfolio_summary(db, dimension) for dimension in ("all", "segment", "city", "lender")}
+        assert rebuild_portfolio(db) == 3
+        db.commit()
+        rebuilt = {dimension: portfolio_summary(db, dimension) for dimension in ("all", "segment", "city", "lender")}
+    assert rebuilt == incremental
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+
+def test_prewarm_windows_wrap_midnight():
+    from app.prewarm import in_window, parse_windows
+
+    windows = parse_windows("22:30-02:00, 04:00-05:00")
+    assert in_window(datetime(2025, 6, 15, 23, 0), windows)
+    assert in_window(datetime(2025, 6, 15, 1, 59), windows)
+    assert in_window(datetime(2025, 6, 15, 4, 30), windows)
+    assert not in_window(datetime(2025, 6, 15, 12, 0), windows)
+
+
+def test_prewarm_regenerates_changed_views_within_cap(client: TestClient):
+    from app import db as app_db, models
+    from app.prewarm import run_prewarm
+
+    customers = client.get("/api/customers").json()
+    customer_id = customers[0]["id"]
+    assert client.get(f"/api/credit-dashboard/{customer_id}").status_code == 200
+    assert client.get(f"/api/credit-dashboard/{customer_id}").status_code == 200
+
+    with app_db.SessionLocal() as session:
+        pointer = session.query(models.LatestCreditSnapshot).filter_by(customer_id=customer_id).one()
+        assert pointer.hits == 1
+        old = datetime.utcnow() - timedelta(days=2)
+        pointer.snapshot_at = old
+        session.get(models.SilkyCreditProfileSnapshot, pointer.snapshot_id).snapshot_at = old
+        session.add(models.UsageEvent(customer_id=customer_id, module="POS", event_type="login", timestamp=datetime.utcnow()))
+        session.commit()
+        before = session.query(models.SilkyCreditProfileSnapshot).filter_by(customer_id=customer_id).count()
+
+    plan = run_prewarm(app_db.SessionLocal, max_generations=1, dry_run=True)
+    # Every other seeded customer has never been generated and is a candidate too.
+    assert plan.candidates == len(customers)
+    assert len(plan.views) == 1
+    assert (plan.skipped_cap, plan.skipped_budget) == (len(customers) - 1, 0)
+
+    report = run_prewarm(app_db.SessionLocal, max_generations=len(customers))
+    assert report.generated == len(customers)
+    with app_db.SessionLocal() as session:
+        after = session.query(models.SilkyCreditProfileSnapshot).filter_by(customer_id=customer_id).count()
+    assert after == before + 1
+
+
+def test_prewarm_per_customer_cap_counts_only_views_old_enough(client: TestClient, monkeypatch):
+    from app import db as app_db, models
+    from app.config import settings
+    from app.prewarm import find_candidates
+
+    monkeypatch.setattr(settings, "prewarm_views_per_customer", 1)
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    assert client.get(f"/api/credit-dashboard/{customer_id}").status_code == 200
+    assert client.get(f"/api/credit-dashboard/{customer_id}?viewer_type=merchant").status_code == 200
+
+    with app_db.SessionLocal() as session:
+        pointers = {
+            pointer.viewer_type: pointer
+            for pointer in session.query(models.LatestCreditSnapshot).filter_by(customer_id=customer_id)
+        }
+        # The most-viewed view was just generated; the other one is old enough to warm.
+        pointers["silky_internal"].hits = 50
+        pointers["merchant"].snapshot_at = datetime.utcnow() - timedelta(days=2)
+        session.get(models.Customer, customer_id).city = "Dammam"
+        session.commit()
+
+        views = [candidate for candidate in find_candidates(session) if candidate.customer_id == customer_id]
+    assert [view.viewer_type for view in views] == ["merchant"]
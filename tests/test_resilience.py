@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services.resilience import CircuitBreaker, ModelUnavailableError, call_with_retries  # noqa: E402
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_breaker_opens_and_half_opens_after_reset():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_seconds=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    clock.now = 11
+    assert breaker.allow_request()  # single half-open probe
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_retries_until_success_and_gives_up_on_deadline():
+    clock = _Clock()
+    calls = []
+
+    def flaky(timeout: float) -> str:
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise TimeoutError("slow")
+        return "ok"
+
+    kwargs = dict(
+        is_retryable=lambda exc: isinstance(exc, TimeoutError),
+        timeout_seconds=5,
+        base_delay_seconds=0.1,
+        max_delay_seconds=1,
+        sleep=clock.sleep,
+        clock=clock,
+    )
+    assert call_with_retries(flaky, max_attempts=3, deadline_seconds=60, **kwargs) == "ok"
+
+    def always_slow(timeout: float) -> str:
+        clock.now += timeout
+        raise TimeoutError("slow")
+
+    clock.now = 0
+    with pytest.raises(ModelUnavailableError):
+        call_with_retries(always_slow, max_attempts=10, deadline_seconds=12, **kwargs)
+    assert clock.now <= 12
+
+
+def test_non_retryable_errors_propagate():
+    def broken(timeout: float) -> str:
+        raise KeyError("bad request")
+
+    with pytest.raises(KeyError):
+        call_with_retries(
+            broken,
+            is_retryable=lambda exc: False,
+            max_attempts=3,
+            timeout_seconds=1,
+            deadline_seconds=10,
+            base_delay_seconds=0,
+            max_delay_seconds=0,
+        )
@@ -0,0 +1,69 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+
+def test_retention_keeps_latest_and_representatives(client: TestClient, monkeypatch, tmp_path):
+    from app import db as app_db, models
+    from app.config import settings
+    from app.retention import RetentionPolicy, run_retention
+    from app.services import snapshot_store
+
+    monkeypatch.setattr(settings, "snapshot_compression", "gzip")
+    monkeypatch.setattr(settings, "snapshot_delta_max_chain", 10)
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    now = datetime(2025, 6, 15, 12)
+    ages = {
+        "latest": timedelta(hours=0),
+        "second": timedelta(hours=1),
+        "same_day": timedelta(hours=2),
+        "last_week": timedelta(days=7),
+        "last_week_earlier": timedelta(days=7, hours=1),
+        "march": timedelta(days=90),
+        "march_earlier": timedelta(days=91),
+        "ancient": timedelta(days=1000),
+    }
+
+    ids = {}
+    with app_db.SessionLocal() as session:
+        for index, (name, age) in enumerate(sorted(ages.items(), key=lambda item: -item[1])):
+            snapshot = models.SilkyCreditProfileSnapshot(
+                customer_id=customer_id,
+                snapshot_at=now - age,
+                viewer_type="bank_partner",
+                usage_mode="bank_partner_portal",
+                subscription_tier="pro",
+                lender_id="RET",
+                credit_score=60 + index,
+                credit_band="B",
+                recommended_credit_limit_amount=1000.0,
+                recommended_credit_limit_currency="SAR",
+                max_safe_tenor_months=6,
+            )
+            session.add(snapshot)
+            session.flush()
+            snapshot_store.save_payload(session, snapshot, json.dumps({"body": "y" * 500, "name": name}))
+            session.commit()
+            ids[name] = snapshot.id
+
+    policy = RetentionPolicy(keep_latest=2, daily_days=30, monthly_months=12)
+    dry = run_retention(app_db.engine, policy, chunk_size=2, dry_run=True, now=now)
+    report = run_retention(app_db.engine, policy, chunk_size=2, archive_dir=str(tmp_path / "archive"), now=now)
+
+    expired = {"same_day", "last_week_earlier", "march_earlier", "ancient"}
+    assert dry.deleted == report.deleted == len(expired)
+    assert report.rematerialized > 0 and report.payload_bytes_freed > 0
+    with app_db.SessionLocal() as session:
+        remaining = {
+            row.id for row in session.query(models.SilkyCreditProfileSnapshot).filter_by(lender_id="RET")
+        }
+        assert remaining == {ids[name] for name in ages if name not in expired}
+        for name in ages:
+            if name not in expired:
+                assert json.loads(snapshot_store.load_payload_json(session, ids[name]))["name"] == name
+
+    with gzip.open(report.archive_path, "rt") as archive:
+        archived = {json.loads(line)["dashboard"]["name"] for line in archive}
+    assert archived == expired
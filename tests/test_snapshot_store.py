@@ -0,0 +1,118 @@
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+
+def _snapshot(models, customer_id: int, minutes: int):
+    return models.SilkyCreditProfileSnapshot(
+        customer_id=customer_id,
+        snapshot_at=datetime(2025, 1, 1) + timedelta(minutes=minutes),
+        viewer_type="silky_internal",
+        usage_mode="internal_analytics",
+        subscription_tier="pro",
+        lender_id=None,
+        credit_score=70,
+        credit_band="B",
+        recommended_credit_limit_amount=1000.0,
+        recommended_credit_limit_currency="SAR",
+        max_safe_tenor_months=6,
+    )
+
+
+def test_payloads_round_trip_through_bounded_delta_chains(client: TestClient, monkeypatch):
+    from app import db as app_db, models
+    from app.config import settings
+    from app.services import snapshot_store
+
+    monkeypatch.setattr(settings, "snapshot_compression", "gzip")
+    monkeypatch.setattr(settings, "snapshot_delta_max_chain", 2)
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    documents = [
+        {"summary": "x" * 2000, "score": score, "flags": ["late"] if score % 2 else []} for score in range(5)
+    ]
+    del documents[3]["flags"]
+
+    with app_db.SessionLocal() as session:
+        ids = []
+        for minutes, document in enumerate(documents):
+            snapshot = _snapshot(models, customer_id, minutes)
+            session.add(snapshot)
+            session.flush()
+            snapshot_store.save_payload(session, snapshot, json.dumps(document))
+            session.commit()
+            ids.append(snapshot.id)
+
+        payloads = [session.get(models.SilkyCreditSnapshotPayload, snapshot_id) for snapshot_id in ids]
+        assert [p.chain_depth for p in payloads] == [0, 1, 2, 0, 1]
+        assert payloads[1].base_snapshot_id == ids[0]
+        assert all(p.codec == "gzip" and len(p.data) < p.raw_bytes for p in payloads)
+        for snapshot_id, document in zip(ids, documents):
+            assert json.loads(snapshot_store.load_payload_json(session, snapshot_id)) == document
+
+
+def test_latest_pointer_tracks_newest_snapshot_and_backfills(client: TestClient):
+    from app import db as app_db, models
+    from app.services import snapshot_store
+
+    customer_id = client.get("/api/customers").json()[0]["id"]
+    for lender_id in ("SAB", "ANB", "SAB"):
+        resp = client.get(f"/api/credit-dashboard/{customer_id}?viewer_type=bank_partner&lender_id={lender_id}")
+        assert resp.status_code == 200
+
+    with app_db.SessionLocal() as session:
+        pointers = {
+            (p.lender_key, p.snapshot_id)
+            for p in session.query(models.LatestCreditSnapshot).filter_by(customer_id=customer_id)
+        }
+        assert len(pointers) == 2
+        assert snapshot_store.backfill_latest_pointers(session) == 2
+        session.commit()
+        rebuilt = {
+            (p.lender_key, p.snapshot_id)
+            for p in session.query(models.LatestCreditSnapshot).filter_by(customer_id=customer_id)
+        }
+        assert rebuilt == pointers
+        newest = max(snapshot_id for _, snapshot_id in pointers)
+        newest_at = session.get(models.SilkyCreditProfileSnapshot, newest).snapshot_at
+
+    customers = {c["id"]: c for c in client.get("/api/customers").json()}
+    assert customers[customer_id]["latest_credit"]["snapshot_at"] == newest_at.isoformat()
+
+
+def test_source_writes_invalidate_cached_dashboard(client: TestClient):
+    from datetime import date
+
+    from app import db as app_db, models
+    from app.services.data_versions import current_data_version
+
+    customer_id = client.get("/api/customers").json()[0]["id"]
+
+    def snapshot_count() -> int:
+        with app_db.SessionLocal() as session:
+            return session.query(models.SilkyCreditProfileSnapshot).filter_by(customer_id=customer_id).count()
+
+    client.get(f"/api/credit-dashboard/{customer_id}")
+    client.get(f"/api/credit-dashboard/{customer_id}")
+    assert snapshot_count() == 1
+
+    with app_db.SessionLocal() as session:
+        before = current_data_version(session, customer_id)
+        session.add(
+            models.Invoice(
+                customer_id=customer_id,
+                issue_date=date.today(),
+                due_date=date.today(),
+                amount=100.0,
+                status="open",
+            )
+        )
+        session.commit()
+        assert current_data_version(session, customer_id) == before + 1
+
+    client.get(f"/api/credit-dashboard/{customer_id}")
+    client.get(f"/api/credit-dashboard/{customer_id}")
+    assert snapshot_count() == 2
+    with app_db.SessionLocal() as session:
+        snapshot = session.query(models.SilkyCreditProfileSnapshot).order_by(models.SilkyCreditProfileSnapshot.id.desc()).first()
+        assert snapshot.data_version == before + 1
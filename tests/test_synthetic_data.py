@@ -0,0 +1,27 @@
+from datetime import date
+
+from sqlalchemy import create_engine, text
+
+
+def _generate(seed: int, chunk_size: int):
+    from app.db import Base
+    from app.synthetic_data import GeneratorConfig, SyntheticDataGenerator
+
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine)
+    config = GeneratorConfig(merchants=3, days=30, seed=seed, chunk_size=chunk_size)
+    counts = SyntheticDataGenerator(config, today=date(2025, 1, 31)).write(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT customer_id, date, net_sales FROM pos_transactions ORDER BY id")).all()
+    return counts, rows
+
+
+def test_generator_is_deterministic_across_chunk_sizes():
+    counts, rows = _generate(seed=7, chunk_size=50)
+    same_counts, same_rows = _generate(seed=7, chunk_size=10_000)
+    _, other_rows = _generate(seed=8, chunk_size=50)
+
+    assert counts["customers"] == 3
+    assert counts["pos_transactions"] == len(rows) > 0
+    assert (counts, rows) == (same_counts, same_rows)
+    assert rows != other_rows